@@ -0,0 +1,81 @@
+"""Recall@k / latency report for the NumPy IVF backend vs. brute force.
+
+Builds a clustered synthetic corpus (embedding-like: many topics, points
+spread around each), indexes it with ``SimpleIndex(backend="flat")`` and
+``SimpleIndex(backend="ivf")``, then sweeps ``nprobe``::
+
+    python -m hybrid_vdb.benchmarks.ann_recall_bench --n 100000 --k 10
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from ..src.config import EMBEDDING_DIM, IVF_NLIST
+from ..src.local_vdb import SimpleIndex
+
+
+def clustered_corpus(
+    n: int, dim: int, topics: int, spread: float, rng: np.random.Generator
+) -> np.ndarray:
+    centers = rng.standard_normal((topics, dim), dtype="float32")
+    labels = rng.integers(0, topics, size=n)
+    noise = rng.standard_normal((n, dim), dtype="float32") * spread
+    return centers[labels] + noise
+
+
+def recall_at_k(approx: List[List[str]], exact: List[List[str]]) -> float:
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+    return hits / max(sum(len(e) for e in exact), 1)
+
+
+def _timed_search(index: SimpleIndex, queries: np.ndarray, k: int):
+    results = []
+    t0 = time.perf_counter()
+    for q in queries:
+        results.append(index.search(q, k)[0])
+    return results, (time.perf_counter() - t0) * 1000.0 / len(queries)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=1.0, help="within-topic noise scale")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=IVF_NLIST)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_corpus(args.n, args.dim, args.topics, args.spread, rng)
+    ids = [str(i) for i in range(args.n)]
+    picks = rng.integers(0, args.n, size=args.queries)
+    queries = corpus[picks] + rng.standard_normal((args.queries, args.dim), dtype="float32") * args.spread
+
+    flat = SimpleIndex(args.dim, backend="flat")
+    flat.add(corpus, ids)
+    exact, flat_ms = _timed_search(flat, queries, args.k)
+    del flat
+
+    ivf = SimpleIndex(args.dim, backend="ivf")
+    ivf.ann.nlist = args.nlist
+    t0 = time.perf_counter()
+    ivf.add(corpus, ids)
+    build_s = time.perf_counter() - t0
+
+    print(f"N={args.n} dim={args.dim} k={args.k} nlist={ivf.ann.nlist} build={build_s:.1f}s")
+    print(f"{'nprobe':>7} {'recall@k':>9} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'flat':>7} {1.0:>9.3f} {flat_ms:>9.3f} {1.0:>8.1f}")
+    for nprobe in args.nprobe:
+        ivf.ann.nprobe = nprobe
+        approx, ms = _timed_search(ivf, queries, args.k)
+        print(f"{nprobe:>7} {recall_at_k(approx, exact):>9.3f} {ms:>9.3f} {flat_ms / ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Throughput: ``StorageEngine.search`` in a loop vs. one ``search_batch`` call.
+
+Fills the permanent tier and the hot partition with random vectors and
+times ``m`` queries answered one by one and as a single batch (one GEMM per
+tier). Reports queries per second.
+
+Run from the directory that contains the package::
+
+    python -m hybrid_vdb.benchmarks.batch_search_bench --n 100000 --batch 1 16 64 256
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from ..src.config import EMBEDDING_DIM
+from ..src.storage_engine import StorageEngine
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16, 64, 256])
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    storage = StorageEngine()
+    for start in range(0, args.n, 65536):
+        rows = rng.standard_normal((min(65536, args.n - start), args.dim), dtype="float32")
+        storage.add_permanent(rows, [f"p{i}" for i in range(start, start + rows.shape[0])])
+    hot = rng.standard_normal((storage.hot.capacity, args.dim), dtype="float32")
+    storage.add_hot(hot, [f"h{i}" for i in range(hot.shape[0])])
+
+    print(f"{'batch':>6} {'loop q/s':>10} {'batch q/s':>10} {'speedup':>8}")
+    for m in args.batch:
+        queries = rng.standard_normal((m, args.dim), dtype="float32")
+        t0 = time.perf_counter()
+        for q in queries:
+            storage.search(q, args.k)
+        loop = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        storage.search_batch(queries, args.k)
+        batch = time.perf_counter() - t0
+        print(f"{m:>6} {m / loop:>10.1f} {m / batch:>10.1f} {loop / batch:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cloud client throughput and tail latency against ``FakeCloudServer``.
+
+``m`` queries are sent to an in-process fake Qdrant with injected latency
+(base + exponential jitter + occasional tail), three ways:
+
+- ``serial``: one ``CloudClient.search`` per query
+- ``batch``: ``CloudClient.search_batch`` (``--max-batch`` queries per trip)
+- ``async``: ``--concurrency`` concurrent ``AsyncCloudClient.search`` calls
+
+Reports queries per second and per-call p50 / p99 latency.
+
+Run from the directory that contains the package::
+
+    python -m hybrid_vdb.benchmarks.cloud_client_bench --m 256 --latency-ms 5 --tail-prob 0.02
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+from typing import List
+
+import numpy as np
+
+from ..src.cloud_client import AsyncCloudClient, CloudClient
+from ..src.fake_cloud import FakeCloudServer
+
+
+def _row(name: str, m: int, wall: float, lat: List[float]) -> str:
+    p50, p99 = np.percentile(np.asarray(lat) * 1000.0, [50, 99])
+    return f"{name:>7} {m / wall:>10.1f} {p50:>9.2f} {p99:>9.2f}"
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--m", type=int, default=256, help="queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n", type=int, default=10_000, help="vectors in the fake collection")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=1.0)
+    parser.add_argument("--tail-prob", type=float, default=0.01)
+    parser.add_argument("--tail-ms", type=float, default=100.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    fake = FakeCloudServer(
+        n=args.n,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tail_prob=args.tail_prob,
+        tail_ms=args.tail_ms,
+    )
+    queries = np.random.default_rng(1).standard_normal((args.m, fake.vectors.shape[1]), dtype="float32")
+    print(f"{'mode':>7} {'q/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+
+    cloud = CloudClient(transport=fake.transport(), max_batch=args.max_batch)
+    lat = []
+    t0 = time.perf_counter()
+    for q in queries:
+        t = time.perf_counter()
+        cloud.search(q, args.k)
+        lat.append(time.perf_counter() - t)
+    print(_row("serial", args.m, time.perf_counter() - t0, lat))
+
+    lat = []
+    t0 = time.perf_counter()
+    for start in range(0, args.m, args.max_batch):
+        t = time.perf_counter()
+        cloud.search_batch(queries[start : start + args.max_batch], args.k)
+        lat.append(time.perf_counter() - t)
+    print(_row("batch", args.m, time.perf_counter() - t0, lat))
+    cloud.close()
+
+    async def run_async() -> List[float]:
+        client = AsyncCloudClient(transport=fake.async_transport())
+        gate = asyncio.Semaphore(args.concurrency)
+        out: List[float] = []
+
+        async def one(q: np.ndarray) -> None:
+            async with gate:
+                t = time.perf_counter()
+                await client.search(q, args.k)
+                out.append(time.perf_counter() - t)
+
+        await asyncio.gather(*(one(q) for q in queries))
+        await client.aclose()
+        return out
+
+    t0 = time.perf_counter()
+    lat = asyncio.run(run_async())
+    print(_row("async", args.m, time.perf_counter() - t0, lat))
+
+
+if __name__ == "__main__":
+    main()
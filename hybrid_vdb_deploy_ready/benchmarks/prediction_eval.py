@@ -0,0 +1,97 @@
+"""Offline evaluation of next-query prediction: replay a trace, report hit@k.
+
+Each query of the trace is fed to a fresh ``AnchorSystem`` in order. Before
+query ``t`` is processed, the predictions made after query ``t-1`` are
+scored against it: a hit at ``k`` means one of the first ``k`` predictions
+reaches ``PREDICTION_HIT_THRESHOLD`` cosine similarity. Two predictors are
+compared:
+
+- ``learned``: ``AnchorSystem.generate_predictions`` (``TransitionPredictor``)
+- ``noise``: the previous placeholder, anchor centroid + N(0, 0.05)
+
+``--trace`` takes an ``(n, dim)`` ``.npy`` array of query embeddings in
+arrival order; without it a synthetic trace is generated: topics linked by
+a sparse Markov chain, each topic asked through a few fixed phrasings.
+
+Run from the directory that contains the package::
+
+    python -m hybrid_vdb.benchmarks.prediction_eval --ks 1 3 5 7
+"""
+from __future__ import annotations
+import argparse
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from ..src.anchor_system import AnchorSystem
+from ..src.config import EMBEDDING_DIM, PREDICTION_HIT_THRESHOLD
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    m = np.atleast_2d(np.asarray(m, dtype="float32"))
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-9)
+
+
+def synthetic_trace(
+    n: int,
+    dim: int = EMBEDDING_DIM,
+    topics: int = 30,
+    phrasings: int = 4,
+    seed: int = 0,
+) -> np.ndarray:
+    """Queries walking a topic Markov chain (0.6 / 0.3 to two successors, 0.1 random)."""
+    rng = np.random.default_rng(seed)
+    centers = _unit(rng.standard_normal((topics, dim)))
+    noise = rng.standard_normal((topics, phrasings, dim)) * (0.6 / np.sqrt(dim))
+    phrases = _unit((centers[:, None, :] + noise).reshape(-1, dim)).reshape(topics, phrasings, dim)
+    succ = np.stack([rng.permutation(topics)[:2] for _ in range(topics)])
+    out = np.empty((n, dim), dtype="float32")
+    topic = int(rng.integers(topics))
+    for i in range(n):
+        phrase = phrases[topic, int(rng.integers(phrasings))]
+        out[i] = phrase + rng.standard_normal(dim) * (0.05 / np.sqrt(dim))
+        r = rng.random()
+        topic = int(succ[topic, 0] if r < 0.6 else succ[topic, 1] if r < 0.9 else rng.integers(topics))
+    return out
+
+
+def replay(trace: np.ndarray, ks: Sequence[int], method: str = "learned", seed: int = 0) -> Dict[int, float]:
+    """hit@k over ``trace`` for ``method`` in ("learned", "noise")."""
+    rng = np.random.default_rng(seed)
+    system = AnchorSystem(trace.shape[1])
+    k_max = max(ks)
+    hits = {k: 0 for k in ks}
+    preds = None
+    for q in trace:
+        if preds is not None:
+            sims = preds @ _unit(q)[0] if len(preds) else np.empty(0)
+            for k in ks:
+                hits[k] += int(sims[:k].size > 0 and sims[:k].max() >= PREDICTION_HIT_THRESHOLD)
+        anchor = system.process_query(q, "")
+        if method == "learned":
+            vecs = [p.vector for p in system.generate_predictions(anchor, k=k_max, query_vec=q)]
+        else:
+            center = anchor.centroid
+            vecs = [center + rng.normal(0, 0.05, size=center.shape) for _ in range(k_max)]
+        preds = _unit(np.stack(vecs))
+    steps = max(len(trace) - 1, 1)
+    return {k: hits[k] / steps for k in ks}
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help=".npy file with (n, dim) query embeddings")
+    parser.add_argument("--n", type=int, default=5000, help="synthetic trace length")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 3, 5, 7])
+    args = parser.parse_args(argv)
+
+    trace = np.load(args.trace) if args.trace else synthetic_trace(args.n)
+    print(f"{len(trace)} queries, hit threshold {PREDICTION_HIT_THRESHOLD}")
+    print(f"{'method':>8} " + " ".join(f"{'hit@' + str(k):>7}" for k in args.ks))
+    for method in ("noise", "learned"):
+        rates = replay(trace, args.ks, method)
+        print(f"{method:>8} " + " ".join(f"{rates[k]:>7.3f}" for k in args.ks))
+
+
+if __name__ == "__main__":
+    main()
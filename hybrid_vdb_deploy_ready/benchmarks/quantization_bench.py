@@ -0,0 +1,74 @@
+"""Memory / latency / recall of quantized permanent-tier storage.
+
+Compares float32, float16, int8 and PQ storage in ``SimpleIndex`` (flat
+backend), with and without exact re-ranking, against float32 brute force::
+
+    python -m hybrid_vdb.benchmarks.quantization_bench --n 30000
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from ..src.config import EMBEDDING_DIM
+from ..src.local_vdb import SimpleIndex
+from ..src.quantization import QuantizedBuffer
+from .ann_recall_bench import clustered_corpus, recall_at_k
+
+
+def _run(index: SimpleIndex, queries: np.ndarray, k: int):
+    results = []
+    t0 = time.perf_counter()
+    for q in queries:
+        results.append(index.search(q, k)[0])
+    return results, (time.perf_counter() - t0) * 1000.0 / len(queries)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=30_000)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_corpus(args.n, args.dim, args.topics, args.spread, rng)
+    ids = [str(i) for i in range(args.n)]
+    picks = rng.integers(0, args.n, size=args.queries)
+    queries = corpus[picks] + rng.standard_normal((args.queries, args.dim), dtype="float32")
+
+    configs = [
+        ("float32", dict(dtype="float32"), None),
+        ("float16", dict(dtype="float16"), None),
+        ("int8", dict(quantization="int8"), "disk"),
+        ("int8/no-rerank", dict(quantization="int8"), None),
+        ("pq", dict(quantization="pq"), "disk"),
+        ("pq/no-rerank", dict(quantization="pq"), None),
+    ]
+    exact = None
+    print(f"N={args.n} dim={args.dim} k={args.k}")
+    print(f"{'storage':>15} {'MB':>8} {'x smaller':>9} {'build s':>8} {'ms/query':>9} {'recall':>7}")
+    base_mb = None
+    for name, kwargs, rerank in configs:
+        index = SimpleIndex(args.dim, backend="flat", **kwargs)
+        if isinstance(index._buf, QuantizedBuffer):
+            index._buf = QuantizedBuffer(args.dim, kind=kwargs["quantization"], rerank=rerank)
+        t0 = time.perf_counter()
+        index.add(corpus, ids)
+        build_s = time.perf_counter() - t0
+        results, ms = _run(index, queries, args.k)
+        if exact is None:
+            exact = results
+        mb = index.nbytes / 2**20
+        base_mb = base_mb or mb
+        recall = recall_at_k(results, exact)
+        print(f"{name:>15} {mb:>8.1f} {base_mb / mb:>9.1f} {build_s:>8.2f} {ms:>9.3f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Microbenchmark: growable pre-normalized buffer vs. the old vstack index.
+
+Compares, at several corpus sizes, the cost of inserting one vector and of a
+top-k cosine search for
+
+- ``legacy``: ``np.vstack`` on every add, renormalize + full ``argsort`` per query
+- ``float32`` / ``float16``: ``VectorBuffer`` with ``argpartition`` top-k
+
+Run from the directory that contains the package::
+
+    python -m hybrid_vdb.benchmarks.simple_index_bench --sizes 10000 100000 1000000
+"""
+from __future__ import annotations
+import argparse
+import gc
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from ..src.config import EMBEDDING_DIM
+from ..src.local_vdb import VectorBuffer, _normalize
+
+
+def _median_ms(fn: Callable[[], None], reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(times))
+
+
+def _random_rows(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.standard_normal((n, dim), dtype="float32")
+
+
+def bench_legacy(n: int, dim: int, k: int, reps: int, rng) -> Dict[str, float]:
+    state = {"vectors": _random_rows(n, dim, rng)}
+    one = _random_rows(1, dim, rng)
+
+    def add() -> None:
+        state["vectors"] = np.vstack([state["vectors"], one])
+
+    def search() -> None:
+        vnorm = _normalize(state["vectors"])
+        qnorm = _normalize(one)[0]
+        scores = vnorm @ qnorm
+        np.argsort(-scores)[:k]
+
+    out = {"add_ms": _median_ms(add, max(reps // 10, 3)), "search_ms": _median_ms(search, reps)}
+    del state
+    return out
+
+
+def bench_buffer(n: int, dim: int, k: int, reps: int, rng, dtype: str) -> Dict[str, float]:
+    buf = VectorBuffer(dim, dtype=dtype)
+    chunk = 65536
+    for start in range(0, n, chunk):
+        buf.add(_random_rows(min(chunk, n - start), dim, rng))
+    one = _random_rows(1, dim, rng)
+    q = _normalize(one)[0]
+
+    # amortized: many single-row adds, including any capacity doublings
+    n_adds = 1000
+    t0 = time.perf_counter()
+    for _ in range(n_adds):
+        buf.add(one)
+    add_ms = (time.perf_counter() - t0) * 1000.0 / n_adds
+
+    out = {
+        "add_ms": add_ms,
+        "search_ms": _median_ms(lambda: buf.search(q, k), reps),
+        "resident_mb": buf.nbytes / 2**20,
+    }
+    del buf
+    return out
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--reps", type=int, default=20)
+    parser.add_argument("--skip-legacy", action="store_true", help="legacy needs ~2x corpus RAM")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>9} {'impl':>8} {'add ms':>10} {'search ms':>10} {'MB':>8}")
+    for n in args.sizes:
+        rows = {}
+        if not args.skip_legacy:
+            rows["legacy"] = bench_legacy(n, args.dim, args.k, args.reps, rng)
+        gc.collect()
+        rows["float32"] = bench_buffer(n, args.dim, args.k, args.reps, rng, "float32")
+        gc.collect()
+        rows["float16"] = bench_buffer(n, args.dim, args.k, args.reps, rng, "float16")
+        gc.collect()
+        for impl, r in rows.items():
+            mb = r.get("resident_mb", n * args.dim * 4 / 2**20)
+            print(f"{n:>9} {impl:>8} {r['add_ms']:>10.4f} {r['search_ms']:>10.3f} {mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
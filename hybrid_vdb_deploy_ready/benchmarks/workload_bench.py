@@ -0,0 +1,239 @@
+"""Replayable end-to-end workload benchmark for ``HybridRouter``.
+
+Query streams are either generated or replayed from a trace file and sent
+through a full router whose cloud is a ``FakeCloudServer`` (simulated
+latency), with the deterministic bag-of-words ``HashingEmbedder`` so runs
+are reproducible without a model download.
+
+Generated streams mix four effects, each switchable per scenario:
+
+- Zipfian topic popularity (``zipf_s``)
+- drift: the popularity ranking rotates every ``drift_every`` queries
+- bursts: with probability ``burst_prob`` one topic repeats ``burst_len`` times
+- paraphrases: each query is a random subset / order of its topic's words
+  plus filler words
+
+Reported per scenario: throughput, latency percentiles (of each
+``search_batch`` call, i.e. per query at ``--batch 1``), local / cache /
+cloud shares, prediction accuracy and peak memory (process max RSS so far,
+and the tracemalloc peak with ``--tracemalloc``, which slows the run
+several-fold), plus ``HybridRouter.memory_usage()`` per subsystem at the
+end of the stream. ``--out`` saves everything as JSON; ``--compare`` prints
+relative changes against such a file.
+
+A trace is a JSON-lines file with one ``{"query": ...}`` per line
+(``--save-trace`` writes the generated stream in that format).
+
+Run from the directory that contains the package::
+
+    python -m hybrid_vdb.benchmarks.workload_bench --n 2000 --out bench.json
+    python -m hybrid_vdb.benchmarks.workload_bench --compare bench.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..src.cloud_client import CloudClient
+from ..src.embedders import HashingEmbedder
+from ..src.fake_cloud import FakeCloudServer
+from ..src.hybrid_router import HybridRouter
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "uniform": dict(zipf_s=0.0, drift_every=0, burst_prob=0.0),
+    "zipf": dict(zipf_s=1.1, drift_every=0, burst_prob=0.0),
+    "drift": dict(zipf_s=1.1, drift_every=500, burst_prob=0.0),
+    "burst": dict(zipf_s=1.1, drift_every=0, burst_prob=0.02),
+    "mixed": dict(zipf_s=1.1, drift_every=500, burst_prob=0.02),
+}
+
+
+# --- workload --------------------------------------------------------
+class Workload:
+    """Topics with their own vocabulary, a document corpus and a query stream."""
+
+    def __init__(self, topics: int = 200, words_per_topic: int = 8, docs_per_topic: int = 5, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.vocab = [[f"t{t}w{w}" for w in range(words_per_topic)] for t in range(topics)]
+        self.filler = [f"f{i}" for i in range(50)]
+        self.docs: List[str] = []
+        self.doc_topic: List[int] = []
+        for t, words in enumerate(self.vocab):
+            for _ in range(docs_per_topic):
+                self.docs.append(" ".join(self.rng.choice(words, size=len(words) - 2, replace=False)))
+                self.doc_topic.append(t)
+
+    def _query(self, topic: int) -> str:
+        words = self.vocab[topic]
+        n = int(self.rng.integers(len(words) // 2, len(words) + 1))
+        picked = list(self.rng.choice(words, size=n, replace=False))
+        picked += list(self.rng.choice(self.filler, size=int(self.rng.integers(0, 3))))
+        self.rng.shuffle(picked)
+        return " ".join(picked)
+
+    def stream(self, n: int, zipf_s: float, drift_every: int, burst_prob: float, burst_len: int = 20) -> Iterator[str]:
+        topics = len(self.vocab)
+        weights = 1.0 / np.arange(1, topics + 1) ** zipf_s
+        weights /= weights.sum()
+        ranking = self.rng.permutation(topics)  # ranking[r] = topic at popularity rank r
+        burst_topic, burst_left = 0, 0
+        for i in range(n):
+            if drift_every and i and i % drift_every == 0:
+                ranking = np.roll(ranking, topics // 10 or 1)
+            if burst_left:
+                burst_left -= 1
+                yield self._query(burst_topic)
+                continue
+            if burst_prob and self.rng.random() < burst_prob:
+                burst_topic, burst_left = int(self.rng.integers(topics)), burst_len - 1
+                yield self._query(burst_topic)
+                continue
+            yield self._query(int(ranking[self.rng.choice(topics, p=weights)]))
+
+
+def load_trace(path: str) -> List[str]:
+    with open(path) as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+def save_trace(path: str, queries: List[str]) -> None:
+    with open(path, "w") as f:
+        for q in queries:
+            f.write(json.dumps({"query": q}) + "\n")
+
+
+# --- replay ----------------------------------------------------------
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def replay(
+    queries: List[str],
+    docs: List[str],
+    k: int = 5,
+    batch: int = 1,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 5.0,
+    trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Run ``queries`` through a fresh router backed by a fake cloud over ``docs``."""
+    embedder = HashingEmbedder()
+    fake = FakeCloudServer(
+        vectors=embedder.encode(docs),
+        payloads=[{"id": f"doc_{i}", "text": d} for i, d in enumerate(docs)],
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+    )
+    router = HybridRouter(
+        embedder=embedder, cloud=CloudClient(transport=fake.transport()), attach_metrics=False
+    )
+    if trace_memory:
+        tracemalloc.start()
+    lat: List[float] = []
+    t0 = time.perf_counter()
+    for start in range(0, len(queries), batch):
+        chunk = queries[start : start + batch]
+        t = time.perf_counter()
+        router.search_batch(chunk, k)
+        lat.extend([(time.perf_counter() - t) * 1000.0] * len(chunk))
+    wall = time.perf_counter() - t0
+    peak_traced = tracemalloc.get_traced_memory()[1] / 2**20 if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    if router.prefetcher is not None:
+        router.prefetcher.wait_idle()
+        router.prefetcher.close()
+
+    snap = router.metrics_snapshot()
+    n = max(snap["total_queries"], 1)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if lat else (0.0, 0.0, 0.0)
+    return {
+        "queries": len(queries),
+        "throughput_qps": len(queries) / wall if wall else 0.0,
+        "latency_ms": {"mean": float(np.mean(lat)) if lat else 0.0, "p50": p50, "p95": p95, "p99": p99},
+        "local_hit_rate": snap["local_hits"] / n,
+        "cache_hit_rate": snap["cache_hits"] / n,
+        "cloud_rate": snap["cloud_hits"] / n,
+        "prediction_accuracy": snap["prediction_accuracy"],
+        "cloud_requests": fake.stats()["requests"],
+        "prefetch_usefulness": snap["prefetch"].get("usefulness", 0.0),
+        "peak_traced_mb": peak_traced,
+        "max_rss_mb": _max_rss_mb(),
+        "memory_mb": {name: b / 2**20 for name, b in router.memory_usage().items()},
+    }
+
+
+# --- reporting -------------------------------------------------------
+_ROW = ("throughput_qps", "p50", "p99", "local_hit_rate", "cache_hit_rate", "prediction_accuracy", "max_rss_mb")
+
+
+def _flat(res: Dict[str, Any]) -> Dict[str, float]:
+    out = {key: val for key, val in res.items() if isinstance(val, (int, float))}
+    out.update(res["latency_ms"])
+    return out
+
+
+def _print(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    print(f"{'scenario':>10} " + " ".join(f"{c[:12]:>12}" for c in _ROW))
+    for name, res in results.items():
+        row = _flat(res)
+        print(f"{name:>10} " + " ".join(f"{row[c]:>12.3f}" for c in _ROW))
+        base = (baseline or {}).get("results", {}).get(name)
+        if base is not None:
+            old = _flat(base)
+            delta = [(row[c] - old[c]) / old[c] * 100.0 if old.get(c) else 0.0 for c in _ROW]
+            print(f"{'vs base':>10} " + " ".join(f"{d:>+11.1f}%" for d in delta))
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--trace", help="JSON-lines trace to replay instead of generated streams")
+    parser.add_argument("--save-trace", help="write each generated stream to <path>.<scenario>.jsonl")
+    parser.add_argument("--n", type=int, default=2000, help="queries per generated stream")
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=1, help="queries per router.search_batch call")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated cloud latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the traced heap peak (slower)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="save results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier --out run to diff against")
+    args = parser.parse_args(argv)
+
+    workload = Workload(topics=args.topics, seed=args.seed)
+    streams: Dict[str, List[str]] = {}
+    if args.trace:
+        streams["trace"] = load_trace(args.trace)
+    else:
+        for name in args.scenario:
+            streams[name] = list(workload.stream(args.n, **SCENARIOS[name]))
+            if args.save_trace:
+                save_trace(f"{args.save_trace}.{name}.jsonl", streams[name])
+
+    results = {
+        name: replay(
+            queries, workload.docs, args.k, args.batch, args.latency_ms, args.jitter_ms, args.tracemalloc
+        )
+        for name, queries in streams.items()
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2, default=float)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,168 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..src.batcher import BatcherOverloaded, MicroBatcher
+from ..src.config import INGEST_CHUNK_ROWS, INGEST_DIR
 from ..src.hybrid_router import HybridRouter
+from ..src.ingest import IngestJobs, Ingestor, iter_records, read_file
+from ..src.payloads import normalize_filter
+
+_IMPORTED_AT = time.perf_counter()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Hybrid VDB Demo")
-router = HybridRouter()
+router = HybridRouter()  # cheap: the embedding model loads in the background at startup
+startup: Dict[str, float] = {}  # "ready_ms": module import to embedder ready
+ingest_jobs = IngestJobs()
+
+
+def _search_many(items: List[Tuple[str, int, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """Batch function for the micro-batcher: one router call per distinct k and filter."""
+    groups: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+    for i, (_, k, flt) in enumerate(items):
+        groups[k, json.dumps(flt, sort_keys=True)].append(i)
+    out: List[Dict[str, Any]] = [{}] * len(items)
+    for (k, _), rows in groups.items():
+        flt = items[rows[0]][2]
+        results = router.search_batch([items[i][0] for i in rows], k=k, filter=flt)
+        for i, result in zip(rows, results):
+            out[i] = result
+    return out
+
+
+batcher = MicroBatcher(_search_many)
 
 
 class QueryRequest(BaseModel):
     query: str
     k: int = 5
+    timeout_ms: Optional[float] = None
+    filter: Optional[Dict[str, Any]] = None  # Qdrant filter or {"field": value | [values]}
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    k: int = 5
+    filter: Optional[Dict[str, Any]] = None
+
+
+class IngestRequest(BaseModel):
+    path: Optional[str] = None  # file under INGEST_DIR (.ndjson / .jsonl / .npy / .npz)
+    records: Optional[List[Dict[str, Any]]] = None  # or inline {"id", "text", ...payload}
+    chunk_rows: int = INGEST_CHUNK_ROWS
+    text_field: str = "text"
+    id_field: str = "id"
+
+
+def _filter(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    try:
+        return normalize_filter(raw)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+async def _note_ready() -> None:
+    if await asyncio.get_running_loop().run_in_executor(None, router.wait_ready):
+        startup["ready_ms"] = (time.perf_counter() - _IMPORTED_AT) * 1000.0
+        logger.info("ready %.0f ms after import", startup["ready_ms"])
+
+
+@app.on_event("startup")
+async def _start_batcher() -> None:
+    router.warm_up()
+    asyncio.ensure_future(_note_ready())
+    await batcher.start()
+    router.maintenance.start()
+
+
+@app.on_event("shutdown")
+async def _stop_batcher() -> None:
+    await batcher.stop()
+    router.close()  # also hands the writer lease on when workers share a directory
 
 
 @app.post("/search")
-def search(req: QueryRequest) -> Dict[str, Any]:
-    return router.search(req.query, k=req.k)
+async def search(req: QueryRequest) -> Dict[str, Any]:
+    timeout = req.timeout_ms / 1000.0 if req.timeout_ms is not None else None
+    flt = _filter(req.filter)
+    try:
+        result = await batcher.submit((req.query, req.k, flt), timeout=timeout)
+    except BatcherOverloaded as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="search deadline exceeded")
+    if not router.attach_metrics:
+        return result
+    return {**result, "metrics": router.metrics_snapshot()}
+
+
+@app.post("/search/batch")
+async def search_batch(req: BatchQueryRequest) -> Dict[str, Any]:
+    results = await batcher.run(router.search_batch, req.queries, req.k, _filter(req.filter))
+    if not router.attach_metrics:
+        return {"results": results}
+    return {"results": results, "metrics": router.metrics_snapshot()}
+
+
+@app.post("/ingest", status_code=202)
+def ingest(req: IngestRequest) -> Dict[str, Any]:
+    """Start streaming a file (or inline records) into the permanent tier.
+
+    Answers at once with the job id; ``GET /ingest/{job}`` reports progress.
+    """
+    if (req.path is None) == (req.records is None):
+        raise HTTPException(status_code=422, detail="give exactly one of path and records")
+    fields = dict(text_field=req.text_field, id_field=req.id_field)
+    if req.records is not None:
+        chunks = iter_records(req.records, req.chunk_rows, **fields)
+    else:
+        root = INGEST_DIR.resolve()
+        path = (root / req.path).resolve()
+        if not path.is_relative_to(root):
+            raise HTTPException(status_code=403, detail="path is outside INGEST_DIR")
+        if not path.is_file():
+            raise HTTPException(status_code=404, detail=f"no such file: {req.path}")
+        try:
+            chunks = read_file(path, req.chunk_rows, **fields)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+    job = Ingestor.for_router(router)
+    job_id = ingest_jobs.add(job)
+    job.start(chunks)
+    return {"job": job_id, **job.stats()}
+
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str) -> Dict[str, Any]:
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown ingest job")
+    return {"job": job_id, **job.stats()}
 
 
 @app.get("/health")
-def health() -> Dict[str, str]:
-    return {"status": "ok"}
+def health() -> Dict[str, Any]:
+    """Liveness: answers as soon as the process serves HTTP, model or not."""
+    return {"status": "ok", "ready": router.ready, "batcher": batcher.stats()}
+
+
+@app.get("/health/ready")
+def readiness() -> Dict[str, Any]:
+    """Readiness: 503 until the embedder can answer without loading."""
+    if not router.ready:
+        raise HTTPException(status_code=503, detail="embedder is loading")
+    return {"status": "ready", **startup}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    extra = {"batcher": batcher.stats(), "startup": startup, "ingest": ingest_jobs.stats()}
+    text = router.metrics_prometheus(extra)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
@@ -1,8 +1,9 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, NamedTuple, Optional, Sequence
 import numpy as np
 import datetime as dt
+import sys
+import time
 
 from .config import (
     EMBEDDING_DIM,
@@ -11,7 +12,11 @@ from .config import (
     WEAK_DECAY,
     MEDIUM_DECAY,
     STRONG_DECAY,
+    ANCHOR_PRUNE_STRENGTH,
+    ANCHOR_HISTORY,
 )
+from .buffers import RecentValues
+from .predictor import TransitionPredictor
 
 
 class AnchorType:
@@ -21,126 +26,543 @@ class AnchorType:
     PERMANENT = "PERMANENT"
 
 
-@dataclass
-class Prediction:
+# type codes stored in AnchorStore.type_code, ordered by strength
+_TYPES = (AnchorType.WEAK, AnchorType.MEDIUM, AnchorType.STRONG, AnchorType.PERMANENT)
+_TYPE_CODE = {t: i for i, t in enumerate(_TYPES)}
+_PERMANENT = _TYPE_CODE[AnchorType.PERMANENT]
+# strength > 25 -> MEDIUM, > 60 -> STRONG, > 90 -> PERMANENT
+_PROMOTION_BOUNDS = np.array([25.0, 60.0, 90.0])
+# per-hour decay factor indexed by type code; PERMANENT never decays
+_DECAY_BY_TYPE = np.array([WEAK_DECAY, MEDIUM_DECAY, STRONG_DECAY, 1.0])
+
+_EMA = 0.9  # centroid <- 0.9 * centroid + 0.1 * query
+
+
+def _to_datetime(ts: float) -> dt.datetime:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).replace(tzinfo=None)
+
+
+def _unit_rows(m: np.ndarray) -> tuple:
+    """Return (row-normalized float32 copy, row norms)."""
+    m = np.asarray(m, dtype="float32")
+    norms = np.linalg.norm(m, axis=1)
+    return m / (norms[:, None] + 1e-9), norms
+
+
+class Prediction(NamedTuple):
     vector: np.ndarray
-    created_at: dt.datetime = field(default_factory=dt.datetime.utcnow)
+    created_at: float  # epoch seconds
+
+
+class AnchorStore:
+    """Structure-of-arrays storage for anchors.
+
+    Centroids live in one contiguous, pre-normalized float32 matrix so that the
+    nearest anchor for a query is a single matrix-vector product. The raw
+    centroid magnitude is tracked separately in ``norm`` so ``unit * norm``
+    reproduces the un-normalized EMA centroid. Slots freed by pruning are
+    reused by later inserts.
+
+    Decay is lazy: ``strength`` holds the value as of ``last_hit`` and the
+    current value is ``strength * decay_per_hour ** hours_since_last_hit``
+    (``current_strength``), so nothing has to sweep the store to keep it
+    correct. Every hit first settles the decayed value, then adds to it.
+
+    Only the last ``history`` query texts of each anchor are kept, so an
+    anchor costs the same after a million hits as after one.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = 64, history: int = ANCHOR_HISTORY):
+        self.dim = dim
+        self.size = 0  # high-water mark; slots >= size were never used
+        self.unit = np.zeros((capacity, dim), dtype="float32")
+        self.norm = np.zeros(capacity, dtype="float32")
+        self.strength = np.zeros(capacity, dtype="float64")
+        self.type_code = np.zeros(capacity, dtype="int8")
+        self.hit_count = np.zeros(capacity, dtype="int64")
+        self.last_hit = np.zeros(capacity, dtype="float64")
+        self.anchor_id = np.full(capacity, -1, dtype="int64")
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.history = RecentValues(capacity, history)
+        self.predictions: List[List[Prediction]] = [[] for _ in range(capacity)]
+        self._pred_bytes = 0  # prediction vector bytes, kept by ``set_predictions``
+        self._free: List[int] = []
+
+    @property
+    def capacity(self) -> int:
+        return self.unit.shape[0]
+
+    def _grow(self) -> None:
+        new_cap = self.capacity * 2
+        for name in ("unit", "norm", "strength", "type_code", "hit_count", "last_hit", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((new_cap,) + old.shape[1:], dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+        ids = np.full(new_cap, -1, dtype="int64")
+        ids[: self.size] = self.anchor_id[: self.size]
+        self.anchor_id = ids
+        self.history.grow(new_cap)
+        self.predictions.extend([] for _ in range(new_cap - len(self.predictions)))
+
+    def allocate(self, anchor_id: int, unit: np.ndarray, norm: float, now: float) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            slot = self.size
+            self.size += 1
+        self.unit[slot] = unit
+        self.norm[slot] = norm
+        self.strength[slot] = 15.0
+        self.type_code[slot] = _TYPE_CODE[AnchorType.WEAK]
+        self.hit_count[slot] = 0
+        self.last_hit[slot] = now
+        self.anchor_id[slot] = anchor_id
+        self.alive[slot] = True
+        self.history.clear(slot)
+        self.set_predictions(slot, [])
+        return slot
+
+    def release(self, slots: np.ndarray) -> None:
+        self.alive[slots] = False
+        self.anchor_id[slots] = -1
+        for s in slots.tolist():
+            self.history.clear(s)
+            self.set_predictions(s, [])
+            self._free.append(s)
+
+    def set_predictions(self, slot: int, preds: List[Prediction]) -> None:
+        self._pred_bytes += sum(p.vector.nbytes for p in preds)
+        self._pred_bytes -= sum(p.vector.nbytes for p in self.predictions[slot])
+        self.predictions[slot] = preds
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.unit, self.norm, self.strength, self.type_code, self.hit_count,
+                  self.last_hit, self.anchor_id, self.alive)
+        return sum(a.nbytes for a in arrays) + self.history.nbytes + self._pred_bytes
+
+    def similarities(self, q_units: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each (unit) query row against every slot.
+
+        Dead slots score -inf so they never win an argmax.
+        """
+        sims = q_units @ self.unit[: self.size].T
+        sims[:, ~self.alive[: self.size]] = -np.inf
+        return sims
+
+    def current_strength(self, slots: np.ndarray, now: float) -> np.ndarray:
+        """Decayed strength of ``slots`` at time ``now``."""
+        hours = np.maximum((now - self.last_hit[slots]) / 3600.0, 0.0)
+        return self.strength[slots] * _DECAY_BY_TYPE[self.type_code[slots]] ** hours
+
+    def settle(self, slots: np.ndarray, now: float) -> None:
+        """Fold the decay since the last hit into ``strength``; restart the clock."""
+        self.strength[slots] = self.current_strength(slots, now)
+        self.last_hit[slots] = now
+
+    def promote(self, slots: np.ndarray) -> None:
+        """Vectorized ``Anchor.promotion_check`` over ``slots``."""
+        self.type_code[slots] = np.searchsorted(
+            _PROMOTION_BOUNDS, self.strength[slots], side="left"
+        )
+
+    def ema_update(self, slots: np.ndarray, q_units: np.ndarray, q_norms: np.ndarray) -> None:
+        """Apply the centroid EMA for every (slot, query) pair in order.
+
+        A slot hit m times in one call ends at
+        ``0.9**m * c + sum_j 0.1 * 0.9**(m-1-j) * q_j`` which is what applying the
+        single-query update m times in sequence produces.
+        """
+        uniq, inv, counts = np.unique(slots, return_inverse=True, return_counts=True)
+        order = np.argsort(inv, kind="stable")
+        starts = np.cumsum(counts) - counts
+        pos = np.empty(len(slots), dtype="int64")
+        pos[order] = np.arange(len(slots)) - np.repeat(starts, counts)
+        weight = (1.0 - _EMA) * _EMA ** (counts[inv] - 1 - pos)
+        keep = _EMA ** counts
+
+        raw = self.unit[uniq] * (self.norm[uniq] * keep)[:, None]
+        np.add.at(raw, inv, q_units * (q_norms * weight)[:, None])
+        unit, norms = _unit_rows(raw)
+        self.unit[uniq] = unit
+        self.norm[uniq] = norms
+
+
+class PredictionIndex:
+    """All live prediction vectors in one normalized matrix.
+
+    Row ``i`` belongs to the anchor stored in slot ``owner[i]``. Replacing an
+    anchor's predictions frees its old rows and reuses free rows for the new
+    ones, so the matrix only grows with the peak number of live predictions.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = 256):
+        self.dim = dim
+        self.size = 0
+        self.unit = np.zeros((capacity, dim), dtype="float32")
+        self.owner = np.full(capacity, -1, dtype="int64")
+        self.alive = np.zeros(capacity, dtype=bool)
+        self._rows: Dict[int, np.ndarray] = {}  # anchor slot -> row indices
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return self.size - len(self._free)
+
+    def _grow(self, needed: int) -> None:
+        new_cap = self.unit.shape[0]
+        while new_cap < needed:
+            new_cap *= 2
+        unit = np.zeros((new_cap, self.dim), dtype="float32")
+        unit[: self.size] = self.unit[: self.size]
+        owner = np.full(new_cap, -1, dtype="int64")
+        owner[: self.size] = self.owner[: self.size]
+        alive = np.zeros(new_cap, dtype=bool)
+        alive[: self.size] = self.alive[: self.size]
+        self.unit, self.owner, self.alive = unit, owner, alive
+
+    def replace(self, slot: int, vectors: np.ndarray) -> None:
+        self.release(slot)
+        n = len(vectors)
+        if not n:
+            return
+        reuse = [self._free.pop() for _ in range(min(n, len(self._free)))]
+        fresh = n - len(reuse)
+        if self.size + fresh > self.unit.shape[0]:
+            self._grow(self.size + fresh)
+        rows = np.array(reuse + list(range(self.size, self.size + fresh)), dtype="int64")
+        self.size += fresh
+        self.unit[rows] = _unit_rows(vectors)[0]
+        self.owner[rows] = slot
+        self.alive[rows] = True
+        self._rows[slot] = rows
+
+    def release(self, slot: int) -> None:
+        rows = self._rows.pop(slot, None)
+        if rows is None:
+            return
+        self.alive[rows] = False
+        self.owner[rows] = -1
+        self._free.extend(rows.tolist())
+
+    @property
+    def nbytes(self) -> int:
+        return self.unit.nbytes + self.owner.nbytes + self.alive.nbytes
+
+    def best(self, q_units: np.ndarray) -> tuple:
+        """Return (owner slot, similarity) of the best prediction per query."""
+        sims = q_units @ self.unit[: self.size].T
+        sims[:, ~self.alive[: self.size]] = -np.inf
+        rows = np.argmax(sims, axis=1)
+        return self.owner[rows], sims[np.arange(len(q_units)), rows]
+
+
+class PredictionView(NamedTuple):
+    """Frozen copy of the live predictions, for matching on reader threads."""
+
+    unit: np.ndarray        # (n, dim) unit prediction vectors
+    anchor_ids: np.ndarray  # owning anchor id per row
 
 
-@dataclass
 class Anchor:
-    id: int
-    centroid: np.ndarray
-    type: str = AnchorType.WEAK
-    strength: float = 15.0
-    hit_count: int = 0
-    query_history: List[str] = field(default_factory=list)
-    last_hit_time: dt.datetime = field(default_factory=dt.datetime.utcnow)
-    predictions: List[Prediction] = field(default_factory=list)
+    """Handle onto one anchor row of an ``AnchorStore``."""
+
+    __slots__ = ("id", "_store", "_slot")
+
+    def __init__(self, id: int, store: AnchorStore, slot: int):
+        self.id = id
+        self._store = store
+        self._slot = slot
+
+    @property
+    def centroid(self) -> np.ndarray:
+        s = self._store
+        return s.unit[self._slot] * s.norm[self._slot]
+
+    @property
+    def type(self) -> str:
+        return _TYPES[self._store.type_code[self._slot]]
+
+    @type.setter
+    def type(self, value: str) -> None:
+        self._store.type_code[self._slot] = _TYPE_CODE[value]
+
+    @property
+    def strength(self) -> float:
+        """Current strength, decayed since the last hit."""
+        return float(self._store.current_strength(self._slot, time.time()))
+
+    @strength.setter
+    def strength(self, value: float) -> None:
+        self._store.settle(self._slot, time.time())
+        self._store.strength[self._slot] = value
+
+    @property
+    def hit_count(self) -> int:
+        return int(self._store.hit_count[self._slot])
+
+    @hit_count.setter
+    def hit_count(self, value: int) -> None:
+        self._store.hit_count[self._slot] = value
+
+    @property
+    def last_hit_time(self) -> dt.datetime:
+        return _to_datetime(self._store.last_hit[self._slot])
+
+    @property
+    def query_history(self) -> List[str]:
+        """The most recent query texts (up to ``ANCHOR_HISTORY``), oldest first."""
+        return self._store.history.get(self._slot)
+
+    @property
+    def predictions(self) -> List[Prediction]:
+        return self._store.predictions[self._slot]
+
+    @predictions.setter
+    def predictions(self, preds: List[Prediction]) -> None:
+        self._store.set_predictions(self._slot, preds)
 
     def promotion_check(self) -> None:
-        if self.strength > 90:
-            self.type = AnchorType.PERMANENT
-        elif self.strength > 60:
-            self.type = AnchorType.STRONG
-        elif self.strength > 25:
-            self.type = AnchorType.MEDIUM
-        else:
-            self.type = AnchorType.WEAK
+        self._store.promote(np.array([self._slot]))
+
+    def __repr__(self) -> str:
+        return f"Anchor(id={self.id}, type={self.type}, strength={self.strength:.1f})"
 
 
 class AnchorSystem:
-    """Core 'brain' that tracks anchors and generates predictions."""
+    """Core 'brain' that tracks anchors and generates predictions.
 
-    def __init__(self):
+    Every method mutates shared arrays and must run on one thread at a time,
+    except ``match_predictions``: it only reads ``prediction_view``, an
+    immutable copy of the live predictions that ``publish`` refreshes, so
+    concurrent searches can test prediction hits while the writer updates
+    anchors. ``credit_predictions`` then applies the rewards on the writer.
+    ``publish`` copies only when predictions changed and can be rate
+    limited, so a stream of searches does not copy them every time.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.store = AnchorStore(dim)
+        self.prediction_index = PredictionIndex(dim)
+        self.predictor = TransitionPredictor(dim)
         self.anchors: Dict[int, Anchor] = {}
         self._next_id = 0
+        self.prediction_view = PredictionView(
+            np.zeros((0, dim), dtype="float32"), np.zeros(0, dtype="int64")
+        )
+        self._dirty = False  # predictions changed since the last publish
+        self._published_at = float("-inf")
+        self._prune_cursor = 0
+        self.pruned = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Anchor rows, prediction rows and handles (the predictor is separate)."""
+        view = self.prediction_view
+        handle = sys.getsizeof(Anchor(0, self.store, 0))
+        return (
+            self.store.nbytes
+            + self.prediction_index.nbytes
+            + view.unit.nbytes + view.anchor_ids.nbytes
+            + sys.getsizeof(self.anchors) + len(self.anchors) * handle
+        )
 
     # --- utility -----------------------------------------------------
-    def _cosine_distance(self, a: np.ndarray, b: np.ndarray) -> float:
-        a = a.astype("float32")
-        b = b.astype("float32")
-        return 1.0 - float(np.dot(a, b) / ((np.linalg.norm(a) * np.linalg.norm(b)) + 1e-9))
+    def _new_anchor(self, unit: np.ndarray, norm: float, text: str, now: float) -> Anchor:
+        anchor_id = self._next_id
+        self._next_id += 1
+        slot = self.store.allocate(anchor_id, unit, norm, now)
+        self.store.history.push(slot, text)
+        a = Anchor(anchor_id, self.store, slot)
+        self.anchors[anchor_id] = a
+        return a
 
     # --- main API ----------------------------------------------------
     def process_query(self, query_vec: np.ndarray, query_text: str) -> Anchor:
         """Either strengthen an existing anchor or create a new one."""
         if query_vec.ndim == 2:
             query_vec = query_vec[0]
+        return self.process_queries(query_vec[None, :], [query_text])[0]
 
-        # find closest anchor
-        best = None
-        best_dist = 1e9
-        for a in self.anchors.values():
-            d = self._cosine_distance(a.centroid, query_vec)
-            if d < best_dist:
-                best = a
-                best_dist = d
-
-        if best is not None and best_dist < ANCHOR_DISTANCE_THRESHOLD:
-            # strengthen existing anchor
-            best.strength += 5.0
-            best.hit_count += 1
-            best.centroid = 0.9 * best.centroid + 0.1 * query_vec
-            best.query_history.append(query_text)
-            best.last_hit_time = dt.datetime.utcnow()
-            best.promotion_check()
-            return best
-
-        # otherwise create new anchor
-        anchor_id = self._next_id
-        self._next_id += 1
-        a = Anchor(id=anchor_id, centroid=query_vec, query_history=[query_text])
-        self.anchors[a.id] = a
-        return a
+    def process_queries(self, query_vecs: np.ndarray, query_texts: Sequence[str]) -> List[Anchor]:
+        """Batched ``process_query``.
+
+        All queries are scored against the anchors that exist at the start of
+        the batch with one matrix product; anchors created earlier in the same
+        batch are also considered, so repeated new topics within a batch
+        collapse into one anchor just as they would sequentially.
+        """
+        store = self.store
+        q_units, q_norms = _unit_rows(np.atleast_2d(query_vecs))
+        now = time.time()
+
+        if store.size:
+            sims = store.similarities(q_units)
+            best_slots = np.argmax(sims, axis=1)
+            best_sims = sims[np.arange(len(q_units)), best_slots]
+        else:
+            best_slots = np.zeros(len(q_units), dtype="int64")
+            best_sims = np.full(len(q_units), -np.inf)
+
+        result: List[Anchor] = []
+        hit_rows: List[int] = []
+        hit_slots: List[int] = []
+        created: List[Anchor] = []
+        for i, text in enumerate(query_texts):
+            slot, sim = int(best_slots[i]), float(best_sims[i])
+            if created:
+                fresh = np.array([a._slot for a in created])
+                fresh_sims = store.unit[fresh] @ q_units[i]
+                j = int(np.argmax(fresh_sims))
+                if fresh_sims[j] > sim:
+                    slot, sim = int(fresh[j]), float(fresh_sims[j])
+
+            if 1.0 - sim < ANCHOR_DISTANCE_THRESHOLD:
+                # strengthen existing anchor
+                hit_rows.append(i)
+                hit_slots.append(slot)
+                store.history.push(slot, text)
+                result.append(self.anchors[int(store.anchor_id[slot])])
+            else:
+                a = self._new_anchor(q_units[i], float(q_norms[i]), text, now)
+                created.append(a)
+                result.append(a)
+
+        if hit_slots:
+            slots = np.asarray(hit_slots, dtype="int64")
+            rows = np.asarray(hit_rows, dtype="int64")
+            store.settle(np.unique(slots), now)
+            np.add.at(store.strength, slots, 5.0)
+            np.add.at(store.hit_count, slots, 1)
+            store.ema_update(slots, q_units[rows], q_norms[rows])
+            store.promote(np.unique(slots))
+        self.predictor.observe([a.id for a in result], q_units)
+        return result
 
-    def generate_predictions(self, anchor: Anchor, k: int = 3) -> List[Prediction]:
-        """Generate K synthetic prediction vectors around the anchor centroid.
+    def generate_predictions(
+        self, anchor: Anchor, k: int = 3, query_vec: Optional[np.ndarray] = None
+    ) -> List[Prediction]:
+        """Predict up to K vectors for the query that will follow one in ``anchor``.
 
-        In a production system these would come from actual semantic neighbours
-        (e.g., via k‑NN on historical queries). Here we simply sample around the
-        centroid with small Gaussian noise.
+        Predictions come from ``self.predictor``: successors of similar past
+        queries in this anchor, then centroids of the anchors users moved to
+        next. ``query_vec`` defaults to the anchor's latest query. An anchor
+        with nothing learned yet predicts its own centroid (a repeat).
         """
-        center = anchor.centroid
-        preds = []
-        for _ in range(k):
-            noise = np.random.normal(0, 0.05, size=center.shape).astype("float32")
-            preds.append(Prediction(vector=center + noise))
+        q = _unit_rows(query_vec[None, :])[0][0] if query_vec is not None else None
+        vectors = self.predictor.predict(anchor.id, k, query=q, centroid_of=self._unit_centroid)
+        if not len(vectors):
+            vectors = self.store.unit[anchor._slot][None, :].copy()
+        now = time.time()
+        preds = [Prediction(v, now) for v in vectors]
         anchor.predictions = preds
+        self.prediction_index.replace(anchor._slot, vectors)
+        self._dirty = True
         return preds
 
+    def _unit_centroid(self, anchor_id: int) -> Optional[np.ndarray]:
+        a = self.anchors.get(anchor_id)
+        return self.store.unit[a._slot] if a is not None else None
+
     def check_prediction_hit(self, query_vec: np.ndarray) -> Optional[Anchor]:
         if query_vec.ndim == 2:
             query_vec = query_vec[0]
+        return self.check_prediction_hits(query_vec[None, :])[0]
+
+    def check_prediction_hits(self, query_vecs: np.ndarray) -> List[Optional[Anchor]]:
+        """Batched prediction check: one matrix product for all queries.
+
+        Each query is credited to the anchor owning its best-scoring prediction
+        when that similarity reaches ``PREDICTION_HIT_THRESHOLD``. Runs on the
+        writer, so it matches the live ``prediction_index`` rather than the
+        published view.
+        """
+        query_vecs = np.atleast_2d(query_vecs)
+        if not len(self.prediction_index):
+            return [None] * len(query_vecs)
+        owners, sims = self.prediction_index.best(_unit_rows(query_vecs)[0])
+        hit = sims >= PREDICTION_HIT_THRESHOLD
+        ids = self.store.anchor_id[owners]
+        matched = [int(a) if h else None for a, h in zip(ids.tolist(), hit.tolist())]
+        return self.credit_predictions(matched)
+
+    def publish(self, min_interval: float = 0.0) -> bool:
+        """Freeze the live predictions into ``prediction_view`` if they
+        changed, unless the last publish is younger than ``min_interval``
+        seconds; returns whether it did."""
+        now = time.monotonic()
+        if not self._dirty or now - self._published_at < min_interval:
+            return False
+        idx = self.prediction_index
+        live = np.flatnonzero(idx.alive[: idx.size])
+        # fancy indexing copies: the view shares nothing with the writer
+        self.prediction_view = PredictionView(idx.unit[live], self.store.anchor_id[idx.owner[live]])
+        self._dirty = False
+        self._published_at = now
+        return True
 
-        for a in self.anchors.values():
-            for p in a.predictions:
-                d = self._cosine_distance(p.vector, query_vec)
-                sim = 1.0 - d
-                if sim >= PREDICTION_HIT_THRESHOLD:
-                    # reward the anchor
-                    a.strength += 10.0
-                    a.hit_count += 1
-                    a.last_hit_time = dt.datetime.utcnow()
-                    a.promotion_check()
-                    return a
-        return None
+    def match_predictions(self, query_vecs: np.ndarray) -> List[Optional[int]]:
+        """Id of the anchor whose prediction each query hit, or None (read-only)."""
+        query_vecs = np.atleast_2d(query_vecs)
+        view = self.prediction_view
+        if not len(view.anchor_ids):
+            return [None] * len(query_vecs)
+        q_units, _ = _unit_rows(query_vecs)
+        sims = q_units @ view.unit.T
+        rows = np.argmax(sims, axis=1)
+        hit = sims[np.arange(len(q_units)), rows] >= PREDICTION_HIT_THRESHOLD
+        return [int(view.anchor_ids[r]) if h else None for r, h in zip(rows.tolist(), hit.tolist())]
+
+    def credit_predictions(self, anchor_ids: Sequence[Optional[int]]) -> List[Optional[Anchor]]:
+        """Reward the anchors of matched predictions; pruned ones are skipped."""
+        out = [self.anchors.get(aid) if aid is not None else None for aid in anchor_ids]
+        slots = np.array([a._slot for a in out if a is not None], dtype="int64")
+        if slots.size:
+            store = self.store
+            store.settle(np.unique(slots), time.time())
+            np.add.at(store.strength, slots, 10.0)
+            np.add.at(store.hit_count, slots, 1)
+            store.promote(np.unique(slots))
+        return out
 
     def decay(self) -> None:
-        """Apply strength decay and prune very weak anchors."""
-        now = dt.datetime.utcnow()
-        to_delete = []
-        for a in self.anchors.values():
-            age_hours = (now - a.last_hit_time).total_seconds() / 3600.0
-            if a.type == AnchorType.PERMANENT:
-                continue
-            if a.type == AnchorType.WEAK:
-                a.strength *= WEAK_DECAY ** max(age_hours, 0.0)
-            elif a.type == AnchorType.MEDIUM:
-                a.strength *= MEDIUM_DECAY ** max(age_hours, 0.0)
-            elif a.type == AnchorType.STRONG:
-                a.strength *= STRONG_DECAY ** max(age_hours, 0.0)
-            if a.strength < 5.0:
-                to_delete.append(a.id)
-        for aid in to_delete:
+        """Prune every anchor whose decayed strength has fallen too low.
+
+        Strength decays lazily (see ``AnchorStore``), so this only reclaims
+        memory; ``prune_step`` does the same work in bounded slices.
+        """
+        n = self.store.size
+        if n:
+            self._prune(np.arange(n), time.time())
+        self._prune_cursor = 0
+
+    def prune_step(self, max_slots: int = 256) -> bool:
+        """Prune the next ``max_slots`` slots; True once a full pass is done."""
+        n = self.store.size
+        start = self._prune_cursor if self._prune_cursor < n else 0
+        stop = min(start + max_slots, n)
+        if stop > start:
+            self._prune(np.arange(start, stop), time.time())
+        self._prune_cursor = stop if stop < n else 0
+        return stop >= n
+
+    def _prune(self, slots: np.ndarray, now: float) -> int:
+        store = self.store
+        slots = slots[store.alive[slots] & (store.type_code[slots] != _PERMANENT)]
+        doomed = slots[store.current_strength(slots, now) < ANCHOR_PRUNE_STRENGTH]
+        if not doomed.size:
+            return 0
+        doomed_ids = store.anchor_id[doomed].tolist()
+        for aid in doomed_ids:
             del self.anchors[aid]
+        self.predictor.forget(doomed_ids)
+        for slot in doomed.tolist():
+            self.prediction_index.release(slot)
+        store.release(doomed)
+        self.pruned += len(doomed_ids)
+        # the view may still name pruned anchors until the next publish;
+        # credit_predictions skips them
+        self._dirty = True
+        return len(doomed_ids)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from .config import (
+    BATCH_MAX_QUEUE,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    BATCH_WORKERS,
+    REQUEST_TIMEOUT_MS,
+)
+
+
+class BatcherOverloaded(RuntimeError):
+    """The request queue is full; the caller should shed load (HTTP 503)."""
+
+
+class _Pending(NamedTuple):
+    item: Any
+    future: asyncio.Future
+    deadline: float
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into batches for ``fn``.
+
+    ``submit`` queues one item and awaits its result. A background task
+    takes the first waiting item, keeps collecting until ``max_batch_size``
+    items or ``max_wait_ms`` have passed, and calls ``fn(items)`` (which
+    must return one result per item) on a pool of ``workers`` threads, so
+    the event loop stays free. With ``workers > 1`` up to that many batches
+    run at once and ``fn`` must be thread-safe (``HybridRouter.search_batch``
+    is); with one worker ``fn`` never runs concurrently with itself. A new
+    batch only starts collecting once a worker is free, so under load the
+    batches grow instead of queueing up behind each other.
+
+    Backpressure: at most ``max_queue`` items wait; beyond that ``submit``
+    raises ``BatcherOverloaded`` immediately. Every item carries a deadline;
+    items that expire while queued are dropped before ``fn`` sees them and
+    their callers get ``asyncio.TimeoutError``.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        max_queue: int = BATCH_MAX_QUEUE,
+        timeout_ms: float = REQUEST_TIMEOUT_MS,
+        workers: int = BATCH_WORKERS,
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.timeout = timeout_ms / 1000.0
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batcher")
+        self.counters = {"batches": 0, "items": 0, "rejected": 0, "expired": 0, "errors": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    # --- lifecycle ---------------------------------------------------
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._slots = asyncio.Semaphore(self.workers)
+            self._task = asyncio.get_running_loop().create_task(self._worker())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._inflight):
+            task.cancel()
+        while self._queue is not None and not self._queue.empty():
+            p = self._queue.get_nowait()
+            if not p.future.done():
+                p.future.cancel()
+
+    # --- requests ----------------------------------------------------
+    async def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Queue ``item`` and wait (at most ``timeout`` seconds) for its result."""
+        if self._task is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else timeout
+        pending = _Pending(item, loop.create_future(), loop.time() + timeout)
+        try:
+            self._queue.put_nowait(pending)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise BatcherOverloaded(f"more than {self.max_queue} requests queued") from None
+        return await asyncio.wait_for(pending.future, timeout)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the batch pool (serialized with the batches
+        only when ``workers == 1``)."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # --- worker ------------------------------------------------------
+    async def _collect(self) -> List[_Pending]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        flush_at = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            now = loop.time()
+            live: List[_Pending] = []
+            for p in batch:
+                if p.future.done():  # caller timed out or went away
+                    self.counters["expired"] += 1
+                elif p.deadline <= now:
+                    self.counters["expired"] += 1
+                    p.future.set_exception(asyncio.TimeoutError())
+                else:
+                    live.append(p)
+            if not live:
+                self._slots.release()
+                continue
+            self.counters["batches"] += 1
+            self.counters["items"] += len(live)
+            task = loop.create_task(self._dispatch(live))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, live: List[_Pending]) -> None:
+        try:
+            results = await self.run(self.fn, [p.item for p in live])
+        except asyncio.CancelledError:
+            for p in live:
+                if not p.future.done():
+                    p.future.cancel()
+            raise
+        except Exception as exc:
+            self.counters["errors"] += 1
+            for p in live:
+                if not p.future.done():
+                    p.future.set_exception(exc)
+            return
+        finally:
+            self._slots.release()
+        for p, result in zip(live, results):
+            if not p.future.done():
+                p.future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        c: Dict[str, float] = dict(self.counters)
+        c["queued"] = self._queue.qsize() if self._queue is not None else 0
+        c["running"] = len(self._inflight)
+        c["avg_batch_size"] = c["items"] / c["batches"] if c["batches"] else 0.0
+        return c
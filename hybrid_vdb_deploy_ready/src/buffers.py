@@ -0,0 +1,372 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import copy
+import sys
+import tempfile
+import numpy as np
+
+from .config import DATA_DIR, EMBEDDING_DIM, VECTOR_DTYPE
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v, axis=1, keepdims=True)
+    norm[norm == 0] = 1.0
+    return v / norm
+
+
+def _topk(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first, in O(N + k log k)."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype="int64")
+    if k < n:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _topk_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise ``_topk`` of an ``(m, n)`` score matrix; returns ``(m, min(k, n))``."""
+    m, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((m, 0), dtype="int64")
+    if k < n:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(n), (m, n)).copy()
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def _search_batch(
+    scores_fn,
+    n_rows: int,
+    queries: np.ndarray,
+    k: int,
+    exclude: Optional[np.ndarray] = None,
+    max_cells: int = 1 << 24,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-``k`` rows for every query, scoring ``max_cells`` scores at a time.
+
+    ``scores_fn(q_block)`` returns the ``(len(q_block), n_rows)`` scores.
+    Rows flagged in ``exclude`` score ``-inf``; callers drop non-finite
+    scores, which also pad results when fewer than ``k`` rows qualify.
+    """
+    m = queries.shape[0]
+    kk = min(k, n_rows)
+    idx = np.empty((m, kk), dtype="int64")
+    out = np.empty((m, kk), dtype="float32")
+    step = max(1, max_cells // max(n_rows, 1))
+    for start in range(0, m, step):
+        scores = scores_fn(queries[start : start + step])
+        if exclude is not None:
+            scores[:, exclude] = -np.inf
+        top = _topk_rows(scores, kk)
+        idx[start : start + top.shape[0]] = top
+        out[start : start + top.shape[0]] = np.take_along_axis(scores, top, axis=1)
+    return idx, out
+
+
+def _scan(data: np.ndarray, q: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+    """``data @ q`` in float32; non-float32 rows are upcast block by block."""
+    q = np.asarray(q, dtype="float32")
+    if data.dtype == np.float32:
+        return data @ q
+    out = np.empty(data.shape[0], dtype="float32")
+    for start in range(0, data.shape[0], block_rows):
+        block = data[start : start + block_rows].astype("float32")
+        out[start : start + block.shape[0]] = block @ q
+    return out
+
+
+def _scan_batch(data: np.ndarray, queries: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+    """``queries @ data.T`` as an ``(m, n)`` float32 matrix (one GEMM)."""
+    queries = np.asarray(queries, dtype="float32")
+    if data.dtype == np.float32:
+        return queries @ data.T
+    out = np.empty((queries.shape[0], data.shape[0]), dtype="float32")
+    for start in range(0, data.shape[0], block_rows):
+        block = data[start : start + block_rows].astype("float32")
+        out[:, start : start + block.shape[0]] = queries @ block.T
+    return out
+
+
+class VectorBuffer:
+    """Growable matrix of unit-normalized vectors.
+
+    Rows are normalized once at insert time and appended into a buffer whose
+    capacity doubles when full, so ``add`` is amortized O(1) per vector and a
+    cosine search is a single matrix-vector product. ``dtype="float16"``
+    halves resident memory; scoring then upcasts in fixed-size blocks.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, dtype: str = VECTOR_DTYPE, capacity: int = 1024):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.size = 0
+        self._data = np.empty((max(capacity, 1), dim), dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[: self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def snapshot(self) -> "VectorBuffer":
+        """Frozen view of the current rows, safe to search while ``add`` runs.
+
+        ``add`` only writes past ``size`` and ``reserve`` copies into a new
+        array, so the rows a snapshot can see are never modified.
+        """
+        return copy.copy(self)
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self._data.shape[0]:
+            return
+        new_cap = self._data.shape[0]
+        while new_cap < capacity:
+            new_cap *= 2
+        data = np.empty((new_cap, self.dim), dtype=self.dtype)
+        data[: self.size] = self._data[: self.size]
+        self._data = data
+
+    def add(self, vecs: np.ndarray, normalized: bool = False) -> None:
+        vecs = np.asarray(vecs, dtype="float32")
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        if not normalized:
+            vecs = _normalize(vecs)
+        n = vecs.shape[0]
+        self.reserve(self.size + n)
+        self._data[self.size : self.size + n] = vecs
+        self.size += n
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        """Inner product of every stored row with the unit query ``q``."""
+        return _scan(self.view, q)
+
+    def scores_at(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Like ``scores`` but only for the given row positions."""
+        block = self._data[rows]
+        if self.dtype != np.float32:
+            block = block.astype("float32")
+        return block @ np.asarray(q, dtype="float32")
+
+    def rows(self, idx: np.ndarray) -> np.ndarray:
+        return self._data[idx].astype("float32", copy=False)
+
+    def search(
+        self, q: np.ndarray, k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` rows by inner product, optionally restricted to ``rows``."""
+        if rows is None:
+            scores = self.scores(q)
+            idx = _topk(scores, k)
+            return idx, scores[idx]
+        scores = self.scores_at(q, rows)
+        top = _topk(scores, k)
+        return rows[top], scores[top]
+
+    def scores_batch(self, queries: np.ndarray) -> np.ndarray:
+        return _scan_batch(self.view, queries)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``(m, k)`` top rows and scores for ``m`` unit queries."""
+        return _search_batch(self.scores_batch, len(self), queries, k, exclude)
+
+
+class SegmentedBuffer:
+    """Read-only mapped segments followed by an in-memory ``VectorBuffer`` tail.
+
+    Used by persistent tiers: sealed segments are ``np.memmap`` views of the
+    files on disk, so opening an index does not copy them and their pages are
+    shared with the OS page cache. Row positions run through the segments in
+    order and then through the tail.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, dtype: str = VECTOR_DTYPE, segments=()):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._segs: List[np.ndarray] = []
+        self._starts = np.zeros(1, dtype="int64")  # start row of each segment + end
+        self._tail = VectorBuffer(dim, dtype)
+        for seg in segments:
+            self._push(seg)
+
+    def _push(self, seg: np.ndarray) -> None:
+        self._segs.append(seg)
+        self._starts = np.append(self._starts, self._starts[-1] + seg.shape[0])
+
+    def __len__(self) -> int:
+        return int(self._starts[-1]) + len(self._tail)
+
+    @property
+    def view(self) -> np.ndarray:
+        """All rows as one array (a copy when there is more than one part)."""
+        parts = self._segs + [self._tail.view]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes; mapped segments live in the page cache."""
+        return self._tail.nbytes
+
+    def snapshot(self) -> "SegmentedBuffer":
+        """Frozen view: the sealed segments so far plus a snapshot of the tail."""
+        snap = copy.copy(self)
+        snap._segs = list(self._segs)
+        snap._tail = self._tail.snapshot()
+        return snap
+
+    def add(self, vecs: np.ndarray, normalized: bool = False) -> None:
+        self._tail.add(vecs, normalized=normalized)
+
+    def freeze_tail(self, seg: np.ndarray) -> None:
+        """Replace the tail rows with ``seg``, the same rows persisted to disk."""
+        assert seg.shape[0] == len(self._tail)
+        self._push(seg)
+        self._tail = VectorBuffer(self.dim, self.dtype)
+
+    def _locate(self, rows: np.ndarray):
+        part = np.searchsorted(self._starts, rows, side="right") - 1
+        for p in np.unique(part).tolist():
+            mask = part == p
+            data = self._segs[p] if p < len(self._segs) else self._tail.view
+            yield mask, data, rows[mask] - self._starts[min(p, len(self._segs))]
+
+    def rows(self, idx: np.ndarray) -> np.ndarray:
+        idx = np.asarray(idx, dtype="int64")
+        out = np.empty((idx.shape[0], self.dim), dtype="float32")
+        for mask, data, local in self._locate(idx):
+            out[mask] = data[local]
+        return out
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        parts = [_scan(seg, q) for seg in self._segs] + [self._tail.scores(q)]
+        return np.concatenate(parts)
+
+    def scores_at(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.rows(rows) @ np.asarray(q, dtype="float32")
+
+    def search(
+        self, q: np.ndarray, k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(q) if rows is None else self.scores_at(q, rows)
+        top = _topk(scores, k)
+        return (top if rows is None else rows[top]), scores[top]
+
+    def scores_batch(self, queries: np.ndarray) -> np.ndarray:
+        parts = [_scan_batch(seg, queries) for seg in self._segs] + [self._tail.scores_batch(queries)]
+        return np.concatenate(parts, axis=1)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return _search_batch(self.scores_batch, len(self), queries, k, exclude)
+
+
+class MappedRows:
+    """Growable float32 row store backed by a memory-mapped file.
+
+    Used to keep full-precision vectors for re-ranking off the heap: the OS
+    pages in only the rows that are actually read.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, path: Optional[str] = None, capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        if path is None:
+            DATA_DIR.mkdir(exist_ok=True, parents=True)
+            self._file = tempfile.TemporaryFile(dir=DATA_DIR)
+        else:
+            self._file = open(path, "w+b")
+        self._map = None
+        self._capacity = 0
+        self.reserve(capacity)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._map[: self.size]
+
+    def snapshot(self) -> "MappedRows":
+        return copy.copy(self)
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self._capacity:
+            return
+        new_cap = max(self._capacity, 1)
+        while new_cap < capacity:
+            new_cap *= 2
+        if self._map is not None:
+            self._map.flush()
+        self._file.truncate(new_cap * self.dim * 4)
+        self._map = np.memmap(self._file, dtype="float32", mode="r+", shape=(new_cap, self.dim))
+        self._capacity = new_cap
+
+    def add(self, vecs: np.ndarray) -> None:
+        n = vecs.shape[0]
+        self.reserve(self.size + n)
+        self._map[self.size : self.size + n] = vecs
+        self.size += n
+
+    def rows(self, idx: np.ndarray) -> np.ndarray:
+        return np.asarray(self._map[idx])
+
+
+class RecentValues:
+    """The last ``width`` values pushed to each row, in a fixed-size ring.
+
+    Memory is ``rows * width`` references however many values arrive. The
+    bytes of the values held are counted as they are pushed and replaced,
+    so ``nbytes`` costs nothing to read.
+    """
+
+    def __init__(self, rows: int, width: int):
+        self.width = width
+        self._values = np.full((rows, width), None, dtype=object)
+        self._count = np.zeros(rows, dtype="int64")
+        self._value_bytes = 0
+
+    def grow(self, rows: int) -> None:
+        values = np.full((rows, self.width), None, dtype=object)
+        values[: len(self._values)] = self._values
+        count = np.zeros(rows, dtype="int64")
+        count[: len(self._count)] = self._count
+        self._values, self._count = values, count
+
+    def push(self, row: int, value: str) -> None:
+        col = self._count[row] % self.width
+        old = self._values[row, col]
+        if old is not None:
+            self._value_bytes -= sys.getsizeof(old)
+        self._values[row, col] = value
+        self._value_bytes += sys.getsizeof(value)
+        self._count[row] += 1
+
+    def clear(self, row: int) -> None:
+        self._value_bytes -= sum(sys.getsizeof(v) for v in self._values[row] if v is not None)
+        self._values[row] = None
+        self._count[row] = 0
+
+    def get(self, row: int) -> List[str]:
+        """Values of ``row``, oldest first."""
+        n = int(self._count[row])
+        start = n % self.width if n > self.width else 0
+        return [self._values[row, (start + i) % self.width] for i in range(min(n, self.width))]
+
+    @property
+    def nbytes(self) -> int:
+        """References plus the values held (a value shared elsewhere counts in full)."""
+        return self._values.nbytes + self._count.nbytes + self._value_bytes
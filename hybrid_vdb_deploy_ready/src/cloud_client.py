@@ -1,76 +1,259 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import numpy as np
+from typing import Any, Dict, List, Optional
+import asyncio
 import os
+import time
+import numpy as np
 
 try:
-    from qdrant_client import QdrantClient  # type: ignore
-    from qdrant_client.models import Filter, FieldCondition, MatchValue  # type: ignore
+    import httpx  # type: ignore
 except Exception:  # pragma: no cover - optional dependency
-    QdrantClient = None
+    httpx = None
 
-from .config import EMBEDDING_DIM
+from .config import (
+    CLOUD_MAX_BATCH,
+    CLOUD_POOL_SIZE,
+    CLOUD_RETRIES,
+    CLOUD_RETRY_BACKOFF_SEC,
+    CLOUD_TIMEOUT_SEC,
+    EMBEDDING_DIM,
+)
+from .payloads import Filter, matches, normalize_filter
 
+# responses worth another attempt; anything else 4xx is the caller's fault
+_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
 
-class CloudClient:
-    """Thin wrapper around a remote vector DB.
 
-    For the purposes of this portfolio project, the client gracefully falls
-    back to a **mock in‑memory store** if Qdrant is not configured. This
-    allows the rest of the system to run unchanged.
-    """
+class CloudError(RuntimeError):
+    """The remote VDB did not answer successfully within the retry budget."""
+
+
+class _CloudBase:
+    """Configuration, request encoding and response decoding shared by the
+    sync and async clients.
 
-    def __init__(self):
-        api_url = os.getenv("QDRANT_URL")
-        api_key = os.getenv("QDRANT_API_KEY")
-        collection = os.getenv("QDRANT_COLLECTION", "hybrid_vdb_demo")
+    Talks to the Qdrant REST API (``POST /collections/{name}/points/search/batch``)
+    and asks for payloads *and* vectors, so every hit can be written back to
+    the local tiers. A payload ``filter`` (``payloads.normalize_filter``)
+    is sent as the Qdrant JSON filter of every search in the batch.
+    Without ``QDRANT_URL`` (and no explicit ``transport``) the client falls
+    back to a **mock in‑memory store** so the rest of the system runs
+    unchanged.
+    """
 
-        self.collection_name = collection
-        if api_url and api_key and QdrantClient is not None:
-            self._mock = False
-            self.client = QdrantClient(url=api_url, api_key=api_key)
-        else:
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        collection: Optional[str] = None,
+        timeout: float = CLOUD_TIMEOUT_SEC,
+        retries: int = CLOUD_RETRIES,
+        backoff: float = CLOUD_RETRY_BACKOFF_SEC,
+        pool_size: int = CLOUD_POOL_SIZE,
+        max_batch: int = CLOUD_MAX_BATCH,
+        transport: Any = None,
+    ):
+        url = url or os.getenv("QDRANT_URL")
+        api_key = api_key or os.getenv("QDRANT_API_KEY")
+        self.collection_name = collection or os.getenv("QDRANT_COLLECTION", "hybrid_vdb_demo")
+        self.retries = retries
+        self.backoff = backoff
+        self.max_batch = max_batch
+        self.counters = {"requests": 0, "queries": 0, "retries": 0, "errors": 0}
+        self.client = None
+        self._mock = not url and transport is None
+        if self._mock:
             # Mock mode – very small in‑memory dataset
-            self._mock = True
-            self.client = None
             self._mock_vectors = np.random.randn(256, EMBEDDING_DIM).astype("float32")
             self._mock_payloads = [
                 {"id": f"doc_{i}", "text": f"Mock document {i}"} for i in range(256)
             ]
+            return
+        if httpx is None:
+            raise RuntimeError("httpx is required to talk to a remote vector DB")
+        self._client_kwargs = dict(
+            base_url=url or "http://fake-qdrant",
+            headers={"api-key": api_key} if api_key else {},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
 
-    # In a real system, query_vector would be used directly. Here we just
-    # approximate behaviour.
-    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
-        if self._mock:
-            # cosine similarity
-            q = query_vector.astype("float32")
-            if q.ndim == 1:
-                q = q[None, :]
-            v = self._mock_vectors
-            v_norm = v / (np.linalg.norm(v, axis=1, keepdims=True) + 1e-9)
-            q_norm = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-9)
-            scores = (v_norm @ q_norm.T)[:, 0]
-            idx = np.argsort(-scores)[:k]
+    @property
+    def _path(self) -> str:
+        return f"/collections/{self.collection_name}/points/search/batch"
+
+    def _chunks(self, query_vectors: np.ndarray) -> List[np.ndarray]:
+        q = np.atleast_2d(np.asarray(query_vectors, dtype="float32"))
+        return [q[i : i + self.max_batch] for i in range(0, len(q), self.max_batch)]
+
+    @staticmethod
+    def _body(chunk: np.ndarray, k: int, filter: Optional[Filter] = None) -> Dict[str, Any]:
+        searches = [
+            {"vector": q.tolist(), "limit": k, "with_payload": True, "with_vector": True}
+            for q in chunk
+        ]
+        if filter is not None:
+            for s in searches:
+                s["filter"] = filter
+        return {"searches": searches}
+
+    @staticmethod
+    def _parse(body: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        results = []
+        for points in body["result"]:
             out = []
-            for i in idx:
+            for point in points:
+                item = dict(point.get("payload") or {})
+                item.setdefault("id", str(point["id"]))
+                item["score"] = float(point["score"])
+                vec = point.get("vector")
+                if isinstance(vec, dict):  # named vectors: take the first one
+                    vec = next(iter(vec.values()), None)
+                if vec is not None:
+                    item["vector"] = np.asarray(vec, dtype="float32")
+                out.append(item)
+            results.append(out)
+        return results
+
+    def _should_retry(self, attempt: int, exc: Optional[Exception], status: int) -> bool:
+        failed = exc is not None or status in _RETRY_STATUS
+        if failed and attempt < self.retries:
+            self.counters["retries"] += 1
+            return True
+        return False
+
+    def _fail(self, exc: Optional[Exception], response: Any) -> None:
+        self.counters["errors"] += 1
+        if exc is not None:
+            raise CloudError(f"cloud search failed: {exc!r}") from exc
+        raise CloudError(f"cloud search failed: HTTP {response.status_code} {response.text[:200]}")
+
+    def _mock_search(
+        self, query_vectors: np.ndarray, k: int, filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # cosine similarity, one matrix product for the whole batch
+        q = np.atleast_2d(query_vectors).astype("float32")
+        v = self._mock_vectors
+        v_norm = v / (np.linalg.norm(v, axis=1, keepdims=True) + 1e-9)
+        q_norm = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-9)
+        scores = q_norm @ v_norm.T
+        allowed = np.array([matches(p, filter) for p in self._mock_payloads])
+        results = []
+        for row in scores:
+            out = []
+            for i in np.argsort(np.where(allowed, -row, np.inf))[: min(k, int(allowed.sum()))]:
                 item = dict(self._mock_payloads[i])
-                item["score"] = float(scores[i])
+                item["score"] = float(row[i])
                 item["vector"] = v[i]
                 out.append(item)
-            return out
+            results.append(out)
+        return results
 
-        # Real Qdrant path (not exercised in tests)
-        res = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_vector.tolist(),
-            limit=k,
-        )
-        out = []
-        for point in res:
-            payload = point.payload or {}
-            payload.setdefault("id", str(point.id))
-            payload["score"] = float(point.score)
-            # vectors would typically be retrieved in a second call;
-            # omitted here for brevity
-            out.append(payload)
-        return out
+    def stats(self) -> Dict[str, float]:
+        return dict(self.counters)
+
+
+class CloudClient(_CloudBase):
+    """Blocking client over one pooled ``httpx.Client``.
+
+    The client is thread-safe: the router, its hedge thread and the prefetch
+    workers share the same kept-alive connections. ``search_batch`` sends
+    up to ``max_batch`` query vectors per round trip; connection errors,
+    timeouts, 429 and 5xx are retried ``retries`` times with exponential
+    backoff before ``CloudError`` is raised.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if not self._mock:
+            self.client = httpx.Client(**self._client_kwargs)
+
+    def search(
+        self, query_vector: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        return self.search_batch(np.asarray(query_vector).reshape(1, -1), k, filter)[0]
+
+    def search_batch(
+        self, query_vectors: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """One round trip (mock: one matrix product) per ``max_batch`` queries."""
+        filter = normalize_filter(filter)
+        if self._mock:
+            return self._mock_search(query_vectors, k, filter)
+        results: List[List[Dict[str, Any]]] = []
+        for chunk in self._chunks(query_vectors):
+            results.extend(self._post(self._body(chunk, k, filter)))
+            self.counters["queries"] += len(chunk)
+        return results
+
+    def _post(self, body: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        attempt = 0
+        while True:
+            self.counters["requests"] += 1
+            exc, response = None, None
+            try:
+                response = self.client.post(self._path, json=body)
+            except httpx.TransportError as e:  # includes timeouts
+                exc = e
+            status = response.status_code if response is not None else 0
+            if exc is None and status < 400:
+                return self._parse(response.json())
+            if not self._should_retry(attempt, exc, status):
+                self._fail(exc, response)
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+
+
+class AsyncCloudClient(_CloudBase):
+    """asyncio twin of ``CloudClient`` over a pooled ``httpx.AsyncClient``.
+
+    Large batches are split into ``max_batch`` chunks that are sent
+    concurrently; retry and error behaviour match the blocking client.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        if not self._mock:
+            self.client = httpx.AsyncClient(**self._client_kwargs)
+
+    async def search(
+        self, query_vector: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        return (await self.search_batch(np.asarray(query_vector).reshape(1, -1), k, filter))[0]
+
+    async def search_batch(
+        self, query_vectors: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        filter = normalize_filter(filter)
+        if self._mock:
+            return self._mock_search(query_vectors, k, filter)
+        chunks = self._chunks(query_vectors)
+        parts = await asyncio.gather(*(self._post(self._body(c, k, filter)) for c in chunks))
+        self.counters["queries"] += sum(len(c) for c in chunks)
+        return [res for part in parts for res in part]
+
+    async def _post(self, body: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        attempt = 0
+        while True:
+            self.counters["requests"] += 1
+            exc, response = None, None
+            try:
+                response = await self.client.post(self._path, json=body)
+            except httpx.TransportError as e:
+                exc = e
+            status = response.status_code if response is not None else 0
+            if exc is None and status < 400:
+                return self._parse(response.json())
+            if not self._should_retry(attempt, exc, status):
+                self._fail(exc, response)
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
@@ -1,24 +1,118 @@
+import os
 from pathlib import Path
 
 # Embedding configuration
 EMBEDDING_DIM = 384
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_CACHE_BYTES = 64 * 1024 * 1024   # query embedding cache budget (LRU)
+EMBEDDING_CACHE_TTL_SEC = 3600.0           # None disables expiry
+ENCODE_BATCH_SIZE = 64                     # texts per forward pass in batched encoding
+EMBEDDER_BACKEND = os.getenv("HYBRID_VDB_EMBEDDER", "sentence-transformers")  # or "hashing", "precomputed"
+EMBEDDINGS_PATH = Path(os.environ["HYBRID_VDB_EMBEDDINGS"]) if os.getenv("HYBRID_VDB_EMBEDDINGS") else None  # .npz for "precomputed"
 
 # Storage configuration
 HOT_PARTITION_CAPACITY = 1000
+HOT_EVICTION_POLICY = "momentum"   # "lru", "lfu" or "momentum" (SemanticCache-driven)
 PERMANENT_CAPACITY = 30_000
 DYNAMIC_CAPACITY = 70_000
+DYNAMIC_EVICTION = "recency"       # dynamic tier past capacity: "recency" or "score" (result hits)
+DYNAMIC_LOW_WATER = 0.9            # ... evicts down to this share of capacity, in one batch
+RECLAIM_DEAD_RATIO = 0.25          # rebuild an index once this share of its rows is tombstoned
+LOCAL_INDEX_BACKEND = "auto"       # "auto" (faiss if installed, else flat), "flat", "ivf", "faiss"
+IVF_NLIST = 256                    # coarse clusters for the NumPy IVF backend
+IVF_NPROBE = 8                     # lists scanned per query; higher = better recall, slower
+PERMANENT_QUANTIZATION = None      # None, "int8" (4x smaller) or "pq" (product quantization)
+PQ_SUBSPACES = 96                  # PQ bytes per vector (EMBEDDING_DIM must be divisible)
+QUANT_TRAIN_SIZE = 4096            # vectors buffered exactly before the codec is trained
+RERANK_FACTOR = 4                  # quantized search re-ranks k * RERANK_FACTOR candidates
+VECTOR_DTYPE = "float32"           # "float16" halves index memory; NumPy scans get slower
+
+# Payload filtering (see payloads.py)
+PAYLOAD_INDEX_FIELDS = ("tenant", "lang", "doc_type")  # indexed payload keys; others are scanned
+FILTER_PREFILTER_SHARE = 0.05      # filters matching at most this share of rows scan only those rows
+
+# Semantic result cache (near-duplicate queries answered before any tier scan)
+RESULT_CACHE_CAPACITY = 1024       # cached queries
+RESULT_CACHE_THRESHOLD = 0.95      # cosine similarity needed to reuse a cached result
+RESULT_CACHE_TTL_SEC = 300.0       # None disables expiry
+
+# Predictive prefetch (STRONG / PERMANENT anchor predictions -> hot partition)
+PREFETCH_ENABLED = True
+PREFETCH_K = 5                     # cloud results fetched per prediction
+PREFETCH_WORKERS = 2               # concurrent cloud fetches
+PREFETCH_MAX_PENDING = 8           # in-flight fetches before new predictions are dropped
+PREFETCH_RATE_PER_SEC = 50.0       # predicted queries sent to the cloud per second
+PREFETCH_TRACKED_IDS = 10_000      # prefetched ids remembered for usefulness accounting
 
 # Anchor configuration
 ANCHOR_DISTANCE_THRESHOLD = 0.35   # cosine distance threshold to join existing anchor
 PREDICTION_HIT_THRESHOLD = 0.85
-WEAK_DECAY = 0.5
+PREDICTOR_MEMORY = 16              # (query, next query) pairs remembered per anchor
+PREDICTOR_MAX_EDGES = 8            # outgoing transitions kept per anchor
+PREDICTOR_DECAY = 0.95             # transition counts decay each time an anchor is left
+WEAK_DECAY = 0.5                   # anchor strength kept per hour without a hit, by type
 MEDIUM_DECAY = 0.8
 STRONG_DECAY = 0.9
+ANCHOR_PRUNE_STRENGTH = 5.0        # non-permanent anchors decayed below this are pruned
+ANCHOR_HISTORY = 16                # most recent query texts kept per anchor
+CLUSTER_DECAY = 0.95               # semantic cluster momentum kept per idle minute
+CLUSTER_PRUNE_MOMENTUM = 0.1       # clusters decayed to this momentum are dropped
+CLUSTER_HISTORY = 16               # most recent result ids kept per semantic cluster
+CLUSTER_DTYPE = "float32"          # "float16" halves semantic cluster centroid memory
+
+# Local vs. cloud routing
+ROUTE_MIN_LOCAL_SCORE = 0.5        # best local score below this goes to the cloud
+ROUTE_MIN_LOCAL_FILL = 1.0         # fewer than ceil(fill * k) local results goes to the cloud
+HEDGE_ENABLED = False              # start the cloud request while the local search runs
+HEDGE_DELAY_MS = 20.0              # ... if the local search has not finished after this long
+CLOUD_DEADLINE_MS = 1000.0         # hedged cloud answer is abandoned after this (local result kept)
+
+# Cloud client (Qdrant REST API over a pooled httpx client)
+CLOUD_TIMEOUT_SEC = 2.0            # per round trip (connect + read)
+CLOUD_RETRIES = 2                  # extra attempts on connection errors, 429 and 5xx
+CLOUD_RETRY_BACKOFF_SEC = 0.05     # first retry delay, doubled per attempt
+CLOUD_POOL_SIZE = 16               # kept-alive connections shared by all callers
+CLOUD_MAX_BATCH = 64               # query vectors per search/batch request
+
+# Request micro-batching (demo/app.py)
+BATCH_MAX_SIZE = 32                # queries coalesced into one router.search_batch call
+BATCH_MAX_WAIT_MS = 5.0            # how long the first queued query waits for company
+BATCH_MAX_QUEUE = 1024             # queued queries beyond this are rejected (HTTP 503)
+BATCH_WORKERS = 4                  # search_batch calls the batcher may run concurrently
+REQUEST_TIMEOUT_MS = 2000.0        # default per-request deadline
+
+# Background maintenance (MaintenanceScheduler, run through the router's writer)
+MAINT_PRUNE_INTERVAL_SEC = 30.0    # anchor / cluster pruning pass
+MAINT_EXPIRE_INTERVAL_SEC = 60.0   # drop expired result / embedding cache entries
+MAINT_COMPACT_INTERVAL_SEC = 600.0 # reclaim tombstones and merge on-disk segments
+MAINT_PUBLISH_INTERVAL_SEC = 0.05  # searches see hot-partition / prediction changes within this
+MAINT_BUDGET_MS = 5.0              # writer time one sliced job may take per run
+MAINT_SLICE = 256                  # entries pruned per writer call
+MAINT_JITTER = 0.1                 # +/- share of each interval, so jobs do not align
+
+# Sharing one router between worker processes (see HybridRouter)
+SHARED_DIR = os.getenv("HYBRID_VDB_SHARED_DIR") or None  # writer lock, socket, tiers and views; e.g. /dev/shm/hybrid_vdb
+SHARED_PUBLISH_SEC = 0.2           # the writer publishes a changed hot partition / predictions this often
+SHARED_REFRESH_SEC = 0.2           # followers pick up tier changes and new views this often
+
+# Observability
+RESPONSE_METRICS = os.getenv("HYBRID_VDB_RESPONSE_METRICS", "1") == "1"  # metrics snapshot in every /search reply
 
 # Paths
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True, parents=True)
 
+# Persistence of the permanent / dynamic tiers (memory-mapped segments)
+PERSIST_LOCAL_TIERS = os.getenv("HYBRID_VDB_PERSIST", "0") == "1"
+LOCAL_TIERS_DIR = DATA_DIR / "tiers"
+SEGMENT_FLUSH_ROWS = 4096          # append-log rows sealed into one segment file
+
+# Bulk ingestion into the permanent tier (src/ingest.py, POST /ingest)
+INGEST_CHUNK_ROWS = 1024           # rows read, embedded and written per step
+INGEST_WORKERS = 2                 # embedding threads; at most workers + 1 chunks in flight
+INGEST_DIR = Path(os.getenv("HYBRID_VDB_INGEST_DIR") or DATA_DIR / "ingest")  # files POST /ingest may read
+INGEST_JOB_TTL_SEC = 3600.0        # finished jobs answer GET /ingest/{job} this long
+INGEST_MAX_JOBS = 100              # finished jobs kept at most (oldest dropped first)
+
 # Misc
 RANDOM_SEED = 42
@@ -0,0 +1,224 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+import threading
+import time
+import zlib
+import numpy as np
+
+from .config import EMBEDDER_BACKEND, EMBEDDING_DIM, EMBEDDING_MODEL_NAME, EMBEDDINGS_PATH, RANDOM_SEED
+from .embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder:
+    """Turns texts into (n, dim) float32 vectors.
+
+    ``encode(texts, batch_size=...)`` matches SentenceTransformer, so a
+    loaded model can be passed to the router as is. ``warm_up`` starts any
+    slow loading in the background; ``ready`` says whether ``encode`` will
+    answer without waiting for it.
+    """
+
+    name = "base"
+    dim = EMBEDDING_DIM
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+    def warm_up(self) -> None:
+        """Start loading in the background (no-op when there is nothing to load)."""
+
+    @property
+    def ready(self) -> bool:
+        return True
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until a started warm-up has finished; returns ``ready``."""
+        return self.ready
+
+    def stats(self) -> Dict[str, float]:
+        return {"ready": int(self.ready), "dim": self.dim}
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """A sentence-transformers model, loaded on first use.
+
+    Construction is cheap. ``warm_up`` loads the model and runs one encode
+    on a daemon thread; an ``encode`` that arrives first loads it on the
+    calling thread (or waits for the warm-up already in progress). A failed
+    load is logged, leaves ``error`` set and is retried by the next call.
+    """
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = None):
+        self.model_name = model_name
+        self.device = device
+        self.error: Optional[str] = None
+        self.load_ms = 0.0
+        self._model = None
+        self._lock = threading.Lock()  # held while loading
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer  # type: ignore
+                except ImportError:
+                    self.error = "sentence-transformers is not installed"
+                    raise RuntimeError(
+                        "sentence-transformers is not installed. "
+                        "Run `pip install sentence-transformers` or use the hashing embedder."
+                    ) from None
+                t0 = time.perf_counter()
+                try:
+                    model = SentenceTransformer(self.model_name, device=self.device)
+                    model.encode(["warm up"], batch_size=1)  # first call allocates buffers
+                except Exception as exc:
+                    self.error = f"{type(exc).__name__}: {exc}"
+                    raise
+                self.load_ms = (time.perf_counter() - t0) * 1000.0
+                self.error = None
+                self._model = model
+            return self._model
+
+    def _warm(self) -> None:
+        try:
+            self._load()
+        except Exception:
+            logger.exception("loading %s failed", self.model_name)
+
+    def warm_up(self) -> None:
+        with self._start_lock:
+            if self._model is None and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._warm, name="embedder-load", daemon=True)
+                self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        model = self._model or self._load()
+        return np.asarray(model.encode(list(texts), batch_size=batch_size), dtype="float32")
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "load_ms": self.load_ms, "failed": int(self.error is not None)}
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic bag-of-words embedder without dependencies.
+
+    Each token (case-folded, split on whitespace) hashes (CRC32 with
+    ``seed``) to a fixed random direction; a text is the normalized sum of
+    its tokens, so texts sharing most words land close together. Meant for
+    tests, benchmarks and running the service without a model.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, seed: int = RANDOM_SEED, max_tokens: int = 100_000):
+        self.dim = dim
+        self.seed = seed
+        self.max_tokens = max_tokens
+        self._tokens: Dict[str, np.ndarray] = {}
+
+    def _token(self, tok: str) -> np.ndarray:
+        vec = self._tokens.get(tok)
+        if vec is None:
+            rng = np.random.default_rng((zlib.crc32(tok.encode("utf-8")), self.seed))
+            vec = rng.standard_normal(self.dim).astype("float32")
+            if len(self._tokens) < self.max_tokens:
+                self._tokens[tok] = vec
+        return vec
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for i, text in enumerate(texts):
+            for tok in text.casefold().split() or [""]:
+                out[i] += self._token(tok)
+        return out / (np.linalg.norm(out, axis=1, keepdims=True) + 1e-9)
+
+
+class PrecomputedEmbedder(Embedder):
+    """Looks texts up in a table of embeddings computed offline.
+
+    Keys are ``normalize_query(text)``. Texts missing from the table go to
+    ``fallback`` if given, otherwise ``encode`` raises ``KeyError``. Ready
+    as soon as the table is loaded; the fallback loads on its first miss
+    (or ``warm_up``).
+    """
+
+    name = "precomputed"
+
+    def __init__(
+        self, texts: Sequence[str], vectors: np.ndarray, fallback: Optional[Embedder] = None
+    ):
+        vectors = np.asarray(vectors, dtype="float32")
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("need one row of vectors per text")
+        self.dim = vectors.shape[1]
+        self.texts = list(texts)
+        self.vectors = vectors
+        self.rows = {normalize_query(t): i for i, t in enumerate(self.texts)}
+        self.fallback = fallback
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path, fallback: Optional[Embedder] = None) -> "PrecomputedEmbedder":
+        """From an ``.npz`` with ``texts`` and ``vectors`` arrays."""
+        with np.load(path) as data:
+            return cls([str(t) for t in data["texts"]], data["vectors"], fallback)
+
+    def save(self, path: Path) -> None:
+        np.savez(path, texts=np.array(self.texts), vectors=self.vectors)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            row = self.rows.get(normalize_query(text))
+            if row is None:
+                missing.append(i)
+            else:
+                out[i] = self.vectors[row]
+        if missing:
+            self.misses += len(missing)
+            if self.fallback is None:
+                raise KeyError(f"no precomputed embedding for {texts[missing[0]]!r}")
+            out[missing] = self.fallback.encode([texts[i] for i in missing], batch_size)
+        return out
+
+    def warm_up(self) -> None:
+        if self.fallback is not None:
+            self.fallback.warm_up()
+
+    def stats(self) -> Dict[str, float]:
+        return {**super().stats(), "entries": len(self.rows), "misses": self.misses}
+
+
+_BACKENDS: Dict[str, Callable[[], Embedder]] = {
+    "sentence-transformers": SentenceTransformerEmbedder,
+    "hashing": HashingEmbedder,
+    "precomputed": lambda: PrecomputedEmbedder.load(EMBEDDINGS_PATH, SentenceTransformerEmbedder()),
+}
+
+
+def make_embedder(name: str = EMBEDDER_BACKEND) -> Embedder:
+    """The configured backend; nothing slow happens until ``warm_up`` or ``encode``."""
+    if name not in _BACKENDS:
+        raise ValueError(f"unknown embedder backend: {name!r}")
+    if name == "precomputed" and EMBEDDINGS_PATH is None:
+        raise ValueError("the precomputed embedder needs HYBRID_VDB_EMBEDDINGS")
+    return _BACKENDS[name]()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import itertools
+import threading
+import time
+import numpy as np
+
+from .config import EMBEDDING_CACHE_BYTES, EMBEDDING_CACHE_TTL_SEC
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case-folded with whitespace collapsed."""
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """LRU + TTL cache of query embeddings, bounded by bytes.
+
+    Entries are float32 vectors keyed by ``normalize_query(text)``. The
+    least recently used entries are evicted once the cached vectors (plus
+    their keys) exceed ``max_bytes``; entries older than ``ttl_sec`` are
+    treated as misses. Safe to share between request threads.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = EMBEDDING_CACHE_BYTES,
+        ttl_sec: Optional[float] = EMBEDDING_CACHE_TTL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.clock = clock
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _size(key: str, vec: np.ndarray) -> int:
+        return vec.nbytes + len(key.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_sec is not None:
+                if self.clock() - entry[1] > self.ttl_sec:
+                    self._pop(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype="float32")
+        size = self._size(key, vec)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (vec, self.clock())
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _pop(self, key: str) -> None:
+        vec, _ = self._entries.pop(key)
+        self.nbytes -= self._size(key, vec)
+
+    def expire(self, limit: int = 1024) -> int:
+        """Drop expired entries among the ``limit`` least recently used.
+
+        Expired entries are already misses; this just frees their memory
+        without walking the whole cache under the lock.
+        """
+        if self.ttl_sec is None:
+            return 0
+        with self._lock:
+            cutoff = self.clock() - self.ttl_sec
+            old = [
+                key for key, (_, t) in itertools.islice(self._entries.items(), limit)
+                if t < cutoff
+            ]
+            for key in old:
+                self._pop(key)
+            return len(old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
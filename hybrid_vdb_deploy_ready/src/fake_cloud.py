@@ -0,0 +1,162 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import json
+import re
+import threading
+import time
+import numpy as np
+
+try:
+    import httpx  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    httpx = None
+
+from .config import EMBEDDING_DIM
+from .payloads import matches, normalize_filter
+
+_SEARCH_PATH = re.compile(r"^/collections/([^/]+)/points/search(/batch)?$")
+
+
+class FakeCloudServer:
+    """In-process stand-in for a Qdrant collection, with injectable latency.
+
+    Answers ``points/search`` and ``points/search/batch`` over an in-memory
+    matrix, returning payloads and vectors like a real server and honouring
+    each search's payload ``filter`` (match conditions). Plug it into
+    the clients through ``transport()`` / ``async_transport()``::
+
+        fake = FakeCloudServer(latency_ms=5, jitter_ms=2, tail_prob=0.01, tail_ms=200)
+        cloud = CloudClient(transport=fake.transport())
+
+    Each request sleeps ``latency_ms`` plus an exponential ``jitter_ms``,
+    plus ``tail_ms`` with probability ``tail_prob``; it fails with HTTP 503
+    with probability ``error_rate``. A request whose delay exceeds the
+    client's read timeout sleeps for the timeout and raises
+    ``httpx.ReadTimeout``, as a real connection would.
+    """
+
+    def __init__(
+        self,
+        vectors: Optional[np.ndarray] = None,
+        payloads: Optional[Sequence[Dict[str, Any]]] = None,
+        n: int = 1024,
+        dim: int = EMBEDDING_DIM,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        tail_prob: float = 0.0,
+        tail_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self._rng = np.random.default_rng(seed)
+        if vectors is None:
+            vectors = self._rng.standard_normal((n, dim), dtype="float32")
+        self.vectors = np.asarray(vectors, dtype="float32")
+        self._units = self.vectors / (np.linalg.norm(self.vectors, axis=1, keepdims=True) + 1e-9)
+        if payloads is None:
+            payloads = [{"id": f"doc_{i}", "text": f"Fake document {i}"} for i in range(len(self.vectors))]
+        self.payloads = list(payloads)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_prob = tail_prob
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self.counters = {"requests": 0, "queries": 0, "filtered": 0, "errors": 0, "timeouts": 0}
+        self._lock = threading.Lock()
+
+    # --- behaviour ---------------------------------------------------
+    def _draw(self) -> tuple:
+        """(delay in seconds, fail?) for one request."""
+        with self._lock:
+            delay = self.latency_ms
+            if self.jitter_ms:
+                delay += float(self._rng.exponential(self.jitter_ms))
+            if self.tail_prob and self._rng.random() < self.tail_prob:
+                delay += self.tail_ms
+            fail = bool(self.error_rate) and self._rng.random() < self.error_rate
+        return delay / 1000.0, fail
+
+    def _search(self, searches: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        q = np.asarray([s["vector"] for s in searches], dtype="float32")
+        q /= np.linalg.norm(q, axis=1, keepdims=True) + 1e-9
+        scores = q @ self._units.T
+        out = []
+        for s, row in zip(searches, scores):
+            flt = normalize_filter(s.get("filter"))
+            if flt is not None:
+                allowed = np.array([matches(p, flt) for p in self.payloads], dtype=bool)
+                row = np.where(allowed, row, -np.inf)
+            k = min(int(s.get("limit", 10)), int(np.isfinite(row).sum()))
+            top = np.argpartition(-row, k - 1)[:k] if k else np.empty(0, dtype=int)
+            top = top[np.argsort(-row[top])]
+            points = []
+            for i in top.tolist():
+                point: Dict[str, Any] = {"id": i, "version": 0, "score": float(row[i])}
+                if s.get("with_payload"):
+                    point["payload"] = dict(self.payloads[i])
+                if s.get("with_vector"):
+                    point["vector"] = self.vectors[i].tolist()
+                points.append(point)
+            out.append(points)
+        return out
+
+    def _respond(self, request: "httpx.Request", fail: bool) -> "httpx.Response":
+        m = _SEARCH_PATH.match(request.url.path)
+        if request.method != "POST" or m is None:
+            return httpx.Response(404, json={"status": {"error": "not found"}})
+        if fail:
+            with self._lock:
+                self.counters["errors"] += 1
+            return httpx.Response(503, json={"status": {"error": "injected failure"}})
+        body = json.loads(request.content)
+        searches = body["searches"] if m.group(2) else [body]
+        result = self._search(searches)
+        with self._lock:
+            self.counters["queries"] += len(searches)
+            self.counters["filtered"] += sum(bool(s.get("filter")) for s in searches)
+        return httpx.Response(
+            200, json={"result": result if m.group(2) else result[0], "status": "ok", "time": 0.0}
+        )
+
+    def _timeout(self, request: "httpx.Request") -> Optional[float]:
+        return (request.extensions.get("timeout") or {}).get("read")
+
+    # --- transports --------------------------------------------------
+    def handle(self, request: "httpx.Request") -> "httpx.Response":
+        with self._lock:
+            self.counters["requests"] += 1
+        delay, fail = self._draw()
+        limit = self._timeout(request)
+        if limit is not None and delay > limit:
+            time.sleep(limit)
+            with self._lock:
+                self.counters["timeouts"] += 1
+            raise httpx.ReadTimeout("fake server too slow", request=request)
+        if delay:
+            time.sleep(delay)
+        return self._respond(request, fail)
+
+    async def handle_async(self, request: "httpx.Request") -> "httpx.Response":
+        with self._lock:
+            self.counters["requests"] += 1
+        delay, fail = self._draw()
+        limit = self._timeout(request)
+        if limit is not None and delay > limit:
+            await asyncio.sleep(limit)
+            with self._lock:
+                self.counters["timeouts"] += 1
+            raise httpx.ReadTimeout("fake server too slow", request=request)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(request, fail)
+
+    def transport(self) -> "httpx.MockTransport":
+        return httpx.MockTransport(self.handle)
+
+    def async_transport(self) -> "httpx.MockTransport":
+        return httpx.MockTransport(self.handle_async)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
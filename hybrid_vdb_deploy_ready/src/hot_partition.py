@@ -0,0 +1,302 @@
+from __future__ import annotations
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+import sys
+import time
+import numpy as np
+
+from .buffers import _normalize, _topk, _topk_rows
+from .config import EMBEDDING_DIM, HOT_PARTITION_CAPACITY
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .semantic_cache import SemanticCache
+
+
+class EvictionPolicy:
+    """Chooses which occupied hot slots to give up when the partition is full."""
+
+    name = "base"
+
+    def victims(self, part: "HotPartition", n: int) -> np.ndarray:
+        raise NotImplementedError
+
+    @staticmethod
+    def _lowest(part: "HotPartition", primary: np.ndarray, n: int) -> np.ndarray:
+        """``n`` occupied slots with the smallest ``primary``; ties go to the least recent."""
+        occ = np.flatnonzero(part.occupied)
+        order = np.lexsort((part.last_access[occ], primary[occ]))
+        return occ[order[:n]]
+
+
+class LRUPolicy(EvictionPolicy):
+    name = "lru"
+
+    def victims(self, part: "HotPartition", n: int) -> np.ndarray:
+        return self._lowest(part, part.last_access, n)
+
+
+class LFUPolicy(EvictionPolicy):
+    name = "lfu"
+
+    def victims(self, part: "HotPartition", n: int) -> np.ndarray:
+        return self._lowest(part, part.hits, n)
+
+
+class MomentumPolicy(EvictionPolicy):
+    """Evict entries whose nearest ``SemanticCluster`` has the least momentum.
+
+    Entries in regions users are currently querying stay resident even if
+    they were inserted long ago; ties fall back to LRU.
+    """
+
+    name = "momentum"
+
+    def __init__(self, semantic_cache: "SemanticCache"):
+        self.semantic_cache = semantic_cache
+
+    def victims(self, part: "HotPartition", n: int) -> np.ndarray:
+        momentum = np.zeros(part.capacity, dtype="float64")
+        occ = np.flatnonzero(part.occupied)
+        momentum[occ] = self.semantic_cache.momentum_for(part.vectors[occ])
+        return self._lowest(part, momentum, n)
+
+
+def make_eviction_policy(name: str, semantic_cache: Optional["SemanticCache"] = None) -> EvictionPolicy:
+    if name == "lru":
+        return LRUPolicy()
+    if name == "lfu":
+        return LFUPolicy()
+    if name == "momentum":
+        if semantic_cache is None:
+            raise ValueError("momentum eviction needs a SemanticCache")
+        return MomentumPolicy(semantic_cache)
+    raise ValueError(f"unknown eviction policy: {name!r}")
+
+
+class HotView(NamedTuple):
+    """Immutable state a hot-partition search reads (see ``HotPartition.view``)."""
+
+    vectors: np.ndarray
+    occupied: np.ndarray
+    slot_ids: List[Optional[str]]
+    size: int
+
+
+class HotPartition:
+    """Fixed-size, preallocated hot tier with an id -> slot map.
+
+    Inserting an id that is already resident overwrites its slot; a new id
+    takes a free slot or one chosen by the eviction policy.
+
+    Searches read ``view``, a ``HotView`` copy of the slot arrays, so
+    they run on other threads without locking while ``add`` and ``remove``
+    update the arrays in place. ``publish`` takes a new copy, at most once
+    per ``publish_interval`` seconds for inserts (a burst of inserts costs
+    one O(capacity * dim) copy, and whatever is left is published by the
+    next insert or ``publish`` call); a removal is published at once.
+    ``record_hits`` only queues; the next write applies the hits (eviction
+    decisions happen on the writer).
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        capacity: int = HOT_PARTITION_CAPACITY,
+        policy: Optional[EvictionPolicy] = None,
+        publish_interval: float = 0.0,
+    ):
+        self.dim = dim
+        self.capacity = capacity
+        self.policy = policy or LRUPolicy()
+        self.publish_interval = publish_interval
+        self.vectors = np.zeros((capacity, dim), dtype="float32")
+        self.occupied = np.zeros(capacity, dtype=bool)
+        self.last_access = np.zeros(capacity, dtype="float64")
+        self.hits = np.zeros(capacity, dtype="int64")
+        self.slot_ids: List[Optional[str]] = [None] * capacity
+        self.id_to_slot: Dict[str, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._pending_hits: Deque[Tuple[np.ndarray, List[Optional[str]], float]] = deque(maxlen=4096)
+        self.view = HotView(self.vectors.copy(), self.occupied.copy(), list(self.slot_ids), 0)
+        self._dirty = False  # slot arrays changed since the last publish
+        self._published_at = float("-inf")
+        self.counters = {
+            "inserts": 0,
+            "updates": 0,
+            "evictions": 0,
+            "lookups": 0,
+            "lookup_hits": 0,
+            "result_hits": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self.id_to_slot)
+
+    def __contains__(self, vec_id: str) -> bool:
+        return vec_id in self.id_to_slot
+
+    @property
+    def nbytes(self) -> int:
+        """Slot arrays, their published copy and the id maps (id strings are
+        shared with storage)."""
+        arrays = [self.vectors, self.occupied, self.last_access, self.hits]
+        if self.view.vectors is not self.vectors:
+            arrays += [self.view.vectors, self.view.occupied]
+        return (
+            sum(a.nbytes for a in arrays)
+            + sys.getsizeof(self.slot_ids) + sys.getsizeof(self.id_to_slot)
+        )
+
+    def publish(self, min_interval: float = 0.0) -> bool:
+        """Copy the slot arrays into a new ``view`` if they changed, unless
+        the last copy is younger than ``min_interval`` seconds; returns
+        whether it did."""
+        now = time.monotonic()
+        if not self._dirty or now - self._published_at < min_interval:
+            return False
+        self.view = HotView(
+            self.vectors.copy(), self.occupied.copy(), list(self.slot_ids), len(self.id_to_slot)
+        )
+        self._dirty = False
+        self._published_at = now
+        return True
+
+    def add(self, vecs: np.ndarray, ids: List[str]) -> None:
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        vecs = _normalize(np.asarray(vecs, dtype="float32"))
+        self._apply_hits()
+        # last occurrence wins; at most `capacity` entries can be kept
+        latest: Dict[str, int] = {}
+        for i, vid in enumerate(ids):
+            latest.pop(vid, None)
+            latest[vid] = i
+        items = list(latest.items())[-self.capacity :]
+
+        new = [vid for vid, _ in items if vid not in self.id_to_slot]
+        shortfall = len(new) - len(self._free)
+        if shortfall > 0:
+            refreshed = [self.id_to_slot[vid] for vid, _ in items if vid in self.id_to_slot]
+            self._evict(shortfall, protect=refreshed)
+
+        now = time.time()
+        for vid, i in items:
+            slot = self.id_to_slot.get(vid)
+            if slot is None:
+                slot = self._free.pop()
+                self.id_to_slot[vid] = slot
+                self.slot_ids[slot] = vid
+                self.occupied[slot] = True
+                self.hits[slot] = 0
+                self.counters["inserts"] += 1
+            else:
+                self.counters["updates"] += 1
+            self.vectors[slot] = vecs[i]
+            self.last_access[slot] = now
+        self._dirty = True
+        self.publish(self.publish_interval)
+
+    def _evict(self, n: int, protect: List[int]) -> None:
+        saved = self.occupied[protect].copy()
+        self.occupied[protect] = False  # never evict what this batch refreshes
+        victims = self.policy.victims(self, n)
+        self.occupied[protect] = saved
+        for slot in victims.tolist():
+            del self.id_to_slot[self.slot_ids[slot]]
+            self.slot_ids[slot] = None
+            self.occupied[slot] = False
+            self._free.append(slot)
+        self.counters["evictions"] += len(victims)
+
+    def remove(self, ids: List[str]) -> None:
+        if not any(vid in self.id_to_slot for vid in ids):
+            return
+        self._apply_hits()
+        for vid in ids:
+            slot = self.id_to_slot.pop(vid, None)
+            if slot is not None:
+                self.slot_ids[slot] = None
+                self.occupied[slot] = False
+                self._free.append(slot)
+        self._dirty = True
+        self.publish()  # a removed entry must not be served
+
+    def search(self, q: np.ndarray, k: int, view: Optional[HotView] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` occupied slots for unit query ``q``."""
+        view = view or self.view
+        self.counters["lookups"] += 1
+        if not view.size:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+        scores = view.vectors @ q
+        scores[~view.occupied] = -np.inf
+        idx = _topk(scores, min(k, view.size))
+        return idx, scores[idx]
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, view: Optional[HotView] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``(m, k)`` slots and scores for unit ``queries``; empty slots score ``-inf``.
+
+        Pass the ``view`` the slots will be resolved against (defaults to the
+        current one).
+        """
+        view = view or self.view
+        self.counters["lookups"] += queries.shape[0]
+        if not view.size:
+            m = queries.shape[0]
+            return np.empty((m, 0), dtype="int64"), np.empty((m, 0), dtype="float32")
+        scores = queries @ view.vectors.T
+        scores[:, ~view.occupied] = -np.inf
+        idx = _topk_rows(scores, min(k, view.size))
+        return idx, np.take_along_axis(scores, idx, axis=1)
+
+    def record_hits(self, slots: List[int], view: Optional[HotView] = None) -> None:
+        """Credit slots (of ``view``) whose entries made it into a returned result set.
+
+        Safe from any thread: hits are queued and applied by the next write,
+        skipping slots that were reassigned in between.
+        """
+        if not slots:
+            return
+        view = view or self.view
+        self._pending_hits.append(
+            (np.asarray(slots, dtype="int64"), [view.slot_ids[s] for s in slots], time.time())
+        )
+
+    def record_hit_ids(self, ids: List[str]) -> None:
+        """``record_hits`` by id (hits another process saw in a published view)."""
+        slots = [self.id_to_slot[vid] for vid in ids if vid in self.id_to_slot]
+        self.record_hits(slots)
+
+    def drain_hits(self) -> List[str]:
+        """Take the ids of queued hits, to be credited elsewhere."""
+        out: List[str] = []
+        while self._pending_hits:
+            out.extend(vid for vid in self._pending_hits.popleft()[1] if vid is not None)
+        return out
+
+    def adopt(self, view: HotView) -> None:
+        """Serve ``view``, published by the process that owns this tier."""
+        self.vectors, self.occupied, self.slot_ids = view.vectors, view.occupied, view.slot_ids
+        self.id_to_slot = {vid: s for s, vid in enumerate(view.slot_ids) if vid is not None}
+        self.view = view
+        self._dirty = False
+
+    def _apply_hits(self) -> None:
+        while self._pending_hits:
+            slots, ids, now = self._pending_hits.popleft()
+            same = np.array([self.slot_ids[s] == vid for s, vid in zip(slots.tolist(), ids)])
+            slots = slots[same]
+            self.hits[slots] += 1
+            self.last_access[slots] = now
+            self.counters["lookup_hits"] += 1
+            self.counters["result_hits"] += len(slots)
+
+    def stats(self) -> Dict[str, float]:
+        c = dict(self.counters)
+        c["pending_hits"] = len(self._pending_hits)
+        c["size"] = len(self)
+        c["capacity"] = self.capacity
+        c["policy"] = self.policy.name
+        c["hit_rate"] = c["lookup_hits"] / c["lookups"] if c["lookups"] else 0.0
+        return c
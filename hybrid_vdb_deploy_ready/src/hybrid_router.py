@@ -1,86 +1,581 @@
 from __future__ import annotations
+import logging
 import time
-from typing import Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import numpy as np
 
-try:
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover
-    SentenceTransformer = None
-
-from .anchor_system import AnchorSystem
+from .anchor_system import AnchorSystem, PredictionView
+from .embedders import make_embedder
+from .embedding_cache import EmbeddingCache, normalize_query
 from .storage_engine import StorageEngine
-from .semantic_cache import SemanticCache
+from .hot_partition import HotView, make_eviction_policy
+from .semantic_cache import ResultCache, SemanticCache
 from .cloud_client import CloudClient
 from .metrics import Metrics
-from .config import EMBEDDING_MODEL_NAME, EMBEDDING_DIM
+from .payloads import Filter, normalize_filter
+from .prefetch import Prefetcher
+from .routing import HedgedCall, RoutingPolicy
+from .scheduler import MaintenanceScheduler
+from .shared import ForwardClient, ForwardServer, RemoteError, SharedViews, WriterLease
+from .writer import SingleWriter
+from .config import (
+    BATCH_WORKERS,
+    EMBEDDING_DIM,
+    ENCODE_BATCH_SIZE,
+    HOT_EVICTION_POLICY,
+    MAINT_COMPACT_INTERVAL_SEC,
+    MAINT_EXPIRE_INTERVAL_SEC,
+    MAINT_PRUNE_INTERVAL_SEC,
+    MAINT_PUBLISH_INTERVAL_SEC,
+    PREFETCH_ENABLED,
+    RESPONSE_METRICS,
+    SHARED_DIR,
+    SHARED_PUBLISH_SEC,
+    SHARED_REFRESH_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+# storage methods ``write_storage`` may run (or forward to the writer process)
+_STORAGE_WRITES = ("add_permanent", "add_dynamic", "upsert_dynamic", "remove", "reclaim", "compact")
+# keys of a cloud hit that are not part of its payload
+_HIT_FIELDS = ("id", "score", "vector")
 
 
 class HybridRouter:
-    """Orchestrates query flow between anchors, local storage and cloud."""
+    """Orchestrates query flow between anchors, local storage and cloud.
 
-    def __init__(self):
-        if SentenceTransformer is None:
-            raise RuntimeError(
-                "sentence-transformers is not installed. "
-                "Run `pip install sentence-transformers`."
-            )
-        self.embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    ``embedder`` is anything with a SentenceTransformer-style
+    ``encode(texts, batch_size=...)``, usually an ``Embedder``; by default
+    the ``EMBEDDER_BACKEND`` one, which loads its model on first use or
+    ``warm_up`` (``ready`` tells whether that has happened). Query
+    embeddings are cached by normalized text. ``routing`` decides when a
+    local result is too weak and the cloud is asked instead;
+    ``cloud`` defaults to a ``CloudClient`` configured from the environment.
+    ``attach_metrics`` adds a full ``metrics_snapshot()`` to every
+    ``search`` result; ``metrics_prometheus()`` is the scrape-friendly
+    alternative.
+
+    Searches may run on any number of threads. They read immutable
+    snapshots of the indexes, hot partition and predictions; all mutations
+    are funnelled through one ``SingleWriter`` (use ``write`` for your own).
+    Anchor and cluster decay is computed lazily on read; ``maintenance``
+    (started with ``maintenance.start()``) prunes what decayed away,
+    expires cache entries and compacts storage in the background.
+
+    ``shared_dir`` (default ``HYBRID_VDB_SHARED_DIR``) lets the routers of
+    several worker processes share one state. The first to take the
+    ``WriterLease`` owns the anchors, the hot partition and the on-disk
+    tiers under ``shared_dir/tiers``; the others open those tiers
+    read-only (the segment files are mapped, so the page cache holds one
+    copy for all), map the hot partition and predictions the writer
+    publishes, and forward everything they learn (cloud results, anchor
+    updates, hot hits) to it over a unix socket. A follower sees the
+    writer's changes within ``SHARED_REFRESH_SEC``.
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        routing: Optional[RoutingPolicy] = None,
+        cloud: Optional[CloudClient] = None,
+        attach_metrics: bool = RESPONSE_METRICS,
+        shared_dir: Optional[Path] = SHARED_DIR,
+    ):
+        self.embedder = embedder if embedder is not None else make_embedder()
+        self.attach_metrics = attach_metrics
+        self.metrics = Metrics()
+        self.embedding_cache = embedding_cache or EmbeddingCache()
         self.anchor_system = AnchorSystem()
-        self.storage = StorageEngine()
         self.semantic_cache = SemanticCache()
-        self.cloud = CloudClient()
-        self.metrics = Metrics()
+
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        self.lease = WriterLease(self.shared_dir) if self.shared_dir else None
+        self.is_writer = self.lease is None or self.lease.acquire()
+        self.storage = StorageEngine(
+            data_dir=self.shared_dir / "tiers" if self.shared_dir else None,
+            hot_policy=make_eviction_policy(HOT_EVICTION_POLICY, self.semantic_cache),
+            stage_timer=self.metrics.observe,
+            read_only=not self.is_writer,
+            hot_publish_interval=MAINT_PUBLISH_INTERVAL_SEC,
+        )
+        self.result_cache = ResultCache()
+        self.storage.add_listener(self.result_cache.on_storage_change)
+        self.cloud = cloud or CloudClient()
+        self.prefetcher = Prefetcher(self.cloud) if PREFETCH_ENABLED and self.is_writer else None
+        self.routing = routing or RoutingPolicy()
+        # one hedged cloud call per concurrently running batch
+        self._hedge_pool = ThreadPoolExecutor(
+            max_workers=max(BATCH_WORKERS, 1), thread_name_prefix="hedge"
+        )
+        self.writer = SingleWriter()
+        self.maintenance = MaintenanceScheduler(run=self.write)
+
+        self.views = SharedViews(self.shared_dir / "views") if self.shared_dir else None
+        self._published: Dict[str, Any] = {}  # writer: view objects last published
+        self._loaded: Dict[str, int] = {}  # follower: generations last mapped
+        self.forward: Optional[ForwardClient] = None
+        self._server: Optional[ForwardServer] = None
+        if self.shared_dir is not None and self.is_writer:
+            self._server = ForwardServer(self.shared_dir, {
+                "learn": lambda *args: self.writer.call(self._learn, *args),
+                "storage": lambda op, *args: self.write_storage(op, *args),
+            })
+        elif self.shared_dir is not None:
+            self.forward = ForwardClient(self.shared_dir)
+            self._refresh_shared()
+        self._schedule_maintenance()
 
     # --- core API ----------------------------------------------------
+    @property
+    def ready(self) -> bool:
+        """Whether the embedder can answer without loading a model first."""
+        return getattr(self.embedder, "ready", True)
+
+    def warm_up(self) -> None:
+        """Start loading the embedding model in the background."""
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until a started warm-up has finished; returns ``ready``."""
+        if hasattr(self.embedder, "wait_ready"):
+            return self.embedder.wait_ready(timeout)
+        return self.ready
+
     def _embed(self, text: str) -> np.ndarray:
-        vec = self.embedder.encode(text)
-        return np.asarray(vec, dtype="float32")
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embeddings for ``texts`` as a (n, dim) float32 array.
+
+        Cached texts are served from ``embedding_cache``; the distinct
+        misses are encoded together in one batched call.
+        """
+        keys = [normalize_query(t) for t in texts]
+        out = np.empty((len(keys), EMBEDDING_DIM), dtype="float32")
+        missing: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            vec = self.embedding_cache.get(key) if key not in missing else None
+            if vec is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                out[i] = vec
+        n_missed = sum(len(rows) for rows in missing.values())
+        self.metrics.record_embedding_lookup(hits=len(keys) - n_missed, misses=n_missed)
+
+        if missing:
+            todo = list(missing)
+            t0 = time.perf_counter()
+            vecs = np.asarray(
+                self.embedder.encode(todo, batch_size=ENCODE_BATCH_SIZE), dtype="float32"
+            ).reshape(len(todo), -1)
+            self.metrics.record_encode(len(todo), (time.perf_counter() - t0) * 1000.0)
+            for key, vec in zip(todo, vecs):
+                self.embedding_cache.put(key, vec)
+                out[missing[key]] = vec
+        return out
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.snapshot(),
+            "hot_partition": self.storage.hot_stats(),
+            "result_cache": self.result_cache.stats(),
+            "prefetch": self.prefetcher.stats() if self.prefetcher else {},
+            "maintenance": self.maintenance.stats(),
+            "embedder": self._embedder_stats(),
+            "filter": self.storage.filter_stats(),
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate resident bytes per subsystem, plus their ``total``.
+
+        Memory-mapped segment files of persisted tiers are not counted (they
+        live in the page cache), nor is the embedding model. Reported by
+        ``metrics_prometheus`` (/metrics), not in the per-response
+        ``metrics_snapshot``.
+        """
+        local = self.storage.local_vdb
+        usage = {
+            "anchors": self.anchor_system.nbytes,
+            "predictor": self.anchor_system.predictor.nbytes,
+            "semantic_cache": self.semantic_cache.nbytes,
+            "result_cache": self.result_cache.nbytes,
+            "embedding_cache": self.embedding_cache.nbytes,
+            "hot_partition": self.storage.hot.nbytes,
+            "permanent": local.permanent.nbytes,
+            "dynamic": local.dynamic.nbytes,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
+
+    def metrics_prometheus(self, extra: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """Counters, stage latency histograms and component stats for /metrics."""
+        return self.metrics.to_prometheus({
+            "hot_partition": self.storage.hot_stats(),
+            "result_cache": self.result_cache.stats(),
+            "prefetch": self.prefetcher.stats() if self.prefetcher else {},
+            "cloud": self.cloud.stats() if hasattr(self.cloud, "stats") else {},
+            "embedder": self._embedder_stats(),
+            "memory_bytes": self.memory_usage(),
+            "filter": self.storage.filter_stats(),
+            **{f"maintenance_{name}": job for name, job in self.maintenance.stats().items()},
+            **(extra or {}),
+        })
+
+    def _embedder_stats(self) -> Dict[str, float]:
+        return self.embedder.stats() if hasattr(self.embedder, "stats") else {"ready": int(self.ready)}
+
+    def _cloud_search(
+        self, queries: np.ndarray, k: int, filter: Optional[Filter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        t0 = time.perf_counter()
+        try:
+            if filter is not None:
+                return self.cloud.search_batch(queries, k, filter=filter)
+            return self.cloud.search_batch(queries, k)
+        finally:
+            self.metrics.observe("cloud", (time.perf_counter() - t0) * 1000.0)
+
+    # --- writes ----------------------------------------------------------
+    def write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the single writer, serialized with searches' updates.
+
+        Every change to storage, anchors or caches made while searches may
+        be running should go through here.
+        """
+        return self.writer.call(fn, *args)
+
+    def decay(self) -> None:
+        """Prune decayed anchors and clusters in one full pass (on the writer)."""
+        self.writer.call(self.anchor_system.decay)
+        self.writer.call(self.semantic_cache.decay)
 
-    def search(self, query_text: str, k: int = 5) -> Dict[str, Any]:
+    def _expire_caches(self) -> None:
+        self.result_cache.expire()
+        self.embedding_cache.expire()
+
+    def _publish_snapshots(self) -> None:
+        """Publish hot-partition and prediction changes a rate limit held back."""
+        self.storage.hot.publish()
+        self.anchor_system.publish()
+
+    def _schedule_maintenance(self) -> None:
+        m = self.maintenance
+        m.add("expire_caches", self._expire_caches, MAINT_EXPIRE_INTERVAL_SEC)
+        if self.forward is not None:
+            m.add("refresh_shared", self._refresh_shared, SHARED_REFRESH_SEC)
+            return
+        m.add_sliced("prune_anchors", self.anchor_system.prune_step, MAINT_PRUNE_INTERVAL_SEC)
+        m.add_sliced("prune_clusters", self.semantic_cache.prune_step, MAINT_PRUNE_INTERVAL_SEC)
+        m.add("compact", self.storage.compact, MAINT_COMPACT_INTERVAL_SEC)
+        m.add("publish_snapshots", self._publish_snapshots, MAINT_PUBLISH_INTERVAL_SEC)
+        if self.views is not None:
+            m.add("publish_shared", self._publish_shared, SHARED_PUBLISH_SEC)
+
+    def write_storage(self, op: str, *args: Any) -> Any:
+        """Run ``storage.<op>(*args)`` where the tiers are writable.
+
+        That is this router's writer, or, in a follower process, the writer
+        process (after which this process refreshes, so it reads its own
+        write).
+        """
+        if op not in _STORAGE_WRITES:
+            raise ValueError(f"not a storage write: {op!r}")
+        if self.forward is None:
+            return self.writer.call(getattr(self.storage, op), *args)
+        result = self.forward.call("storage", op, *args)
+        self.writer.call(self._refresh_shared)
+        return result
+
+    # --- cross-process sharing ---------------------------------------
+    def _publish_shared(self) -> None:
+        """Writer: publish the hot partition and predictions if they changed."""
+        self._publish_snapshots()
+        hot = self.storage.hot.view
+        if self._published.get("hot") is not hot:
+            self.views.publish("hot", {
+                "vectors": hot.vectors,
+                "occupied": hot.occupied,
+                "slot_ids": np.array([vid or "" for vid in hot.slot_ids]),
+            })
+            self._published["hot"] = hot
+        preds = self.anchor_system.prediction_view
+        if self._published.get("predictions") is not preds:
+            self.views.publish("predictions", {"unit": preds.unit, "anchor_ids": preds.anchor_ids})
+            self._published["predictions"] = preds
+
+    def _refresh_shared(self) -> None:
+        """Follower: pick up tier changes and newly published views."""
+        self.storage.refresh()
+        got = self.views.load("hot", self._loaded.get("hot", 0))
+        if got is not None:
+            self._loaded["hot"], a = got
+            slot_ids = [str(vid) or None for vid in a["slot_ids"]]
+            size = sum(vid is not None for vid in slot_ids)
+            self.storage.hot.adopt(HotView(a["vectors"], a["occupied"], slot_ids, size))
+        got = self.views.load("predictions", self._loaded.get("predictions", 0))
+        if got is not None:
+            self._loaded["predictions"], a = got
+            self.anchor_system.prediction_view = PredictionView(a["unit"], a["anchor_ids"])
+
+    def close(self) -> None:
+        self.maintenance.stop()
+        if self._server is not None:
+            self._server.close()
+        if self.forward is not None:
+            self.forward.close()
+        if self.lease is not None:
+            self.lease.release()
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        self._hedge_pool.shutdown(wait=False)
+        self.writer.close()
+
+    @staticmethod
+    def _prediction_count(anchor) -> int:
+        # more predictions for stronger anchors
+        return 3 if anchor.type == "WEAK" else 5 if anchor.type == "MEDIUM" else 7
+
+    def search(
+        self, query_text: str, k: int = 5, filter: Optional[Filter] = None
+    ) -> Dict[str, Any]:
+        result = self.search_batch([query_text], k, filter)[0]
+        if self.attach_metrics:
+            result["metrics"] = self.metrics_snapshot()
+        return result
+
+    def search_batch(
+        self, query_texts: List[str], k: int = 5, filter: Optional[Filter] = None
+    ) -> List[Dict[str, Any]]:
+        """Run many queries through every tier together.
+
+        Texts are embedded in one encoder call, near-duplicates of recently
+        answered queries are served from ``result_cache`` (source "cache"),
+        each tier scores the remaining queries with one matrix product, and
+        every local result ``routing`` rejects goes to the cloud in a single
+        batched request (possibly hedged, see ``RoutingPolicy``).
+        ``latency_ms`` is the batch time per query.
+
+        ``filter`` restricts every query to payloads passing it (see
+        ``payloads.normalize_filter``; raises ``ValueError`` if malformed).
+        It is applied inside the local tiers, skips the hot partition and
+        the result cache, and is sent along with the cloud request; the
+        payloads of cloud hits are stored with their vectors so later
+        filtered queries can be answered locally.
+
+        Safe to call from many threads: the lookups only read published
+        snapshots, and everything the batch changes (prediction credit,
+        fetched vectors, anchors, caches) is applied afterwards in one
+        ``writer`` call.
+        """
         t0 = time.time()
-        q_vec = self._embed(query_text)
+        flt = normalize_filter(filter)
+        if not query_texts:
+            return []
+        t_stage = time.perf_counter()
+        q_vecs = self.embed_batch(query_texts)
+        self.metrics.observe("embed", (time.perf_counter() - t_stage) * 1000.0)
+        n = len(query_texts)
+        ids_list: List[List[str]] = [[] for _ in range(n)]
+        scores_list: List[List[float]] = [[] for _ in range(n)]
+        sources = ["cache"] * n
+        routes = ["cache"] * n
+        matched: List[Optional[int]] = []
+        served: List[List[str]] = []
+        fetched: Dict[str, np.ndarray] = {}
+        fetched_payloads: Dict[str, Optional[Dict[str, Any]]] = {}
 
-        prediction_anchor = self.anchor_system.check_prediction_hit(q_vec)
-        prediction_hit = prediction_anchor is not None
-        self.metrics.record_prediction(hit=prediction_hit)
+        # 0. semantic result cache (its entries are unfiltered)
+        todo = []
+        generation = self.result_cache.generation  # before any tier is read
+        cached_results = self.result_cache.lookup_batch(q_vecs, k) if flt is None else [None] * n
+        for i, cached in enumerate(cached_results):
+            if cached is None:
+                todo.append(i)
+            else:
+                ids_list[i], scores_list[i] = cached
 
-        # 1. try local
-        ids, scores = self.storage.search(q_vec, k)
-        source = "local" if ids else "cloud"
+        if todo:
+            t_stage = time.perf_counter()
+            matched = self.anchor_system.match_predictions(q_vecs[todo])
+            self.metrics.observe("prediction", (time.perf_counter() - t_stage) * 1000.0)
 
-        if not ids:
-            # 2. fall back to cloud
-            res = self.cloud.search(q_vec, k)
-            ids = [r["id"] for r in res]
-            scores = [r["score"] for r in res]
-            vectors = np.stack([r["vector"] for r in res], axis=0).astype("float32")
+            # 1. try local; with hedging the cloud request may already start
+            q_todo = q_vecs[todo]
+            hedge = None
+            if self.routing.hedge:
+                hedge = HedgedCall(
+                    self._hedge_pool, self.routing.hedge_delay, self._cloud_search, q_todo, k, flt
+                )
+            t_local = time.perf_counter()
+            local_ids, local_scores = self.storage.search_batch(q_todo, k, flt)
+            local_done = time.perf_counter()
+            weak = []  # positions in todo whose local result is not good enough
+            for j, (i, ids, scores) in enumerate(zip(todo, local_ids, local_scores)):
+                ids_list[i], scores_list[i] = ids, scores
+                sources[i] = routes[i] = "local"
+                if not self.routing.accept(scores, k):
+                    weak.append(j)
+            weak_set = set(weak)
+            served = [ids for j, ids in enumerate(local_ids) if j not in weak_set]
+            if hedge is not None and hedge.cancel():
+                hedge = None  # local finished before the hedge delay
 
-            # 3. feed into storage as dynamic / hot
-            self.storage.add_dynamic(vectors, ids)
+            # 2. fall back to cloud for weak results, one request for all of them
+            cloud_res = None
+            route = "cloud"
+            if weak and hedge is not None:
+                self.metrics.record_hedge(saved_ms=(local_done - hedge.started_at) * 1000.0)
+                remaining = self.routing.deadline - (time.perf_counter() - t_local)
+                try:
+                    hedged = hedge.future.result(timeout=max(remaining, 0.0))
+                    cloud_res = [hedged[j] for j in weak]
+                    route = "hedge"
+                except FutureTimeout:
+                    for j in weak:
+                        routes[todo[j]] = "deadline"
+            elif weak:
+                cloud_res = self._cloud_search(q_todo[weak], k, flt)
+            elif hedge is not None:
+                self.metrics.record_hedge(saved_ms=0.0)  # fired, but local was good enough
+
+            if cloud_res is not None:
+                for j, res in zip(weak, cloud_res):
+                    i = todo[j]
+                    ids_list[i] = [r["id"] for r in res]
+                    scores_list[i] = [r["score"] for r in res]
+                    sources[i] = "cloud"
+                    routes[i] = route
+                    for r in res:
+                        if "vector" in r:
+                            fetched[r["id"]] = r["vector"]
+                            payload = {f: v for f, v in r.items() if f not in _HIT_FIELDS}
+                            fetched_payloads[r["id"]] = payload or None
+
+        # 3. apply everything this batch learned, serialized with other writes
+        # (on the writer process when this one follows)
+        learned = (
+            q_vecs, query_texts, matched, served, fetched, fetched_payloads,
+            [ids[0] if ids else None for ids in ids_list],
+            self.storage.hot.drain_hits() if self.forward is not None else [],
+        )
+        to_cache = None
+        if todo and flt is None:
+            to_cache = (
+                q_vecs[todo], [ids_list[i] for i in todo], [scores_list[i] for i in todo], k
+            )
+        if self.forward is None:
+            anchors, hit_flags = self.writer.call(
+                self._learn_and_cache, generation, to_cache, *learned
+            )
+        else:
+            anchors, hit_flags = self._learn_remote(*learned)
+            if to_cache is not None:
+                # the refresh after a forwarded fetch counts as a change too
+                self.result_cache.put_batch(*to_cache, generation=generation)
+        for hit in hit_flags:
+            self.metrics.record_prediction(hit=hit)
+
+        latency_ms = (time.time() - t0) * 1000.0 / len(query_texts)
+        for source, route in zip(sources, routes):
+            self.metrics.record_query(latency_ms=latency_ms, source=source)
+            if route != "cache":
+                self.metrics.record_route(route)
+
+        hits = dict(zip(todo, hit_flags))
+        return [
+            {
+                "query": text,
+                "ids": ids,
+                "scores": scores,
+                "source": source,
+                "route": route,
+                "latency_ms": latency_ms,
+                "anchor_id": anchor_id,
+                "anchor_type": anchor_type,
+                "prediction_hit": hits.get(i, False),
+            }
+            for i, (text, ids, scores, source, route, (anchor_id, anchor_type)) in enumerate(
+                zip(query_texts, ids_list, scores_list, sources, routes, anchors)
+            )
+        ]
+
+    def _learn(
+        self,
+        q_vecs: np.ndarray,
+        query_texts: List[str],
+        matched: List[Optional[int]],
+        served: List[List[str]],
+        fetched: Dict[str, np.ndarray],
+        fetched_payloads: Dict[str, Optional[Dict[str, Any]]],
+        top_ids: List[Optional[str]],
+        hot_hits: List[str],
+    ) -> Tuple[List[Tuple[int, str]], List[bool]]:
+        """Write half of ``search_batch``; runs on ``writer``.
+
+        Returns ``(anchor_id, anchor_type)`` per query and a prediction-hit
+        flag per ``matched`` entry.
+        """
+        hits = [a is not None for a in self.anchor_system.credit_predictions(matched)]
+        if hot_hits:
+            self.storage.hot.record_hit_ids(hot_hits)
+        if self.prefetcher is not None:
+            self.prefetcher.apply(self.storage)
+            self.prefetcher.record_served(served)
+
+        # feed cloud results into storage as dynamic / hot (replacing stale copies)
+        if fetched:
+            ids = list(fetched)
+            vectors = np.stack(list(fetched.values()), axis=0).astype("float32")
+            self.storage.upsert_dynamic(vectors, ids, [fetched_payloads.get(vid) for vid in ids])
             self.storage.add_hot(vectors, ids)
 
-        # 4. update anchors & semantic cache
-        anchor = self.anchor_system.process_query(q_vec, query_text)
-        # more predictions for stronger anchors
-        k_pred = 3 if anchor.type == "WEAK" else 5 if anchor.type == "MEDIUM" else 7
-        preds = self.anchor_system.generate_predictions(anchor, k=k_pred)
+        # update anchors & semantic cache
+        t_stage = time.perf_counter()
+        anchors = self.anchor_system.process_queries(q_vecs, query_texts)
+        to_prefetch = []
+        for anchor in {a.id: a for a in anchors}.values():
+            preds = self.anchor_system.generate_predictions(anchor, k=self._prediction_count(anchor))
+            if anchor.type in ("STRONG", "PERMANENT"):
+                to_prefetch.extend(p.vector for p in preds)
+        self.anchor_system.publish(MAINT_PUBLISH_INTERVAL_SEC)
+        if self.prefetcher is not None and to_prefetch:
+            # warm the hot partition for the queries these anchors predict
+            self.prefetcher.submit(np.stack(to_prefetch))
 
         # track semantic clusters using first vector
-        if ids:
-            self.semantic_cache.update_with_vector(q_vec, ids[0])
+        for q_vec, top in zip(q_vecs, top_ids):
+            if top is not None:
+                self.semantic_cache.update_with_vector(q_vec, top)
+        self.metrics.observe("anchor_update", (time.perf_counter() - t_stage) * 1000.0)
+        return [(a.id, a.type) for a in anchors], hits
 
-        latency_ms = (time.time() - t0) * 1000.0
-        self.metrics.record_query(latency_ms=latency_ms, source=source)
+    def _learn_and_cache(
+        self, generation: int, to_cache: Optional[tuple], *learned: Any
+    ) -> Tuple[List[Tuple[int, str]], List[bool]]:
+        """``_learn``, then cache the batch's results (``put_batch`` arguments).
 
-        return {
-            "query": query_text,
-            "ids": ids,
-            "scores": scores,
-            "source": source,
-            "latency_ms": latency_ms,
-            "anchor_id": anchor.id,
-            "anchor_type": anchor.type,
-            "prediction_hit": prediction_hit,
-            "metrics": self.metrics.snapshot(),
-        }
+        The results are dropped if storage changed between the tier reads
+        and this writer step; the batch's own upsert does not count.
+        """
+        fresh = self.result_cache.generation == generation
+        out = self._learn(*learned)
+        if to_cache is not None and fresh:
+            # after the upsert, whose invalidations must not hit these entries
+            self.result_cache.put_batch(*to_cache)
+        return out
+
+    def _learn_remote(self, *learned: Any) -> Tuple[List[Tuple[Any, Any]], List[bool]]:
+        """``_learn`` on the writer process; a failure only loses the learning."""
+        try:
+            out = self.forward.call("learn", *learned)
+        except (OSError, EOFError, RemoteError):
+            logger.warning("could not forward a batch to the writer process", exc_info=True)
+            return [(None, None)] * len(learned[0]), [False] * len(learned[2])
+        if learned[4]:
+            self.writer.call(self._refresh_shared)  # pick up our own cloud results
+        return out
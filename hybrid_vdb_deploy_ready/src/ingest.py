@@ -0,0 +1,416 @@
+"""Streaming bulk ingestion into the permanent tier.
+
+Sources are read in chunks of ``chunk_rows``, so a corpus never has to fit
+in memory: NDJSON text (one ``{"id": ..., "text": ..., <payload fields>}``
+per line) is embedded, ``.npy`` / ``.npz`` vector files are read row block
+by row block straight from the file (``.npz`` members are decompressed as a
+stream). ``Ingestor`` embeds the next chunks on a thread pool while the
+current one is written, so the model and the index work at the same time.
+
+Run from the directory that contains the package (with the service
+stopped; a running one takes ``POST /ingest``)::
+
+    python -m hybrid_vdb.src.ingest corpus.ndjson vectors.npz --data-dir data/tiers
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple,
+)
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+import zipfile
+import numpy as np
+
+from .config import (
+    ENCODE_BATCH_SIZE,
+    INGEST_CHUNK_ROWS,
+    INGEST_JOB_TTL_SEC,
+    INGEST_MAX_JOBS,
+    INGEST_WORKERS,
+    LOCAL_TIERS_DIR,
+)
+from .payloads import Payloads
+
+logger = logging.getLogger(__name__)
+
+TEXT_SUFFIXES = (".ndjson", ".jsonl")
+VECTOR_SUFFIXES = (".npy", ".npz")
+
+
+class Chunk(NamedTuple):
+    ids: List[str]
+    texts: Optional[List[str]]       # to embed, or None when ``vectors`` are given
+    vectors: Optional[np.ndarray]
+    payloads: Payloads
+    read: Optional[float]            # share of the source consumed so far, if known
+
+
+# --- sources ---------------------------------------------------------
+def iter_records(
+    records: Iterable[Dict[str, Any]],
+    chunk_rows: int = INGEST_CHUNK_ROWS,
+    text_field: str = "text",
+    id_field: str = "id",
+    prefix: str = "doc",
+    progress: Optional[Callable[[], float]] = None,
+) -> Iterator[Chunk]:
+    """Chunks of text records; fields other than the id and text become the payload.
+
+    Records without an id get ``<prefix>-<n>`` (``n`` counts from 0).
+    """
+    ids: List[str] = []
+    texts: List[str] = []
+    payloads: List[Optional[Dict[str, Any]]] = []
+    for n, record in enumerate(records):
+        if not isinstance(record, dict) or not isinstance(record.get(text_field), str):
+            raise ValueError(f"record {n} has no {text_field!r} string")
+        ids.append(str(record.get(id_field, f"{prefix}-{n}")))
+        texts.append(record[text_field])
+        payload = {k: v for k, v in record.items() if k not in (id_field, text_field)}
+        payloads.append(payload or None)
+        if len(ids) == chunk_rows:
+            yield Chunk(ids, texts, None, payloads, progress() if progress else None)
+            ids, texts, payloads = [], [], []
+    if ids:
+        yield Chunk(ids, texts, None, payloads, progress() if progress else None)
+
+
+def iter_ndjson(path: Path, chunk_rows: int = INGEST_CHUNK_ROWS, **fields: str) -> Iterator[Chunk]:
+    """``iter_records`` over the lines of an NDJSON file (blank lines skipped)."""
+    path = Path(path)
+    size = max(path.stat().st_size, 1)
+    with open(path, "rb") as f:
+        consumed = 0
+
+        def records():
+            nonlocal consumed
+            for lineno, line in enumerate(f, 1):
+                consumed += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f"{path}:{lineno}: {exc}") from None
+
+        yield from iter_records(
+            records(), chunk_rows, prefix=path.stem, progress=lambda: consumed / size, **fields
+        )
+
+
+def _npy_blocks(f, chunk_rows: int) -> Iterator[Tuple[np.ndarray, float]]:
+    """``(row block, share of rows read)`` of the ``.npy`` array at the
+    current position of file ``f``."""
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    if fortran or dtype.hasobject:
+        raise ValueError("only C-ordered arrays without Python objects can be streamed")
+    row_shape = tuple(shape[1:])
+    row_bytes = dtype.itemsize * int(np.prod(row_shape, dtype=np.int64))
+    for start in range(0, shape[0], chunk_rows):
+        n = min(chunk_rows, shape[0] - start)
+        data = f.read(n * row_bytes)
+        if len(data) != n * row_bytes:
+            raise ValueError("array file is truncated")
+        yield np.frombuffer(data, dtype=dtype).reshape((n,) + row_shape), (start + n) / shape[0]
+
+
+def iter_vectors(path: Path, chunk_rows: int = INGEST_CHUNK_ROWS) -> Iterator[Chunk]:
+    """Chunks of a ``.npy`` (n, dim) array, or an ``.npz`` with ``vectors``
+    and optionally ``ids`` (else ``<stem>-<row>``) arrays of equal length."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        with open(path, "rb") as f:
+            yield from _vector_chunks(path, _npy_blocks(f, chunk_rows), None)
+        return
+    with zipfile.ZipFile(path) as zf:
+        names = set(zf.namelist())
+        if "vectors.npy" not in names:
+            raise ValueError(f"{path} has no 'vectors' array")
+        with zf.open("vectors.npy") as vf:
+            if "ids.npy" not in names:
+                yield from _vector_chunks(path, _npy_blocks(vf, chunk_rows), None)
+                return
+            with zf.open("ids.npy") as idf:
+                yield from _vector_chunks(
+                    path, _npy_blocks(vf, chunk_rows), _npy_blocks(idf, chunk_rows)
+                )
+
+
+def _vector_chunks(path: Path, blocks, id_blocks) -> Iterator[Chunk]:
+    start = 0
+    for block, read in blocks:
+        if block.ndim != 2:
+            raise ValueError(f"{path} holds a {block.ndim}-d array, not (n, dim) vectors")
+        if id_blocks is None:
+            ids = [f"{path.stem}-{start + i}" for i in range(block.shape[0])]
+        else:
+            id_block, _ = next(id_blocks, ([], None))
+            ids = [str(x) for x in id_block]
+            if len(ids) != block.shape[0]:
+                raise ValueError(f"{path} has fewer ids than vectors")
+        start += block.shape[0]
+        yield Chunk(ids, None, np.asarray(block, dtype="float32"), None, read)
+
+
+def read_file(path: Path, chunk_rows: int = INGEST_CHUNK_ROWS, **fields: str) -> Iterator[Chunk]:
+    """Chunks of one source file, by suffix (``TEXT_SUFFIXES`` / ``VECTOR_SUFFIXES``)."""
+    path = Path(path)
+    if path.suffix in TEXT_SUFFIXES:
+        return iter_ndjson(path, chunk_rows, **fields)
+    if path.suffix in VECTOR_SUFFIXES:
+        return iter_vectors(path, chunk_rows)
+    raise ValueError(f"cannot ingest {path.name}: not one of {TEXT_SUFFIXES + VECTOR_SUFFIXES}")
+
+
+# --- pipeline --------------------------------------------------------
+class Ingestor:
+    """Embeds chunks on ``workers`` threads and hands them to ``sink`` in order.
+
+    ``sink(vectors, ids, payloads)`` stores one chunk, e.g.
+    ``LocalVDB.add_permanent`` or, in the service, the router's writer
+    (``for_router``). While chunk ``i`` is written, up to ``workers``
+    following chunks are being read and embedded; nothing else is held,
+    so memory is bounded by ``workers + 1`` chunks.
+
+    ``run(chunks)`` ingests on the calling thread, ``start(chunks)`` on a
+    background thread. ``stats()`` reports progress at any time: rows and
+    chunks written, the share of the source read (if known), sustained
+    vectors per second over the whole run, time spent embedding and
+    writing, and ``state`` ("idle", "running", "done" or "failed" with
+    ``error``).
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[np.ndarray, List[str], Payloads], Any],
+        embedder: Any = None,
+        workers: int = INGEST_WORKERS,
+    ):
+        self.sink = sink
+        self.embedder = embedder
+        self.workers = max(1, workers)
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.counters = {"rows": 0, "chunks": 0, "embed_ms": 0.0, "write_ms": 0.0}
+        self.read: Optional[float] = None
+        self._t0: Optional[float] = None
+        self._t1: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def for_router(cls, router, workers: int = INGEST_WORKERS) -> "Ingestor":
+        """Writes through ``router.write_storage`` (the writer process when sharing)."""
+        return cls(
+            lambda vecs, ids, payloads: router.write_storage("add_permanent", vecs, ids, payloads),
+            router.embedder,
+            workers,
+        )
+
+    def _embed(self, chunk: Chunk):
+        t0 = time.perf_counter()
+        if chunk.vectors is not None:
+            vecs = chunk.vectors
+        elif self.embedder is None:
+            raise ValueError("text chunks need an embedder")
+        else:
+            vecs = np.asarray(
+                self.embedder.encode(chunk.texts, batch_size=ENCODE_BATCH_SIZE), dtype="float32"
+            ).reshape(len(chunk.texts), -1)
+        return vecs, (time.perf_counter() - t0) * 1000.0
+
+    def run(self, chunks: Iterable[Chunk]) -> Dict[str, Any]:
+        """Ingest everything ``chunks`` yields; returns the final ``stats()``."""
+        self.state, self.error = "running", None
+        self._t0, self._t1 = time.perf_counter(), None
+        source = iter(chunks)
+        pending: deque = deque()
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="ingest-embed") as pool:
+
+                def fill() -> None:
+                    while len(pending) < self.workers:
+                        chunk = next(source, None)
+                        if chunk is None:
+                            return
+                        pending.append((chunk, pool.submit(self._embed, chunk)))
+
+                fill()
+                while pending:
+                    chunk, future = pending.popleft()
+                    vecs, embed_ms = future.result()
+                    fill()  # keep the pool busy while this chunk is written
+                    t0 = time.perf_counter()
+                    self.sink(vecs, chunk.ids, chunk.payloads)
+                    self.counters["write_ms"] += (time.perf_counter() - t0) * 1000.0
+                    self.counters["embed_ms"] += embed_ms
+                    self.counters["rows"] += len(chunk.ids)
+                    self.counters["chunks"] += 1
+                    if chunk.read is not None:
+                        self.read = chunk.read
+                    logger.debug("ingested %d rows", self.counters["rows"])
+        except Exception as exc:
+            for _, future in pending:
+                future.cancel()
+            self.state, self.error = "failed", f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._t1 = time.perf_counter()
+        self.state = "done"
+        if self.read is not None:
+            self.read = 1.0
+        return self.stats()
+
+    def _run_logged(self, chunks: Iterable[Chunk]) -> None:
+        try:
+            self.run(chunks)
+        except Exception:
+            logger.exception("ingestion failed")
+
+    def start(self, chunks: Iterable[Chunk]) -> None:
+        """``run`` on a daemon thread; follow it with ``stats()`` / ``join()``."""
+        if self.state == "running":
+            raise RuntimeError("this ingestor is already running")
+        self.state = "running"
+        self._thread = threading.Thread(
+            target=self._run_logged, args=(chunks,), name="ingest", daemon=True
+        )
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def finished_at(self) -> Optional[float]:
+        """``time.perf_counter()`` when the last run ended, None while running."""
+        return self._t1 if self.state in ("done", "failed") else None
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self._t0 is not None:
+            elapsed = (self._t1 if self._t1 is not None else time.perf_counter()) - self._t0
+        return {
+            "state": self.state,
+            **self.counters,
+            "read": self.read,
+            "elapsed_s": elapsed,
+            "vectors_per_sec": self.counters["rows"] / elapsed if elapsed > 0 else 0.0,
+            "error": self.error,
+        }
+
+
+class IngestJobs:
+    """Ingestors of a service by job id, with bounded retention.
+
+    A finished (done or failed) job stays queryable for ``ttl_sec``, and
+    at most ``max_jobs`` finished ones are kept (oldest dropped first);
+    running jobs are never dropped. Rows written by dropped jobs are kept
+    in a running total, so ``stats`` only looks at the jobs still held.
+    """
+
+    def __init__(
+        self,
+        ttl_sec: float = INGEST_JOB_TTL_SEC,
+        max_jobs: int = INGEST_MAX_JOBS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.ttl_sec = ttl_sec
+        self.max_jobs = max_jobs
+        self.clock = clock
+        self._jobs: Dict[str, Ingestor] = {}
+        self._dropped_rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, job: Ingestor) -> str:
+        """Register ``job``; returns its new id."""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Ingestor]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        now = self.clock()
+        finished = [
+            (job_id, job) for job_id, job in self._jobs.items() if job.finished_at is not None
+        ]
+        expired = [job_id for job_id, job in finished if now - job.finished_at > self.ttl_sec]
+        excess = len(finished) - len(expired) - self.max_jobs
+        if excess > 0:
+            alive = [job_id for job_id, _ in finished if job_id not in expired]
+            oldest = sorted(alive, key=lambda job_id: self._jobs[job_id].finished_at)
+            expired += oldest[:excess]
+        for job_id in expired:
+            self._dropped_rows += self._jobs.pop(job_id).counters["rows"]
+
+    def stats(self) -> Dict[str, int]:
+        """Running jobs and rows written by every job so far."""
+        with self._lock:
+            self._prune()
+            jobs = list(self._jobs.values())
+            dropped = self._dropped_rows
+        return {
+            "jobs": len(jobs),
+            "jobs_running": sum(job.state == "running" for job in jobs),
+            "rows": dropped + sum(job.counters["rows"] for job in jobs),
+        }
+
+
+# --- command line ----------------------------------------------------
+def main(argv: Sequence[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream files into the permanent tier.")
+    parser.add_argument("files", nargs="+", type=Path, help=".ndjson / .jsonl or .npy / .npz")
+    parser.add_argument("--data-dir", type=Path, default=LOCAL_TIERS_DIR, help="tiers to write")
+    parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--embedder", default=None, help="backend (default: EMBEDDER_BACKEND)")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    args = parser.parse_args(argv)
+
+    from .embedders import make_embedder
+    from .local_vdb import LocalVDB
+
+    local = LocalVDB(args.data_dir)
+    embedder = None
+    if any(f.suffix in TEXT_SUFFIXES for f in args.files):
+        embedder = make_embedder(args.embedder) if args.embedder else make_embedder()
+    try:
+        for path in args.files:
+            ingestor = Ingestor(local.add_permanent, embedder, args.workers)
+            fields = dict(text_field=args.text_field, id_field=args.id_field)
+            ingestor.start(read_file(path, args.chunk_rows, **fields))
+            while ingestor.state == "running":
+                ingestor.join(1.0)
+                s = ingestor.stats()
+                read = f" ({s['read']:.0%} read)" if s["read"] is not None else ""
+                print(
+                    f"{path.name}: {s['rows']} rows{read}, {s['vectors_per_sec']:.0f} vectors/s",
+                    file=sys.stderr,
+                )
+            print(json.dumps({"file": str(path), **ingestor.stats()}))
+            if ingestor.state == "failed":
+                raise SystemExit(1)
+    finally:
+        local.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import copy
+import numpy as np
+
+from .config import EMBEDDING_DIM, IVF_NLIST, IVF_NPROBE, RANDOM_SEED
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(m, axis=-1, keepdims=True)
+    norm[norm == 0] = 1.0
+    return m / norm
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Nearest (max inner product) centroid for every row of ``x``."""
+    out = np.empty(x.shape[0], dtype="int64")
+    for start in range(0, x.shape[0], chunk):
+        block = np.asarray(x[start : start + chunk], dtype="float32")
+        out[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(
+    x: np.ndarray, k: int, n_iter: int = 20, seed: int = RANDOM_SEED, spherical: bool = False
+) -> np.ndarray:
+    """Plain NumPy Lloyd's k-means.
+
+    With ``spherical=True`` points are assigned by inner product and
+    centroids are renormalized (cosine k-means on unit vectors). Empty
+    clusters are re-seeded from random training points.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype="float32")
+    k = min(k, x.shape[0])
+    centroids = x[rng.choice(x.shape[0], k, replace=False)].copy()
+    for _ in range(n_iter):
+        if spherical:
+            assign = _assign(x, centroids)
+        else:
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            half_sq = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+            assign = np.argmax(x @ centroids.T - half_sq, axis=1)
+        counts = np.bincount(assign, minlength=k)
+        order = np.argsort(assign, kind="stable")
+        nonempty = np.flatnonzero(counts)
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(x[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        if spherical:
+            centroids = _unit(sums).astype("float32")
+        else:
+            centroids = (sums / np.maximum(counts, 1)[:, None]).astype("float32")
+        if empty.size:
+            centroids[empty] = x[rng.choice(x.shape[0], empty.size, replace=False)]
+    return centroids
+
+
+def spherical_kmeans(
+    x: np.ndarray, k: int, n_iter: int = 20, seed: int = RANDOM_SEED
+) -> np.ndarray:
+    """k-means on the unit sphere; returns ``k`` unit-norm centroids."""
+    return kmeans(x, k, n_iter, seed, spherical=True)
+
+
+class IVFIndex:
+    """Inverted-file (IVF-Flat) index in pure NumPy.
+
+    The vectors themselves stay in the owning ``VectorBuffer``; each inverted
+    list only holds row positions into it. ``nprobe`` trades recall for speed:
+    a search scores ``nprobe / nlist`` of the corpus on average.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._sizes = np.zeros(0, dtype="int64")
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def min_train_size(self) -> int:
+        # a few dozen points per list keeps k-means from producing junk lists
+        return self.nlist * 32
+
+    def train(self, vectors: np.ndarray, max_samples: int = 256) -> None:
+        """Fit the coarse quantizer on (a sample of) ``vectors``."""
+        rng = np.random.default_rng(RANDOM_SEED)
+        n = vectors.shape[0]
+        limit = self.nlist * max_samples
+        sample = vectors if n <= limit else vectors[np.sort(rng.choice(n, limit, replace=False))]
+        self.centroids = spherical_kmeans(sample, self.nlist)
+        self.nlist = self.centroids.shape[0]
+        self._lists = [np.empty(16, dtype="int64") for _ in range(self.nlist)]
+        self._sizes = np.zeros(self.nlist, dtype="int64")
+
+    def add(self, vectors: np.ndarray, positions: np.ndarray) -> None:
+        """Route unit ``vectors`` (stored at ``positions``) to their lists."""
+        assign = _assign(vectors, self.centroids)
+        order = np.argsort(assign, kind="stable")
+        lists, starts, counts = np.unique(assign[order], return_index=True, return_counts=True)
+        for lst, start, count in zip(lists.tolist(), starts.tolist(), counts.tolist()):
+            size = self._sizes[lst]
+            arr = self._lists[lst]
+            if size + count > arr.shape[0]:
+                grown = np.empty(max(arr.shape[0] * 2, size + count), dtype="int64")
+                grown[:size] = arr[:size]
+                self._lists[lst] = arr = grown
+            arr[size : size + count] = positions[order[start : start + count]]
+            self._sizes[lst] = size + count
+
+    def probe(self, q: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Row positions in the ``nprobe`` lists closest to unit query ``q``."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        cs = self.centroids @ q
+        if nprobe < self.nlist:
+            lists = np.argpartition(-cs, nprobe - 1)[:nprobe]
+        else:
+            lists = np.arange(self.nlist)
+        return np.concatenate([self._lists[i][: self._sizes[i]] for i in lists])
+
+    def snapshot(self) -> "IVFIndex":
+        """Frozen copy for concurrent ``probe``: shares the list arrays (``add``
+        only writes past the recorded sizes or into grown copies)."""
+        snap = copy.copy(self)
+        snap._lists = list(self._lists)
+        snap._sizes = self._sizes.copy()
+        return snap
+
+    def list_sizes(self) -> np.ndarray:
+        return self._sizes.copy()
@@ -1,7 +1,29 @@
 from __future__ import annotations
+from collections import deque
+from contextlib import nullcontext
+import threading
+import time
 import numpy as np
-from typing import List, Tuple, Optional
-from .config import EMBEDDING_DIM
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Tuple, Optional
+from pathlib import Path
+from .config import (
+    EMBEDDING_DIM,
+    VECTOR_DTYPE,
+    LOCAL_INDEX_BACKEND,
+    PERMANENT_QUANTIZATION,
+    PERSIST_LOCAL_TIERS,
+    LOCAL_TIERS_DIR,
+    DYNAMIC_CAPACITY,
+    DYNAMIC_EVICTION,
+    DYNAMIC_LOW_WATER,
+    FILTER_PREFILTER_SHARE,
+    RECLAIM_DEAD_RATIO,
+)
+from .buffers import SegmentedBuffer, VectorBuffer, _normalize, _topk
+from .ivf_index import IVFIndex
+from .payloads import Filter, PayloadIndex, Payloads, normalize_filter
+from .quantization import QuantizedBuffer
+from .segments import SegmentStore, SegmentedIds
 
 try:
     import faiss  # type: ignore
@@ -10,82 +32,658 @@ except Exception:  # pragma: no cover - optional dependency
     faiss = None
     _HAS_FAISS = False
 
+# with at most this many tombstoned rows a search over-fetches and filters;
+# beyond it the scan is restricted to live rows
+_OVERFETCH_LIMIT = 256
+# searches whose usage (recency / hit counts) waits for the next write
+_USAGE_BACKLOG = 4096
 
-def _normalize(v: np.ndarray) -> np.ndarray:
-    norm = np.linalg.norm(v, axis=1, keepdims=True)
-    norm[norm == 0] = 1.0
-    return v / norm
+
+def _resolve_backend(backend: str, quantized: bool = False) -> str:
+    if backend == "auto":
+        return "faiss" if _HAS_FAISS and not quantized else "flat"
+    if backend == "faiss" and not _HAS_FAISS:
+        raise RuntimeError("faiss backend requested but faiss is not installed")
+    if backend == "faiss" and quantized:
+        raise ValueError("quantized storage is only supported by the flat and ivf backends")
+    if backend not in ("flat", "ivf", "faiss"):
+        raise ValueError(f"unknown index backend: {backend!r}")
+    return backend
+
+
+class _FaissStore:
+    """``VectorBuffer``-compatible store backed by a FAISS ``IndexFlatIP``.
+
+    The FAISS index is the only copy of the vectors; ``view`` and ``rows``
+    reconstruct from it on demand.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.index = faiss.IndexFlatIP(dim)
+
+    def snapshot(self) -> "_FaissStore":
+        # FAISS cannot be frozen cheaply; SimpleIndex serializes its reads
+        # with writes instead
+        return self
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def view(self) -> np.ndarray:
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.ntotal * self.dim * 4
+
+    def add(self, vecs: np.ndarray, normalized: bool = False) -> None:
+        vecs = np.ascontiguousarray(vecs, dtype="float32")
+        self.index.add(vecs if normalized else _normalize(vecs))
+
+    def rows(self, idx: np.ndarray) -> np.ndarray:
+        return self.index.reconstruct_batch(np.asarray(idx, dtype="int64"))
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        return self.view @ q
+
+    def scores_at(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return self.rows(rows) @ q
+
+    def search(
+        self, q: np.ndarray, k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if rows is not None:
+            scores = self.scores_at(q, rows)
+            top = _topk(scores, k)
+            return rows[top], scores[top]
+        scores, idx = self.index.search(np.ascontiguousarray(q[None, :], dtype="float32"), k)
+        keep = idx[0] >= 0
+        return idx[0][keep], scores[0][keep]
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        n_ex = int(exclude.sum()) if exclude is not None else 0
+        scores, idx = self.index.search(np.ascontiguousarray(queries, dtype="float32"), k + n_ex)
+        scores[idx < 0] = -np.inf
+        if n_ex:
+            scores[exclude[np.maximum(idx, 0)]] = -np.inf
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+            idx = np.take_along_axis(idx, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+        return np.maximum(idx, 0), scores
+
+
+class _IndexSnapshot(NamedTuple):
+    """Everything a search reads, frozen at the end of the last write."""
+
+    gen: int                        # bumped whenever row positions change
+    n: int                          # rows, tombstoned ones included
+    n_dead: int
+    buf: Any                        # buffer snapshot
+    ids: Any                        # id column, append-only up to ``n``
+    dead: Optional[np.ndarray]      # tombstone mask copy, None if no row is dead
+    ann: Optional[IVFIndex]         # trained IVF snapshot, else None
+    payloads: PayloadIndex          # append-only, valid for the first ``n`` rows
 
 
 class SimpleIndex:
-    """Small wrapper around FAISS or a NumPy brute‑force index.
+    """Small wrapper around FAISS or a NumPy brute‑force / IVF index.
 
-    This is intentionally minimal – just enough to show the idea.
+    ``backend`` is one of ``"flat"`` (exact NumPy scan), ``"ivf"`` (NumPy
+    IVF-Flat, see ``ivf_index.py``), ``"faiss"`` or ``"auto"``. The IVF
+    backend scans exactly until it has enough vectors to train, then routes
+    every insert to its inverted list; tune recall with ``ann.nprobe``.
+
+    ``quantization="int8"`` or ``"pq"`` keeps only compressed codes in RAM
+    and re-ranks a small shortlist exactly (see ``quantization.py``).
+
+    With a ``path`` the index is persistent: inserts are appended to a
+    ``SegmentStore`` there and an existing store is loaded on construction.
+    The flat backend searches the mapped segment files in place, so opening
+    it costs the same regardless of corpus size; other stores are rebuilt
+    from the segments.
+
+    Rows are positional, so ``remove`` and ``upsert`` only tombstone the old
+    rows; searches skip them. Once tombstones reach ``RECLAIM_DEAD_RATIO`` of
+    the rows, ``reclaim`` rebuilds the store without them. With a
+    ``capacity``, inserts past it evict live rows by ``eviction``:
+    ``"recency"`` (least recently inserted or returned) or ``"score"``
+    (fewest appearances in search results, then recency), down to
+    ``low_water * capacity`` at once so the ranking is not redone on
+    every insert.
+
+    Concurrency: one writer, any number of readers. Every write ends by
+    publishing an immutable ``_IndexSnapshot`` (O(1) buffer views plus a
+    copy of the tombstone mask); searches read only the snapshot current
+    when they start and never take a lock, so an ``upsert`` is seen either
+    entirely or not at all. Searches do not touch the usage columns
+    either: they queue the rows they returned and the next write credits
+    them. The faiss backend cannot be frozen and serializes reads with
+    writes through a lock.
+
+    Every row may carry a payload dict (``add(..., payloads=...)``);
+    ``PAYLOAD_INDEX_FIELDS`` are indexed (``payloads.py``). A search
+    with ``filter`` masks the rows that fail it before top-k: a filter
+    matching at most ``FILTER_PREFILTER_SHARE`` of the live rows only
+    scores those rows ("prefilter"), a broader one runs the usual scan with
+    the others masked out ("postfilter"; IVF probes its lists and falls
+    back to the matching rows when they hold fewer than ``k``).
+    ``filter_counts`` counts the strategies chosen.
+
+    ``read_only`` (needs ``path``) opens a store that another process
+    writes: writes raise, and ``refresh`` applies what the writer has
+    logged since, so several processes can serve one on-disk index with
+    the segments mapped once in the page cache.
     """
 
-    def __init__(self, dim: int = EMBEDDING_DIM):
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        dtype: str = VECTOR_DTYPE,
+        backend: str = LOCAL_INDEX_BACKEND,
+        quantization: Optional[str] = None,
+        path: Optional[Path] = None,
+        capacity: Optional[int] = None,
+        eviction: str = "recency",
+        read_only: bool = False,
+        low_water: float = 1.0,
+    ):
+        if eviction not in ("recency", "score"):
+            raise ValueError(f"unknown eviction policy: {eviction!r}")
+        if read_only and path is None:
+            raise ValueError("a read-only index needs a path to follow")
         self.dim = dim
-        self.vectors = np.empty((0, dim), dtype="float32")
+        self.dtype = dtype
+        self.quantization = quantization
+        self.backend = _resolve_backend(backend, quantized=quantization is not None)
+        self.capacity = capacity
+        self.eviction = eviction
+        self.low_water = low_water
+        self.evictions = 0
+        self.filter_counts = {"prefilter": 0, "postfilter": 0}
+        self._counts_lock = threading.Lock()  # searches count from many threads
+        self.read_only = read_only
+        self._stale = False  # a refresh failed half-way; reopen on the next one
+        self._usage: Deque[Tuple[int, np.ndarray, float]] = deque(maxlen=_USAGE_BACKLOG)
+        self._guard = threading.Lock() if self.backend == "faiss" else nullcontext()
+        self._gen = -1
+        self._reset()
+
+        self._disk: Optional[SegmentStore] = None
+        if path is not None:
+            seg_dtype = dtype if isinstance(self._buf, VectorBuffer) else "float32"
+            self._disk = SegmentStore(path, dim, dtype=seg_dtype, read_only=read_only)
+            self._load()
+        self._publish()
+
+    def _reset(self) -> None:
+        if self.quantization is not None:
+            self._buf = QuantizedBuffer(self.dim, kind=self.quantization)
+        elif self.backend == "faiss":
+            self._buf = _FaissStore(self.dim)
+        else:
+            self._buf = VectorBuffer(self.dim, self.dtype)
         self.ids: List[str] = []
+        self.payloads = PayloadIndex()
+
+        self.index = getattr(self._buf, "index", None)
+        self.ann = IVFIndex(self.dim) if self.backend == "ivf" else None
+        self._gen += 1
 
-        if _HAS_FAISS:
-            self.index = faiss.IndexFlatIP(dim)
+        # per-row bookkeeping, grown alongside the buffer
+        self._dead = np.zeros(0, dtype=bool)
+        self._last_used = np.zeros(0, dtype="float64")
+        self._hits = np.zeros(0, dtype="int64")
+        self._n_dead = 0
+        self._pos: Optional[Dict[str, int]] = None  # id -> newest live row
+        self._older: Dict[str, List[int]] = {}  # earlier live rows of re-added ids
+
+    def _load(self) -> None:
+        segments, tail_vecs, tail_ids, deleted = self._disk.open()
+        if isinstance(self._buf, VectorBuffer):
+            self._buf = SegmentedBuffer(self.dim, self.dtype, [s.vectors for s in segments])
+        else:
+            for s in segments:
+                self._buf.add(s.vectors, normalized=True)
+        self.ids = SegmentedIds(s.ids for s in segments)
+        if tail_ids:
+            self._buf.add(tail_vecs, normalized=True)
+            self.ids.extend(tail_ids)
+        # no per-row Python work: payloads are indexed on first use and the
+        # rows of deleted ids are found with a vectorized scan of the id column
+        if self._disk.payloads:
+            ids, stored = self.ids.snapshot(), dict(self._disk.payloads)
+            self.payloads.defer(
+                len(ids), lambda: ((r, stored[ids[r]]) for r in ids.find(stored).tolist())
+            )
         else:
-            self.index = None
+            self.payloads.pad(len(self.ids))
+        self._track(len(self.ids))
+        if deleted:
+            rows = self.ids.find(deleted).tolist()
+            self._kill([r for r in rows if r < deleted[self.ids[r]]])
+        if self.ann is not None and len(self._buf) >= self.ann.min_train_size:
+            self.ann.train(self._buf.view)
+            self.ann.add(self._buf.view, np.arange(len(self._buf)))
+
+    def __len__(self) -> int:
+        """Number of live (not tombstoned) rows."""
+        return len(self.ids) - self._n_dead
+
+    def __contains__(self, vec_id: str) -> bool:
+        return vec_id in self._positions()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Stored vectors (unit-normalized), tombstoned rows included."""
+        return self._buf.view
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes held by the vector store and payload index."""
+        return self._buf.nbytes + self.payloads.nbytes
+
+    def payload(self, vec_id: str) -> Optional[Dict[str, Any]]:
+        """Payload of the newest live row of ``vec_id``, None if it has none."""
+        row = self._positions().get(vec_id)
+        return self.payloads.rows[row] if row is not None else None
+
+    # --- bookkeeping -------------------------------------------------
+    def _track(self, n_rows: int) -> None:
+        cap = self._dead.shape[0]
+        if n_rows <= cap:
+            return
+        new_cap = max(n_rows, cap * 2, 1024)
+        for name in ("_dead", "_last_used", "_hits"):
+            old = getattr(self, name)
+            grown = np.zeros(new_cap, dtype=old.dtype)
+            grown[:cap] = old
+            setattr(self, name, grown)
+
+    def _positions(self) -> Dict[str, int]:
+        """id -> newest live row; built on first use so opening stays cheap."""
+        if self._pos is None:
+            self._pos, self._older = {}, {}
+            for i, vid in enumerate(self.ids):
+                if not self._dead[i]:
+                    self._index_row(vid, i)
+        return self._pos
 
-    def add(self, vecs: np.ndarray, ids: List[str]) -> None:
+    def _index_row(self, vid: str, row: int) -> None:
+        prev = self._pos.get(vid)
+        if prev is not None:
+            self._older.setdefault(vid, []).append(prev)
+        self._pos[vid] = row
+
+    def _kill(self, rows: List[int]) -> None:
+        if rows:
+            self._dead[rows] = True
+            self._n_dead += len(rows)
+
+    def _publish(self) -> None:
+        n = len(self.ids)
+        ids = self.ids.snapshot() if isinstance(self.ids, SegmentedIds) else self.ids
+        self._snap = _IndexSnapshot(
+            gen=self._gen,
+            n=n,
+            n_dead=self._n_dead,
+            buf=self._buf.snapshot(),
+            ids=ids,
+            dead=self._dead[:n].copy() if self._n_dead else None,
+            ann=self.ann.snapshot() if self.ann is not None and self.ann.is_trained else None,
+            payloads=self.payloads,
+        )
+
+    def _apply_usage(self) -> None:
+        """Credit rows returned by searches since the last write."""
+        while self._usage:
+            gen, rows, now = self._usage.popleft()
+            if gen == self._gen:
+                self._last_used[rows] = now
+                self._hits[rows] += 1
+
+    # --- writes ------------------------------------------------------
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError("read-only index: writes belong to the writing process")
+
+    def add(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        """Append rows; an id that is already present keeps its old rows too."""
+        self._check_writable()
+        with self._guard:
+            self._add(vecs, ids, payloads)
+            self._publish()
+
+    def upsert(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        """Replace the rows of ``ids`` that are present and add the rest."""
+        self._check_writable()
+        with self._guard:
+            self._drop(ids)
+            self._add(vecs, ids, payloads)
+            self._publish()
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Tombstone every live row of ``ids``; returns the number of rows removed."""
+        self._check_writable()
+        with self._guard:
+            n = self._drop(ids)
+            self._maybe_reclaim()
+            self._publish()
+        return n
+
+    def _add(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
         assert vecs.shape[1] == self.dim
-        vecs = vecs.astype("float32")
-        if _HAS_FAISS:
-            faiss.normalize_L2(vecs)
-            self.index.add(vecs)
-        self.vectors = np.vstack([self.vectors, vecs])
+        if payloads is not None and len(payloads) != len(ids):
+            raise ValueError("need one payload (or None) per id")
+        vecs = _normalize(vecs.astype("float32"))
+        self._apply_usage()
+        sealed = self._disk.append(vecs, ids, payloads) if self._disk is not None else None
+        self._append(vecs, ids, sealed, payloads)
+        self._enforce_capacity()
+        self._maybe_reclaim()
+
+    def _append(
+        self, vecs: np.ndarray, ids: List[str], sealed=None, payloads: Payloads = None
+    ) -> None:
+        start = len(self._buf)
+        self._buf.add(vecs, normalized=True)
         self.ids.extend(ids)
+        self.payloads.extend(list(payloads) if payloads is not None else [None] * len(ids))
+        if sealed is not None:
+            # the log rows just became a mapped segment; drop the heap copies
+            if isinstance(self._buf, SegmentedBuffer):
+                self._buf.freeze_tail(sealed.vectors)
+            self.ids.freeze_tail(sealed.ids)
+        end = len(self._buf)
+        self._track(end)
+        self._last_used[start:end] = time.time()
+        if self._pos is not None:
+            for i, vid in enumerate(ids):
+                self._index_row(vid, start + i)
+        if self.ann is not None:
+            if self.ann.is_trained:
+                self.ann.add(vecs, np.arange(start, end))
+            elif end >= self.ann.min_train_size:
+                self.ann.train(self._buf.view)
+                self.ann.add(self._buf.view, np.arange(end))
 
-    def search(self, query: np.ndarray, k: int = 5) -> Tuple[List[str], List[float]]:
-        if self.vectors.shape[0] == 0:
-            return [], []
+    def _drop(self, ids: Iterable[str]) -> int:
+        pos = self._positions()
+        rows: List[int] = []
+        gone: List[str] = []
+        for vid in dict.fromkeys(ids):
+            row = pos.pop(vid, None)
+            if row is None:
+                continue
+            rows.append(row)
+            rows.extend(self._older.pop(vid, ()))
+            gone.append(vid)
+        if gone and self._disk is not None:
+            self._disk.delete(gone)
+        self._kill(rows)
+        return len(rows)
+
+    def _enforce_capacity(self) -> None:
+        if self.capacity is None or len(self) <= self.capacity:
+            return
+        excess = len(self) - int(self.capacity * self.low_water)
+        live = np.flatnonzero(~self._dead[: len(self.ids)])
+        if self.eviction == "score":
+            order = np.lexsort((live, self._last_used[live], self._hits[live]))
+        else:
+            order = np.lexsort((live, self._last_used[live]))
+        victims = live[order[:excess]]
+        self.evictions += self._drop([self.ids[i] for i in victims.tolist()])
+
+    def _maybe_reclaim(self) -> None:
+        if self._n_dead and self._n_dead >= RECLAIM_DEAD_RATIO * len(self.ids):
+            self._reclaim()
+
+    def reclaim(self) -> None:
+        """Rebuild the store without tombstoned rows; on disk this compacts."""
+        if self.read_only:
+            return
+        with self._guard:
+            self._reclaim()
+            self._publish()
+
+    def _reclaim(self) -> None:
+        if not self._n_dead and (self._disk is None or self._disk.compacted):
+            return  # nothing to drop or merge: spare the writer a rewrite
+        self._apply_usage()
+        live = np.flatnonzero(~self._dead[: len(self.ids)])
+        usage = {self.ids[i]: (self._last_used[i], self._hits[i]) for i in live.tolist()}
+        if self._disk is not None:
+            self._disk.compact()
+            self._reset()
+            self._load()
+        else:
+            vecs = np.asarray(self._buf.view[live], dtype="float32")
+            ids = [self.ids[i] for i in live.tolist()]
+            payloads = [self.payloads.rows[i] for i in live.tolist()]
+            self._reset()
+            if ids:
+                self._append(vecs, ids, payloads=payloads)
+        for i, vid in enumerate(self.ids):
+            if vid in usage:
+                self._last_used[i], self._hits[i] = usage[vid]
+
+    def refresh(self) -> Optional[Tuple[List[str], np.ndarray, List[str]]]:
+        """Apply what the writing process logged since the last refresh.
+
+        Read-only indexes only. Returns ``(added ids, their unit vectors,
+        deleted ids)``, or None when the index had to be reopened because
+        the writer sealed or compacted (any row may have changed). If the
+        reopen fails (a file vanished mid-read) searches keep the previous
+        snapshot and the next call retries.
+        """
+        with self._guard:
+            change = None if self._stale else self._disk.poll()
+            if change is None:
+                self._stale = True
+                self._reset()
+                self._load()
+                self._stale = False
+                self._publish()
+                return None
+            vecs, ids, deleted = change
+            if ids:
+                self._append(vecs, ids, payloads=[self._disk.payloads.get(vid) for vid in ids])
+            gone = self._apply_tombstones(deleted)
+            if ids or gone:
+                self._publish()
+            return ids, vecs, gone
+
+    def _apply_tombstones(self, deleted: Dict[str, int]) -> List[str]:
+        """Kill the rows of each deleted id that precede its deletion point."""
+        pos = self._positions()
+        rows: List[int] = []
+        gone: List[str] = []
+        for vid, at in deleted.items():
+            newest = pos.get(vid)
+            have = self._older.get(vid, []) + ([newest] if newest is not None else [])
+            dead = [r for r in have if r < at]
+            if not dead:
+                continue
+            rows.extend(dead)
+            gone.append(vid)
+            keep = sorted(r for r in have if r >= at)
+            pos.pop(vid, None)
+            self._older.pop(vid, None)
+            if keep:
+                pos[vid] = keep[-1]
+                if len(keep) > 1:
+                    self._older[vid] = keep[:-1]
+        self._kill(rows)
+        return gone
+
+    # --- reads -------------------------------------------------------
+    def search(
+        self, query: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[str], List[float]]:
+        if filter:
+            ids, scores = self.search_batch(np.asarray(query).reshape(1, -1), k, filter)
+            return ids[0], scores[0]
+        with self._guard:
+            snap = self._snap
+            ids, scores, idx = self._search_one(snap, query, k)
+        self._usage.append((snap.gen, idx, time.time()))
+        return ids, scores
+
+    def _search_one(self, snap: _IndexSnapshot, query: np.ndarray, k: int):
+        if snap.n == snap.n_dead:
+            return [], [], np.empty(0, dtype="int64")
         query = query.astype("float32")
         if query.ndim == 1:
             query = query[None, :]
-        if _HAS_FAISS:
-            faiss.normalize_L2(query)
-            scores, idx = self.index.search(query, k)
-            idx = idx[0]
-            scores = scores[0]
-        else:
-            # cosine similarity via NumPy
-            vnorm = _normalize(self.vectors)
-            qnorm = _normalize(query)[0]
-            scores = (vnorm @ qnorm).astype("float32")
-            idx = np.argsort(-scores)[:k]
-            scores = scores[idx]
-        ids = [self.ids[i] for i in idx if i < len(self.ids)]
-        return ids, scores.tolist()
+        q = _normalize(query)[0]
+        rows = snap.ann.probe(q) if snap.ann is not None else None
+        fetch = k
+        if snap.n_dead:
+            if rows is not None:
+                rows = rows[~snap.dead[rows]]
+            elif snap.n_dead > _OVERFETCH_LIMIT:
+                rows = np.flatnonzero(~snap.dead)
+            else:
+                fetch = k + snap.n_dead
+        idx, scores = snap.buf.search(q, fetch, rows=rows)
+        if fetch > k:
+            keep = ~snap.dead[idx]
+            idx, scores = idx[keep][:k], scores[keep][:k]
+        return [snap.ids[i] for i in idx], scores.tolist(), idx
+
+    def search_batch(
+        self, queries: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[List[str]], List[List[float]]]:
+        """``search`` for every row of ``queries``, scored with one GEMM.
+
+        With ``filter`` (see ``payloads.normalize_filter``) only rows whose
+        payload passes it are returned.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        flt = normalize_filter(filter)
+        with self._guard:
+            snap = self._snap
+            if snap.n == snap.n_dead:
+                return [[] for _ in queries], [[] for _ in queries]
+            out_ids: List[List[str]] = []
+            out_scores: List[List[float]] = []
+            used: List[np.ndarray] = []
+            if flt is not None:
+                for row_idx, row_scores in self._search_filtered(snap, _normalize(queries), k, flt):
+                    used.append(row_idx)
+                    out_ids.append([snap.ids[i] for i in row_idx])
+                    out_scores.append(row_scores.tolist())
+            elif snap.ann is not None:
+                # each query probes its own lists
+                for q in queries:
+                    ids, scores, idx = self._search_one(snap, q, k)
+                    out_ids.append(ids)
+                    out_scores.append(scores)
+                    used.append(idx)
+            else:
+                idx, scores = snap.buf.search_batch(_normalize(queries), k, exclude=snap.dead)
+                for row_idx, row_scores in zip(idx, scores):
+                    keep = np.isfinite(row_scores)
+                    row_idx = row_idx[keep]
+                    used.append(row_idx)
+                    out_ids.append([snap.ids[i] for i in row_idx])
+                    out_scores.append(row_scores[keep].tolist())
+        self._usage.append((snap.gen, np.concatenate(used), time.time()))
+        return out_ids, out_scores
+
+    def _count_filter(self, strategy: str) -> None:
+        with self._counts_lock:
+            self.filter_counts[strategy] += 1
+
+    def _search_filtered(
+        self, snap: _IndexSnapshot, queries: np.ndarray, k: int, flt: Filter
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Top-``k`` (rows, scores) among the live rows passing ``flt``."""
+        allowed = snap.payloads.match(flt, snap.n)
+        if snap.dead is not None:
+            allowed &= ~snap.dead
+        n_allowed = int(allowed.sum())
+        if not n_allowed:
+            return [(np.empty(0, dtype="int64"), np.empty(0, dtype="float32"))] * len(queries)
+        if n_allowed <= FILTER_PREFILTER_SHARE * (snap.n - snap.n_dead):
+            self._count_filter("prefilter")
+            rows = np.flatnonzero(allowed)
+            return [snap.buf.search(q, k, rows=rows) for q in queries]
+        self._count_filter("postfilter")
+        if snap.ann is None:
+            idx, scores = snap.buf.search_batch(queries, k, exclude=~allowed)
+            keep = np.isfinite(scores)
+            return [(i[m], s[m]) for i, s, m in zip(idx, scores, keep)]
+        out = []
+        for q in queries:
+            rows = snap.ann.probe(q)
+            rows = rows[allowed[rows]]
+            if rows.shape[0] < k:  # the probed lists hold too few matches
+                rows = np.flatnonzero(allowed)
+            out.append(snap.buf.search(q, k, rows=rows))
+        return out
+
+    def compact(self) -> None:
+        """Merge on-disk segments, dropping deleted and superseded rows."""
+        self.reclaim()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
 
 
 class LocalVDB:
     """Two‑tier local vector store: permanent + dynamic.
 
-    This class does **not** do any persistence – it is purely in‑memory and
-    intended for demonstration.
+    In-memory by default. With ``data_dir`` (or ``PERSIST_LOCAL_TIERS``) each
+    tier is backed by memory-mapped segment files under
+    ``data_dir/permanent`` and ``data_dir/dynamic`` and survives restarts.
+    The dynamic tier holds at most ``DYNAMIC_CAPACITY`` vectors and evicts
+    by ``DYNAMIC_EVICTION`` beyond that, down to ``DYNAMIC_LOW_WATER`` of
+    it. Writes take optional per-row payloads and searches an optional
+    payload ``filter``. ``read_only`` follows tiers that another process
+    writes (see ``SimpleIndex.refresh``).
     """
 
-    def __init__(self):
-        self.permanent = SimpleIndex()
-        self.dynamic = SimpleIndex()
+    def __init__(self, data_dir: Optional[Path] = None, read_only: bool = False):
+        if data_dir is None and PERSIST_LOCAL_TIERS:
+            data_dir = LOCAL_TIERS_DIR
+        self.data_dir = Path(data_dir) if data_dir is not None else None
+        perm_path = self.data_dir / "permanent" if self.data_dir else None
+        dyn_path = self.data_dir / "dynamic" if self.data_dir else None
+        self.permanent = SimpleIndex(
+            quantization=PERMANENT_QUANTIZATION, path=perm_path, read_only=read_only
+        )
+        self.dynamic = SimpleIndex(
+            path=dyn_path,
+            capacity=DYNAMIC_CAPACITY,
+            eviction=DYNAMIC_EVICTION,
+            low_water=DYNAMIC_LOW_WATER,
+            read_only=read_only,
+        )
 
-    def add_permanent(self, vecs: np.ndarray, ids: List[str]) -> None:
-        self.permanent.add(vecs, ids)
+    def __contains__(self, vec_id: str) -> bool:
+        return vec_id in self.permanent or vec_id in self.dynamic
 
-    def add_dynamic(self, vecs: np.ndarray, ids: List[str]) -> None:
-        self.dynamic.add(vecs, ids)
+    def add_permanent(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.permanent.add(vecs, ids, payloads)
 
-    def search(self, query: np.ndarray, k: int = 5) -> Tuple[List[str], List[float]]:
-        """Search permanent then dynamic and merge results by score."""
-        p_ids, p_scores = self.permanent.search(query, k)
-        d_ids, d_scores = self.dynamic.search(query, k)
+    def add_dynamic(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.dynamic.add(vecs, ids, payloads)
+
+    def upsert_dynamic(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.dynamic.upsert(vecs, ids, payloads)
 
+    def remove(self, ids: List[str]) -> int:
+        """Delete ``ids`` from both tiers."""
+        return self.permanent.remove(ids) + self.dynamic.remove(ids)
+
+    @staticmethod
+    def _merge(p_ids, p_scores, d_ids, d_scores, k: int) -> Tuple[List[str], List[float]]:
         combined = list(zip(p_ids, p_scores)) + list(zip(d_ids, d_scores))
         combined.sort(key=lambda x: x[1], reverse=True)
         combined = combined[:k]
@@ -93,3 +691,47 @@ class LocalVDB:
             return [], []
         ids, scores = zip(*combined)
         return list(ids), list(scores)
+
+    def search(
+        self, query: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[str], List[float]]:
+        """Search permanent then dynamic and merge results by score."""
+        p_ids, p_scores = self.permanent.search(query, k, filter)
+        d_ids, d_scores = self.dynamic.search(query, k, filter)
+        return self._merge(p_ids, p_scores, d_ids, d_scores, k)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[List[str]], List[List[float]]]:
+        p_ids, p_scores = self.permanent.search_batch(queries, k, filter)
+        d_ids, d_scores = self.dynamic.search_batch(queries, k, filter)
+        merged = [self._merge(*parts, k) for parts in zip(p_ids, p_scores, d_ids, d_scores)]
+        return [m[0] for m in merged], [m[1] for m in merged]
+
+    def filter_stats(self) -> Dict[str, int]:
+        """Filtered searches per strategy, both tiers together."""
+        return {
+            name: self.permanent.filter_counts[name] + self.dynamic.filter_counts[name]
+            for name in self.permanent.filter_counts
+        }
+
+    def reclaim(self) -> None:
+        self.permanent.reclaim()
+        self.dynamic.reclaim()
+
+    def refresh(self) -> Optional[Tuple[List[str], np.ndarray, List[str]]]:
+        """``SimpleIndex.refresh`` over both tiers, changes combined."""
+        changes = [self.permanent.refresh(), self.dynamic.refresh()]
+        if None in changes:
+            return None
+        ids = [vid for c in changes for vid in c[0]]
+        vecs = np.concatenate([np.asarray(c[1], dtype="float32") for c in changes])
+        return ids, vecs, [vid for c in changes for vid in c[2]]
+
+    def compact(self) -> None:
+        self.permanent.compact()
+        self.dynamic.compact()
+
+    def close(self) -> None:
+        self.permanent.close()
+        self.dynamic.close()
@@ -1,7 +1,82 @@
 from __future__ import annotations
 from dataclasses import dataclass, asdict
+import math
+import threading
 import time
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# query pipeline stages with their own latency histogram; "query" is the
+# end-to-end time per query, every other stage one sample per batch call
+STAGES = ("query", "embed", "prediction", "hot_scan", "backing_scan", "cloud", "anchor_update")
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with bounded memory.
+
+    Bucket ``i`` holds samples up to ``min_ms * 2 ** (i / per_doubling)``
+    milliseconds, so quantiles are exact to within one bucket
+    (about 19% relative error at the default 4 buckets per doubling). The
+    default range (10 us .. ~3 min, 98 buckets) costs under 1 KB per
+    histogram. ``record`` is a log and an increment under a lock, safe to
+    call from any thread.
+    """
+
+    def __init__(self, min_ms: float = 0.01, max_ms: float = 180_000.0, per_doubling: int = 4):
+        self.min_ms = min_ms
+        self.per_doubling = per_doubling
+        n = int(math.ceil(math.log2(max_ms / min_ms) * per_doubling)) + 1
+        self.bounds = [min_ms * 2 ** (i / per_doubling) for i in range(n)]
+        self.counts = [0] * (n + 1)  # last bucket: above max_ms
+        self.count = 0
+        self.sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _bucket(self, ms: float) -> int:
+        if ms <= self.min_ms:
+            return 0
+        i = int(math.ceil(math.log2(ms / self.min_ms) * self.per_doubling - 1e-9))
+        return min(i, len(self.bounds))
+
+    def record(self, ms: float) -> None:
+        i = self._bucket(ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum_ms += ms
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the ``q`` quantile."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if c and seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else math.inf
+        return math.inf
+
+    def cumulative(self, every: int = 1) -> List[Tuple[float, int]]:
+        """``(upper bound ms, samples <= bound)`` for every ``every``-th bucket."""
+        with self._lock:
+            counts = list(self.counts)
+        out, seen = [], 0
+        for i, bound in enumerate(self.bounds):
+            seen += counts[i]
+            if i % every == 0:
+                out.append((bound, seen))
+        return out
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.sum_ms / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+        }
 
 
 @dataclass
@@ -9,11 +84,28 @@ class MetricsSnapshot:
     total_queries: int = 0
     local_hits: int = 0
     cloud_hits: int = 0
+    cache_hits: int = 0
     cumulative_latency_ms: float = 0.0
 
     prediction_hits: int = 0
     prediction_misses: int = 0
 
+    # which path answered a query: local accepted, cloud after a weak local
+    # result, the hedged cloud request, or a weak local result kept because
+    # the hedged cloud request missed its deadline
+    route_local: int = 0
+    route_cloud: int = 0
+    route_hedge: int = 0
+    route_deadline: int = 0
+    hedges_fired: int = 0
+    hedge_saved_ms: float = 0.0
+
+    embed_cache_hits: int = 0
+    embed_cache_misses: int = 0
+    encode_calls: int = 0
+    encoded_texts: int = 0
+    cumulative_encode_ms: float = 0.0
+
     def to_dict(self) -> Dict:
         d = asdict(self)
         d["avg_latency_ms"] = (
@@ -22,31 +114,143 @@ class MetricsSnapshot:
         d["local_hit_rate"] = (
             self.local_hits / self.total_queries if self.total_queries else 0.0
         )
+        d["cache_hit_rate"] = (
+            self.cache_hits / self.total_queries if self.total_queries else 0.0
+        )
         d["prediction_accuracy"] = (
             self.prediction_hits / (self.prediction_hits + self.prediction_misses)
             if (self.prediction_hits + self.prediction_misses)
             else 0.0
         )
+        lookups = self.embed_cache_hits + self.embed_cache_misses
+        d["embed_cache_hit_rate"] = self.embed_cache_hits / lookups if lookups else 0.0
+        d["avg_encode_ms"] = (
+            self.cumulative_encode_ms / self.encode_calls if self.encode_calls else 0.0
+        )
         return d
 
 
 class Metrics:
+    """Query counters and per-stage latency histograms; safe to update from any thread."""
+
     def __init__(self):
         self.current = MetricsSnapshot()
+        self.latency: Dict[str, LatencyHistogram] = {s: LatencyHistogram() for s in STAGES}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, latency_ms: float) -> None:
+        """Add one latency sample to ``stage``'s histogram."""
+        hist = self.latency.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.latency.setdefault(stage, LatencyHistogram())
+        hist.record(latency_ms)
 
     def record_query(self, latency_ms: float, source: str) -> None:
-        self.current.total_queries += 1
-        self.current.cumulative_latency_ms += latency_ms
-        if source == "local":
-            self.current.local_hits += 1
-        elif source == "cloud":
-            self.current.cloud_hits += 1
+        with self._lock:
+            self.latency["query"].record(latency_ms)
+            self.current.total_queries += 1
+            self.current.cumulative_latency_ms += latency_ms
+            if source == "local":
+                self.current.local_hits += 1
+            elif source == "cloud":
+                self.current.cloud_hits += 1
+            elif source == "cache":
+                self.current.cache_hits += 1
 
     def record_prediction(self, hit: bool) -> None:
-        if hit:
-            self.current.prediction_hits += 1
-        else:
-            self.current.prediction_misses += 1
+        with self._lock:
+            if hit:
+                self.current.prediction_hits += 1
+            else:
+                self.current.prediction_misses += 1
+
+    def record_route(self, route: str, n: int = 1) -> None:
+        with self._lock:
+            key = f"route_{route}"
+            setattr(self.current, key, getattr(self.current, key) + n)
+
+    def record_hedge(self, saved_ms: float) -> None:
+        """A hedged cloud request was sent; ``saved_ms`` is its head start."""
+        with self._lock:
+            self.current.hedges_fired += 1
+            self.current.hedge_saved_ms += saved_ms
+
+    def record_embedding_lookup(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.current.embed_cache_hits += hits
+            self.current.embed_cache_misses += misses
+
+    def record_encode(self, n_texts: int, latency_ms: float) -> None:
+        """One batched forward pass over ``n_texts`` texts."""
+        with self._lock:
+            self.current.encode_calls += 1
+            self.current.encoded_texts += n_texts
+            self.current.cumulative_encode_ms += latency_ms
 
     def snapshot(self) -> Dict:
-        return self.current.to_dict()
+        with self._lock:
+            d = self.current.to_dict()
+        d["latency"] = {stage: h.summary() for stage, h in self.latency.items()}
+        return d
+
+    # --- Prometheus text exposition ----------------------------------
+    def to_prometheus(
+        self, gauges: Optional[Dict[str, Dict[str, float]]] = None, prefix: str = "hybrid_vdb"
+    ) -> str:
+        """Counters and stage histograms in Prometheus text format (0.0.4).
+
+        Histograms are exported in seconds with one ``le`` bucket per
+        doubling. ``gauges`` maps a group name to flat numeric stats, e.g.
+        ``{"hot_partition": {...}}`` -> ``hybrid_vdb_hot_partition_inserts``.
+        """
+        c = self.current
+        lines: List[str] = []
+
+        def counter(name: str, help_: str, samples: Iterable[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {_num(value)}")
+
+        counter("queries_total", "Queries answered, by source.", [
+            ('{source="local"}', c.local_hits),
+            ('{source="cloud"}', c.cloud_hits),
+            ('{source="cache"}', c.cache_hits),
+        ])
+        counter("routes_total", "Uncached queries, by routing decision.", [
+            (f'{{route="{r}"}}', getattr(c, f"route_{r}")) for r in ("local", "cloud", "hedge", "deadline")
+        ])
+        counter("predictions_total", "Prediction checks, by outcome.", [
+            ('{outcome="hit"}', c.prediction_hits),
+            ('{outcome="miss"}', c.prediction_misses),
+        ])
+        counter("hedges_fired_total", "Hedged cloud requests sent.", [("", c.hedges_fired)])
+        counter("embed_cache_lookups_total", "Query embedding cache lookups, by outcome.", [
+            ('{outcome="hit"}', c.embed_cache_hits),
+            ('{outcome="miss"}', c.embed_cache_misses),
+        ])
+        counter("encoded_texts_total", "Texts run through the encoder.", [("", c.encoded_texts)])
+
+        name = f"{prefix}_stage_latency_seconds"
+        lines.append(f"# HELP {name} Latency per pipeline stage.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, hist in self.latency.items():
+            for bound, seen in hist.cumulative(every=hist.per_doubling):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound / 1000.0:.6g}"}} {seen}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {_num(hist.sum_ms / 1000.0)}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+
+        for group, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{group}_{key} gauge")
+                    lines.append(f"{prefix}_{group}_{key} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _num(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import numpy as np
+
+from .config import PAYLOAD_INDEX_FIELDS
+
+Filter = Dict[str, Any]
+Payloads = Optional[Sequence[Optional[Dict[str, Any]]]]  # one payload (or None) per row
+
+_CLAUSES = ("must", "should", "must_not")
+
+
+def normalize_filter(flt: Optional[Filter]) -> Optional[Filter]:
+    """The Qdrant JSON form of ``flt``; None or ``{}`` mean no filter.
+
+    Accepts a Qdrant filter (``{"must": [{"key": ..., "match": {"value":
+    ...}}], "should": [...], "must_not": [...]}``, conditions matching
+    ``value`` or ``any`` of a list, filters nested as conditions) or the
+    shorthand ``{"tenant": "acme", "lang": ["en", "de"]}``, where every key
+    must match and a list means any of its values. Raises ``ValueError``
+    for anything else.
+    """
+    if not flt:
+        return None
+    if not isinstance(flt, dict):
+        raise ValueError("a filter is a JSON object")
+    if not set(flt) <= set(_CLAUSES):
+        return {"must": [{"key": key, "match": _shorthand(v)} for key, v in flt.items()]}
+    for clause in _CLAUSES:
+        for cond in flt.get(clause) or []:
+            _check_condition(cond)
+    return flt
+
+
+def _shorthand(v: Any) -> Dict[str, Any]:
+    return {"any": list(v)} if isinstance(v, (list, tuple)) else {"value": v}
+
+
+def _check_condition(cond: Any) -> None:
+    if isinstance(cond, dict) and set(cond) & set(_CLAUSES) and "key" not in cond:
+        normalize_filter(cond)
+        return
+    if not isinstance(cond, dict) or not isinstance(cond.get("key"), str):
+        raise ValueError(f"unsupported filter condition: {cond!r}")
+    match = cond.get("match")
+    if not isinstance(match, dict) or not ("value" in match or isinstance(match.get("any"), list)):
+        raise ValueError(f"only match conditions on value / any are supported: {cond!r}")
+
+
+def _values(match: Dict[str, Any]) -> List[Any]:
+    return [match["value"]] if "value" in match else list(match["any"])
+
+
+def _has(payload: Optional[Dict[str, Any]], key: str, values: List[Any]) -> bool:
+    if not payload or key not in payload:
+        return False
+    v = payload[key]
+    held = v if isinstance(v, list) else [v]  # an array payload matches on any element
+    return any(x in values for x in held)
+
+
+def matches(payload: Optional[Dict[str, Any]], flt: Optional[Filter]) -> bool:
+    """Whether one payload passes a normalized filter (no index needed)."""
+    if flt is None:
+        return True
+
+    def test(cond: Dict[str, Any]) -> bool:
+        if "key" not in cond:
+            return matches(payload, cond)
+        return _has(payload, cond["key"], _values(cond["match"]))
+
+    must, should, must_not = (flt.get(c) or [] for c in _CLAUSES)
+    return (
+        all(test(c) for c in must)
+        and (not should or any(test(c) for c in should))
+        and not any(test(c) for c in must_not)
+    )
+
+
+def _indexable(v: Any) -> bool:
+    return isinstance(v, (str, int, float, bool))
+
+
+def _set_bits(bits: np.ndarray, rows: np.ndarray) -> None:
+    np.bitwise_or.at(bits, rows >> 3, (0x80 >> (rows & 7)).astype(np.uint8))
+
+
+class _RowList:
+    """Ascending rows holding one (rare) value, in a growable array."""
+
+    __slots__ = ("rows", "n")
+
+    def __init__(self):
+        self.rows = np.empty(4, dtype=np.uint32)
+        self.n = 0
+
+    def append(self, row: int) -> None:
+        if self.n and self.rows[self.n - 1] == row:
+            return  # the value appears twice in one payload array
+        if self.n == self.rows.shape[0]:
+            grown = np.empty(2 * self.n, dtype=np.uint32)
+            grown[: self.n] = self.rows
+            self.rows = grown
+        self.rows[self.n] = row
+        self.n += 1
+
+    def below(self, n: int) -> np.ndarray:
+        count = self.n  # read before ``rows``: a grown array holds at least as many
+        rows = self.rows[:count].astype(np.int64)
+        return rows[: np.searchsorted(rows, n)]
+
+
+class PayloadIndex:
+    """Per-row payloads with a posting per value of the indexed ``fields``.
+
+    Row ``i``'s payload is ``rows[i]`` (None without one). Each indexed
+    field maps every value seen to the rows holding it: a sorted row array
+    while the value is rare, a packed bit array (bit ``i`` set when row
+    ``i`` holds it) once the array would outgrow the bitmap, so a
+    high-cardinality field such as ``tenant`` costs memory in proportion
+    to its rows rather than values * rows. ``match`` answers a filter with
+    a few byte-wise ANDs / ORs; conditions on other fields scan the
+    payloads.
+
+    Append-only like the rows it describes: ``extend`` adds rows past the
+    ones a reader may have seen and never removes one, so a search can
+    evaluate a filter for its snapshot's first ``n`` rows while the writer
+    keeps appending.
+
+    ``defer`` postpones building the index of a store being opened until
+    something reads or extends it.
+    """
+
+    def __init__(self, fields: Sequence[str] = PAYLOAD_INDEX_FIELDS):
+        self.fields = tuple(fields)
+        self._rows: List[Optional[Dict[str, Any]]] = []
+        # value -> bitmap (np.ndarray) or _RowList; a promotion replaces the entry
+        self._bits: Dict[str, Dict[Any, Any]] = {f: {} for f in self.fields}
+        self._cap = 0  # bytes per bitmap
+        self._nbytes = 0  # kept by the writer, so readers need not walk ``_bits``
+        self._load: Optional[Callable[[], Iterable[Tuple[int, Dict[str, Any]]]]] = None
+        self._n_deferred = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n_deferred if self._load is not None else len(self._rows)
+
+    @property
+    def rows(self) -> List[Optional[Dict[str, Any]]]:
+        self._materialize()
+        return self._rows
+
+    def defer(self, n_rows: int, load: Callable[[], Iterable[Tuple[int, Dict[str, Any]]]]) -> None:
+        """Stand for ``n_rows`` rows (on an empty index) whose payloads
+        ``load()`` yields as ``(row, payload)`` pairs once first needed."""
+        assert not self._rows and self._load is None
+        self._n_deferred, self._load = n_rows, load
+
+    def _materialize(self) -> None:
+        if self._load is None:
+            return
+        with self._lock:  # readers and the writer may all get here first
+            if self._load is None:
+                return
+            self._grow(self._n_deferred)
+            rows: List[Optional[Dict[str, Any]]] = [None] * self._n_deferred
+            for row, payload in self._load():
+                rows[row] = payload
+                self._index(row, payload)
+            self._rows = rows
+            self._load = None
+
+    @property
+    def nbytes(self) -> int:
+        """Posting bytes (the payload dicts themselves are not counted)."""
+        return self._nbytes
+
+    def _grow(self, n_rows: int) -> None:
+        need = (n_rows + 7) // 8
+        if need <= self._cap:
+            return
+        cap = max(need, self._cap * 2, 128)
+        for values in self._bits.values():
+            for v, old in values.items():
+                if not isinstance(old, np.ndarray):
+                    continue
+                grown = np.zeros(cap, dtype=np.uint8)
+                grown[: self._cap] = old
+                values[v] = grown
+                self._nbytes += cap - self._cap
+        self._cap = cap
+
+    def extend(self, payloads: Sequence[Optional[Dict[str, Any]]]) -> None:
+        self._materialize()
+        start = len(self._rows)
+        self._grow(start + len(payloads))
+        for row, payload in enumerate(payloads, start):
+            self._index(row, payload)
+        self._rows.extend(payloads)
+
+    def _index(self, row: int, payload: Optional[Dict[str, Any]]) -> None:
+        if payload:
+            for field in self.fields:
+                v = payload.get(field)
+                for x in v if isinstance(v, list) else [v]:
+                    if x is not None and _indexable(x):
+                        self._set(field, x, row)
+
+    def pad(self, n_rows: int) -> None:
+        """Extend with rows without payloads up to ``n_rows``."""
+        self._materialize()
+        if n_rows > len(self._rows):
+            self._grow(n_rows)
+            self._rows.extend([None] * (n_rows - len(self._rows)))
+
+    def _set(self, field: str, value: Any, row: int) -> None:
+        values = self._bits[field]
+        entry = values.get(value)
+        if isinstance(entry, np.ndarray):
+            entry[row >> 3] |= np.uint8(0x80 >> (row & 7))
+            return
+        if entry is None:
+            entry = values[value] = _RowList()
+            self._nbytes += entry.rows.nbytes
+        before = entry.rows.nbytes
+        entry.append(row)
+        self._nbytes += entry.rows.nbytes - before
+        if entry.n * entry.rows.itemsize > self._cap:
+            bits = np.zeros(self._cap, dtype=np.uint8)  # complete before it is published
+            _set_bits(bits, entry.below(row + 1))
+            values[value] = bits
+            self._nbytes += bits.nbytes - entry.rows.nbytes
+
+    def match(self, flt: Filter, n: int) -> np.ndarray:
+        """Boolean mask over the first ``n`` rows for a normalized filter."""
+        self._materialize()
+        return np.unpackbits(self._eval(flt, n), count=n).astype(bool)
+
+    def _eval(self, flt: Filter, n: int) -> np.ndarray:
+        nb = (n + 7) // 8
+        must, should, must_not = (flt.get(c) or [] for c in _CLAUSES)
+        out = np.full(nb, 0xFF, dtype=np.uint8)
+        for cond in must:
+            out &= self._cond(cond, n)
+        if should:
+            any_of = np.zeros(nb, dtype=np.uint8)
+            for cond in should:
+                any_of |= self._cond(cond, n)
+            out &= any_of
+        for cond in must_not:
+            out &= ~self._cond(cond, n)
+        return out
+
+    def _cond(self, cond: Dict[str, Any], n: int) -> np.ndarray:
+        if "key" not in cond:
+            return self._eval(cond, n)
+        key, values = cond["key"], _values(cond["match"])
+        nb = (n + 7) // 8
+        if key in self._bits and all(_indexable(v) for v in values):
+            out = np.zeros(nb, dtype=np.uint8)
+            for v in values:
+                entry = self._bits[key].get(v)
+                if isinstance(entry, np.ndarray):
+                    out |= entry[:nb]
+                elif entry is not None:
+                    _set_bits(out, entry.below(n))
+            return out
+        hits = np.fromiter((_has(p, key, values) for p in self.rows[:n]), dtype=bool, count=n)
+        return np.packbits(hits)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .config import EMBEDDING_DIM, PREDICTOR_DECAY, PREDICTOR_MAX_EDGES, PREDICTOR_MEMORY
+
+# two predictions closer than this are treated as the same prediction
+_DUPLICATE_SIM = 0.98
+
+
+class _SuccessorMemory:
+    """Ring buffer of ``(query, next query)`` unit-vector pairs for one anchor."""
+
+    __slots__ = ("prev", "next", "size", "_pos")
+
+    def __init__(self, dim: int, capacity: int):
+        self.prev = np.zeros((capacity, dim), dtype="float16")
+        self.next = np.zeros((capacity, dim), dtype="float16")
+        self.size = 0
+        self._pos = 0
+
+    def push(self, prev_q: np.ndarray, next_q: np.ndarray) -> None:
+        self.prev[self._pos] = prev_q
+        self.next[self._pos] = next_q
+        self._pos = (self._pos + 1) % self.prev.shape[0]
+        self.size = min(self.size + 1, self.prev.shape[0])
+
+
+class TransitionPredictor:
+    """Next-query model learned from the observed query stream.
+
+    Two structures are updated on every observed query:
+
+    - a transition graph between anchors whose out-edge counts decay by
+      ``decay`` each time the source anchor is left again, keeping at most
+      ``max_edges`` edges per anchor;
+    - per anchor, the last ``memory`` ``(query, next query)`` pairs.
+
+    ``predict`` first returns the successors of the stored queries most
+    similar to the current one (k-NN in the anchor's memory), then the
+    centroids of the most likely next anchors. Memory is bounded by
+    ``anchors * (memory * 2 * dim * 2 bytes + max_edges)``.
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        memory: int = PREDICTOR_MEMORY,
+        max_edges: int = PREDICTOR_MAX_EDGES,
+        decay: float = PREDICTOR_DECAY,
+    ):
+        self.dim = dim
+        self.memory = memory
+        self.max_edges = max_edges
+        self.decay = decay
+        self.edges: Dict[int, Dict[int, float]] = {}
+        self.last_query: Dict[int, np.ndarray] = {}
+        self._successors: Dict[int, _SuccessorMemory] = {}
+        self._prev: Optional[Tuple[int, np.ndarray]] = None
+
+    # --- learning ----------------------------------------------------
+    def observe(self, anchor_ids: Sequence[int], q_units: np.ndarray) -> None:
+        """Feed queries (unit vectors) in arrival order with their anchors."""
+        for aid, q in zip(anchor_ids, q_units):
+            q = np.asarray(q, dtype="float32")
+            if self._prev is not None:
+                p_aid, p_q = self._prev
+                self._count(p_aid, aid)
+                mem = self._successors.get(p_aid)
+                if mem is None:
+                    mem = self._successors[p_aid] = _SuccessorMemory(self.dim, self.memory)
+                mem.push(p_q, q)
+            self._prev = (aid, q)
+            self.last_query[aid] = q
+
+    def _count(self, src: int, dst: int) -> None:
+        row = self.edges.setdefault(src, {})
+        for key in row:
+            row[key] *= self.decay
+        row[dst] = row.get(dst, 0.0) + 1.0
+        if len(row) > self.max_edges:
+            del row[min(row, key=row.get)]
+
+    def forget(self, anchor_ids: Iterable[int]) -> None:
+        """Drop everything learned about pruned anchors."""
+        gone = set(anchor_ids)
+        if not gone:
+            return
+        for aid in gone:
+            self.edges.pop(aid, None)
+            self.last_query.pop(aid, None)
+            self._successors.pop(aid, None)
+        for row in self.edges.values():
+            for aid in gone.intersection(row):
+                del row[aid]
+        if self._prev is not None and self._prev[0] in gone:
+            self._prev = None
+
+    # --- inference ---------------------------------------------------
+    def next_anchors(self, anchor_id: int, n: int) -> List[Tuple[int, float]]:
+        """Most likely next anchors with their transition probabilities."""
+        row = self.edges.get(anchor_id)
+        if not row:
+            return []
+        total = sum(row.values())
+        ranked = sorted(row.items(), key=lambda x: x[1], reverse=True)[:n]
+        return [(aid, w / total) for aid, w in ranked]
+
+    def predict(
+        self,
+        anchor_id: int,
+        k: int,
+        query: Optional[np.ndarray] = None,
+        centroid_of: Optional[Callable[[int], Optional[np.ndarray]]] = None,
+    ) -> np.ndarray:
+        """Up to ``k`` distinct unit vectors for the query after ``query``.
+
+        ``query`` defaults to the last query seen in ``anchor_id``;
+        ``centroid_of(anchor_id)`` supplies unit centroids of next anchors.
+        """
+        out: List[np.ndarray] = []
+
+        def take(vec: np.ndarray) -> None:
+            vec = np.asarray(vec, dtype="float32")
+            vec = vec / (np.linalg.norm(vec) + 1e-9)
+            if all(float(vec @ o) < _DUPLICATE_SIM for o in out):
+                out.append(vec)
+
+        if query is None:
+            query = self.last_query.get(anchor_id)
+        mem = self._successors.get(anchor_id)
+        if mem is not None and mem.size and query is not None:
+            sims = mem.prev[: mem.size].astype("float32") @ np.asarray(query, dtype="float32")
+            for i in np.argsort(-sims).tolist():
+                if len(out) >= k:
+                    break
+                take(mem.next[i])
+        if centroid_of is not None:
+            for aid, _ in self.next_anchors(anchor_id, self.max_edges):
+                if len(out) >= k:
+                    break
+                c = centroid_of(aid)
+                if c is not None:
+                    take(c)
+        if not out:
+            return np.empty((0, self.dim), dtype="float32")
+        return np.stack(out)
+
+    @property
+    def nbytes(self) -> int:
+        per_anchor = 2 * self.memory * self.dim * 2
+        return len(self._successors) * per_anchor + len(self.last_query) * self.dim * 4
@@ -0,0 +1,162 @@
+from __future__ import annotations
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, List
+import logging
+import threading
+import time
+import numpy as np
+
+from .config import (
+    PREFETCH_K,
+    PREFETCH_MAX_PENDING,
+    PREFETCH_RATE_PER_SEC,
+    PREFETCH_TRACKED_IDS,
+    PREFETCH_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+_ERROR_LOG_SEC = 60.0  # a cloud outage fails every fetch; log one per interval
+
+
+class Prefetcher:
+    """Fetches likely-next vectors from the cloud before they are queried.
+
+    ``submit`` hands prediction vectors to a small worker pool that runs one
+    batched ``cloud.search_batch`` per submission. Finished fetches wait in
+    a ready queue until ``apply(storage)`` moves them into the hot
+    partition; ``apply`` is meant to run on the thread that owns
+    ``storage`` (the router calls it on its writer after each search), so
+    the workers never touch storage themselves.
+
+    Load is bounded twice: a token bucket allows ``rate_per_sec`` predicted
+    queries per second, and at most ``max_pending`` fetches may be in
+    flight; excess predictions are dropped, not queued. Ids that are already
+    resident locally are not inserted again.
+
+    Usefulness is ``served / fetched``: ``record_served`` counts prefetched
+    ids that later appear in a locally served result.
+    """
+
+    def __init__(
+        self,
+        cloud,
+        k: int = PREFETCH_K,
+        workers: int = PREFETCH_WORKERS,
+        max_pending: int = PREFETCH_MAX_PENDING,
+        rate_per_sec: float = PREFETCH_RATE_PER_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cloud = cloud
+        self.k = k
+        self.max_pending = max_pending
+        self.rate = rate_per_sec
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.counters = {
+            "submitted": 0,
+            "rate_limited": 0,
+            "dropped": 0,
+            "errors": 0,
+            "fetched": 0,
+            "already_local": 0,
+            "served": 0,
+        }
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._tokens = rate_per_sec
+        self._refilled = clock()
+        self._error_logged_at = -float("inf")
+        self._ready: Deque[Dict[str, np.ndarray]] = deque()
+        # prefetched ids not yet served, oldest first
+        self._unserved: "OrderedDict[str, None]" = OrderedDict()
+
+    # --- producer side -----------------------------------------------
+    def submit(self, vectors: np.ndarray) -> int:
+        """Queue predicted query ``vectors``; returns how many were accepted."""
+        vectors = np.atleast_2d(vectors)
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._pending >= self.max_pending:
+                self.counters["dropped"] += len(vectors)
+                return 0
+            n = min(len(vectors), int(self._tokens))
+            self.counters["rate_limited"] += len(vectors) - n
+            if n == 0:
+                return 0
+            self._tokens -= n
+            self._pending += 1
+            self.counters["submitted"] += n
+        self.executor.submit(self._fetch, np.array(vectors[:n], dtype="float32"))
+        return n
+
+    def _fetch(self, vectors: np.ndarray) -> None:
+        try:
+            results = self.cloud.search_batch(vectors, self.k)
+            found = {r["id"]: r["vector"] for res in results for r in res if "vector" in r}
+        except Exception:
+            found = None
+            now = self.clock()
+            if now - self._error_logged_at >= _ERROR_LOG_SEC:
+                self._error_logged_at = now
+                logger.warning(
+                    "prefetch failed (%d errors so far)", self.counters["errors"] + 1,
+                    exc_info=True,
+                )
+        with self._lock:
+            if found is None:
+                self.counters["errors"] += 1
+            elif found:
+                self._ready.append(found)
+            self._pending -= 1
+            self._idle.notify_all()
+
+    # --- consumer side -----------------------------------------------
+    def apply(self, storage) -> int:
+        """Insert finished fetches into ``storage``'s hot partition."""
+        with self._lock:
+            batches = list(self._ready)
+            self._ready.clear()
+        if not batches:
+            return 0
+        found: Dict[str, np.ndarray] = {}
+        for b in batches:
+            found.update(b)
+        new = [vid for vid in found if not storage.contains(vid)]
+        self.counters["already_local"] += len(found) - len(new)
+        if new:
+            storage.add_hot(np.stack([found[vid] for vid in new]).astype("float32"), new)
+            self.counters["fetched"] += len(new)
+            for vid in new:
+                self._unserved[vid] = None
+            while len(self._unserved) > PREFETCH_TRACKED_IDS:
+                self._unserved.popitem(last=False)
+        return len(new)
+
+    def record_served(self, ids_lists: Iterable[List[str]]) -> int:
+        """Count prefetched ids that showed up in locally served results."""
+        served = 0
+        for ids in ids_lists:
+            for vid in ids:
+                if self._unserved.pop(vid, 0) is None:
+                    served += 1
+        self.counters["served"] += served
+        return served
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until no fetch is in flight (used by tests and shutdown)."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, float]:
+        c: Dict[str, float] = dict(self.counters)
+        c["pending"] = self._pending
+        c["usefulness"] = c["served"] / c["fetched"] if c["fetched"] else 0.0
+        return c
@@ -0,0 +1,300 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+import copy
+import numpy as np
+
+from .buffers import MappedRows, VectorBuffer, _normalize, _search_batch, _topk
+from .config import (
+    EMBEDDING_DIM,
+    PQ_SUBSPACES,
+    QUANT_TRAIN_SIZE,
+    RANDOM_SEED,
+    RERANK_FACTOR,
+)
+from .ivf_index import kmeans
+
+
+class Int8Codec:
+    """Per-dimension symmetric scalar quantizer (4x smaller than float32).
+
+    The scale of each dimension comes from the 99.9th percentile of its
+    absolute value in the training sample; outliers are clipped.
+    """
+
+    _BLOCK_ROWS = 8192
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.code_size = dim
+        self.code_dtype = np.dtype("int8")
+        self.scale: Optional[np.ndarray] = None
+
+    def train(self, x: np.ndarray) -> None:
+        amax = np.quantile(np.abs(x), 0.999, axis=0)
+        self.scale = (np.maximum(amax, 1e-6) / 127.0).astype("float32")
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(x / self.scale), -127, 127).astype("int8")
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype("float32") * self.scale
+
+    def prepare(self, q: np.ndarray) -> np.ndarray:
+        # fold the scale into the query so scoring is codes @ q'
+        return (q * self.scale).astype("float32")
+
+    def score(self, prepared: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        out = np.empty(codes.shape[0], dtype="float32")
+        for start in range(0, codes.shape[0], self._BLOCK_ROWS):
+            block = codes[start : start + self._BLOCK_ROWS].astype("float32")
+            out[start : start + block.shape[0]] = block @ prepared
+        return out
+
+    def prepare_batch(self, queries: np.ndarray) -> np.ndarray:
+        return (queries * self.scale).astype("float32")
+
+    def score_batch(self, prepared: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """``(m, n)`` scores of ``m`` prepared queries, one GEMM per block."""
+        out = np.empty((prepared.shape[0], codes.shape[0]), dtype="float32")
+        for start in range(0, codes.shape[0], self._BLOCK_ROWS):
+            block = codes[start : start + self._BLOCK_ROWS].astype("float32")
+            out[:, start : start + block.shape[0]] = prepared @ block.T
+        return out
+
+
+class PQCodec:
+    """Product quantizer with asymmetric distance computation (ADC).
+
+    The vector is split into ``m`` sub-vectors, each replaced by the index
+    of its nearest of 256 centroids, so a vector costs ``m`` bytes. A query
+    builds an ``(m, 256)`` table of partial inner products once; the score
+    of a code is then the sum of ``m`` table lookups.
+    """
+
+    _BLOCK_ROWS = 8192
+
+    def __init__(self, dim: int = EMBEDDING_DIM, m: int = PQ_SUBSPACES, ksub: int = 256):
+        if dim % m:
+            raise ValueError(f"dim {dim} is not divisible by m={m}")
+        self.dim = dim
+        self.m = m
+        self.ksub = ksub
+        self.dsub = dim // m
+        self.code_size = m
+        self.code_dtype = np.dtype("uint8")
+        self.codebooks: Optional[np.ndarray] = None  # (m, ksub, dsub)
+        self._offsets = (np.arange(m) * ksub).astype("int64")
+
+    def _split(self, x: np.ndarray) -> np.ndarray:
+        return x.reshape(x.shape[0], self.m, self.dsub)
+
+    def train(self, x: np.ndarray) -> None:
+        sub = self._split(np.asarray(x, dtype="float32"))
+        books = np.zeros((self.m, self.ksub, self.dsub), dtype="float32")
+        for j in range(self.m):
+            c = kmeans(sub[:, j, :], self.ksub, n_iter=15, seed=j)
+            books[j, : c.shape[0]] = c
+        self.codebooks = books
+
+    def encode(self, x: np.ndarray) -> np.ndarray:
+        sub = self._split(np.asarray(x, dtype="float32"))
+        codes = np.empty((x.shape[0], self.m), dtype="uint8")
+        half_sq = 0.5 * np.einsum("jkd,jkd->jk", self.codebooks, self.codebooks)
+        for j in range(self.m):
+            codes[:, j] = np.argmax(sub[:, j, :] @ self.codebooks[j].T - half_sq[j], axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.m), codes]  # (n, m, dsub)
+        return parts.reshape(codes.shape[0], self.dim)
+
+    def prepare(self, q: np.ndarray) -> np.ndarray:
+        q = np.asarray(q, dtype="float32").reshape(self.m, self.dsub)
+        return np.einsum("jd,jkd->jk", q, self.codebooks).reshape(-1)
+
+    def score(self, prepared: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        out = np.empty(codes.shape[0], dtype="float32")
+        for start in range(0, codes.shape[0], self._BLOCK_ROWS):
+            block = codes[start : start + self._BLOCK_ROWS].astype("int64") + self._offsets
+            out[start : start + block.shape[0]] = prepared[block].sum(axis=1)
+        return out
+
+    def prepare_batch(self, queries: np.ndarray) -> np.ndarray:
+        q = np.asarray(queries, dtype="float32").reshape(-1, self.m, self.dsub)
+        return np.einsum("qjd,jkd->qjk", q, self.codebooks)
+
+    def score_batch(self, prepared: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """``(m, n)`` ADC scores: one table gather per sub-space and block."""
+        out = np.zeros((prepared.shape[0], codes.shape[0]), dtype="float32")
+        for start in range(0, codes.shape[0], self._BLOCK_ROWS):
+            block = codes[start : start + self._BLOCK_ROWS]
+            acc = out[:, start : start + block.shape[0]]
+            for j in range(self.m):
+                acc += prepared[:, j, block[:, j]]
+        return out
+
+
+_CODECS = {"int8": Int8Codec, "pq": PQCodec}
+
+
+class QuantizedBuffer:
+    """Drop-in replacement for ``VectorBuffer`` that keeps compressed codes.
+
+    Only the codes (``int8``: ``dim`` bytes, ``pq``: ``m`` bytes per vector)
+    are resident. Until ``train_size`` vectors have been seen the buffer
+    searches them exactly; it then trains the codec and encodes everything.
+
+    Searches score codes asymmetrically (float query vs. codes), keep the
+    best ``k * rerank_factor`` candidates and re-rank those against the
+    full-precision vectors, so the returned scores are exact. ``rerank``
+    selects where those vectors live: ``"disk"`` (memory-mapped, default),
+    ``"memory"`` or ``None`` (no re-ranking, approximate scores).
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        kind: str = "int8",
+        rerank: Optional[str] = "disk",
+        rerank_factor: int = RERANK_FACTOR,
+        train_size: int = QUANT_TRAIN_SIZE,
+    ):
+        if kind not in _CODECS:
+            raise ValueError(f"unknown quantization: {kind!r}")
+        self.dim = dim
+        self.kind = kind
+        self.codec = _CODECS[kind](dim)
+        self.rerank_factor = rerank_factor
+        self.train_size = train_size
+        self.size = 0
+        self.trained = False
+        self._codes = np.empty((1024, self.codec.code_size), dtype=self.codec.code_dtype)
+        self._pending = VectorBuffer(dim, dtype="float32")
+        if rerank == "disk":
+            self._exact = MappedRows(dim)
+        elif rerank == "memory":
+            self._exact = VectorBuffer(dim, dtype="float32")
+        elif rerank is None:
+            self._exact = None
+        else:
+            raise ValueError(f"unknown rerank store: {rerank!r}")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def snapshot(self) -> "QuantizedBuffer":
+        """Frozen view of the current rows (see ``VectorBuffer.snapshot``).
+
+        Codes are only appended past ``size`` and training swaps in new
+        arrays, so the snapshot keeps answering from the state it saw.
+        """
+        snap = copy.copy(self)
+        snap._pending = self._pending.snapshot()
+        if self._exact is not None:
+            snap._exact = self._exact.snapshot()
+        return snap
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes (codes, pending float rows and in-memory re-rank rows)."""
+        total = self._codes.nbytes + (0 if self.trained else self._pending.nbytes)
+        if self._exact is not None and not isinstance(self._exact, MappedRows):
+            total += self._exact.nbytes
+        return total
+
+    @property
+    def view(self) -> np.ndarray:
+        """Full-precision rows if kept, otherwise decoded approximations."""
+        if not self.trained:
+            return self._pending.view
+        if self._exact is not None:
+            return self._exact.view
+        return self.codec.decode(self._codes[: self.size])
+
+    def _append_codes(self, codes: np.ndarray) -> None:
+        n = codes.shape[0]
+        if self.size + n > self._codes.shape[0]:
+            cap = self._codes.shape[0]
+            while cap < self.size + n:
+                cap *= 2
+            grown = np.empty((cap, self.codec.code_size), dtype=self.codec.code_dtype)
+            grown[: self.size] = self._codes[: self.size]
+            self._codes = grown
+        self._codes[self.size : self.size + n] = codes
+        self.size += n
+
+    def add(self, vecs: np.ndarray, normalized: bool = False) -> None:
+        vecs = np.asarray(vecs, dtype="float32")
+        if vecs.ndim == 1:
+            vecs = vecs[None, :]
+        if not normalized:
+            vecs = _normalize(vecs)
+        if self._exact is not None:
+            self._exact.add(vecs)
+        if self.trained:
+            self._append_codes(self.codec.encode(vecs))
+            return
+        self._pending.add(vecs, normalized=True)
+        self.size = len(self._pending)
+        if self.size >= self.train_size:
+            pending = self._pending.view
+            rng = np.random.default_rng(RANDOM_SEED)
+            sample = rng.choice(self.size, min(self.size, self.train_size), replace=False)
+            self.codec.train(pending[np.sort(sample)])
+            self.size = 0
+            self._append_codes(self.codec.encode(pending))
+            self._pending = VectorBuffer(self.dim, dtype="float32", capacity=1)
+            self.trained = True
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        q = np.asarray(q, dtype="float32")
+        if not self.trained:
+            return self._pending.scores(q)
+        return self.codec.score(self.codec.prepare(q), self._codes[: self.size])
+
+    def scores_at(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        q = np.asarray(q, dtype="float32")
+        if not self.trained:
+            return self._pending.scores_at(q, rows)
+        return self.codec.score(self.codec.prepare(q), self._codes[rows])
+
+    def search(
+        self, q: np.ndarray, k: int, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        approx = self.scores(q) if rows is None else self.scores_at(q, rows)
+        if not self.trained or self._exact is None:
+            top = _topk(approx, k)
+            idx = top if rows is None else rows[top]
+            return idx, approx[top]
+        short = _topk(approx, k * self.rerank_factor)
+        return self._rerank(q, short if rows is None else rows[short], k)
+
+    def _rerank(self, q: np.ndarray, cand: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        cand = np.sort(cand)  # sequential reads from the mapped file
+        exact = self._exact.rows(cand) @ np.asarray(q, dtype="float32")
+        top = _topk(exact, k)
+        return cand[top], exact[top]
+
+    def scores_batch(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype="float32")
+        if not self.trained:
+            return self._pending.scores_batch(queries)
+        return self.codec.score_batch(self.codec.prepare_batch(queries), self._codes[: self.size])
+
+    def search_batch(
+        self, queries: np.ndarray, k: int, exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate scores for all queries at once, then per-query re-ranking."""
+        if not self.trained or self._exact is None:
+            return _search_batch(self.scores_batch, self.size, queries, k, exclude)
+        short, approx = _search_batch(
+            self.scores_batch, self.size, queries, k * self.rerank_factor, exclude
+        )
+        kk = min(k, short.shape[1])
+        idx = np.zeros((len(queries), kk), dtype="int64")
+        out = np.full((len(queries), kk), -np.inf, dtype="float32")
+        for i, q in enumerate(queries):
+            cand, exact = self._rerank(q, short[i][np.isfinite(approx[i])], kk)
+            idx[i, : cand.shape[0]] = cand
+            out[i, : cand.shape[0]] = exact
+        return idx, out
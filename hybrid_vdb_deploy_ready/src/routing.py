@@ -0,0 +1,73 @@
+from __future__ import annotations
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List, Optional
+import math
+import threading
+import time
+
+from .config import (
+    CLOUD_DEADLINE_MS,
+    HEDGE_DELAY_MS,
+    HEDGE_ENABLED,
+    ROUTE_MIN_LOCAL_FILL,
+    ROUTE_MIN_LOCAL_SCORE,
+)
+
+
+class RoutingPolicy:
+    """Decides when a local result is good enough to skip the cloud.
+
+    A local result is accepted when it has at least ``ceil(min_fill * k)``
+    hits and its best score reaches ``min_score``. With ``hedge`` the cloud
+    request for a batch is started ``hedge_delay_ms`` after the local search
+    unless the local search has finished by then; a hedged cloud answer is
+    waited for at most ``deadline_ms`` from the start of the local search.
+    """
+
+    def __init__(
+        self,
+        min_score: float = ROUTE_MIN_LOCAL_SCORE,
+        min_fill: float = ROUTE_MIN_LOCAL_FILL,
+        hedge: bool = HEDGE_ENABLED,
+        hedge_delay_ms: float = HEDGE_DELAY_MS,
+        deadline_ms: float = CLOUD_DEADLINE_MS,
+    ):
+        self.min_score = min_score
+        self.min_fill = min_fill
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay_ms / 1000.0
+        self.deadline = deadline_ms / 1000.0
+
+    def accept(self, scores: List[float], k: int) -> bool:
+        if not scores or len(scores) < math.ceil(self.min_fill * k):
+            return False
+        return max(scores) >= self.min_score
+
+
+class HedgedCall:
+    """``fn(*args)`` run on ``executor`` after ``delay`` seconds unless cancelled first."""
+
+    def __init__(self, executor: Executor, delay: float, fn: Callable[..., Any], *args: Any):
+        self.started_at: Optional[float] = None  # perf_counter() when fn was called
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self.future: Future = executor.submit(self._run, delay, fn, args)
+
+    def _run(self, delay: float, fn: Callable[..., Any], args) -> Any:
+        if self._cancelled.wait(delay):
+            return None
+        with self._lock:
+            if self._cancelled.is_set():
+                return None
+            self.started_at = time.perf_counter()
+        return fn(*args)
+
+    @property
+    def fired(self) -> bool:
+        return self.started_at is not None
+
+    def cancel(self) -> bool:
+        """Stop the call if it has not started; returns True if it never ran."""
+        with self._lock:
+            self._cancelled.set()
+            return self.started_at is None
@@ -1,27 +1,198 @@
 from __future__ import annotations
+import heapq
+import logging
+import random
 import threading
 import time
-from typing import Callable
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import MAINT_BUDGET_MS, MAINT_JITTER, MAINT_SLICE
+
+logger = logging.getLogger(__name__)
 
 
 class RepeatedJob(threading.Thread):
-    """Very small utility to run `fn` every `interval_sec` seconds."""
+    """Very small utility to run `fn` every `interval_sec` seconds.
+
+    Failures are logged and counted in ``errors``; the job keeps running.
+    """
 
     def __init__(self, interval_sec: float, fn: Callable[[], None]):
         super().__init__(daemon=True)
         self.interval = interval_sec
         self.fn = fn
-        self._stop = threading.Event()
+        self.errors = 0
+        self._halt = threading.Event()  # not `_stop`: that name belongs to Thread
 
     def run(self) -> None:
-        while not self._stop.is_set():
-            time.sleep(self.interval)
+        while not self._halt.wait(self.interval):
             try:
                 self.fn()
             except Exception:
-                # In a demo we don't want to crash the whole process; in a
-                # real system this would be logged properly.
-                pass
+                self.errors += 1
+                logger.exception("repeated job %r failed", self.fn)
 
     def stop(self) -> None:
-        self._stop.set()
+        self._halt.set()
+
+
+@dataclass
+class _Job:
+    name: str
+    fn: Callable[[], int]  # runs the job, returns how many ``run`` calls it made
+    interval: float
+    runs: int = 0
+    errors: int = 0
+    writes: int = 0
+    last_ms: float = 0.0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+class MaintenanceScheduler:
+    """Runs periodic maintenance jobs on one background thread.
+
+    Each job runs through ``run(fn)`` (the router passes its
+    ``HybridRouter.write``, so maintenance is serialized with every other
+    write while searches carry on). Intervals are jittered by ``jitter``
+    (a share of the interval) so jobs added together drift apart. A job
+    that raises is logged and counted, and runs again at its next slot.
+
+    ``add_sliced`` is for work that scales with the data, such as pruning:
+    it calls ``step(slice_size)`` repeatedly, each call a separate
+    ``run``, until ``step`` returns True (a pass finished) or the job has
+    used ``budget_ms``. The next run continues where this one stopped.
+
+    ``run_pending`` executes due jobs on the calling thread (tests and
+    single-threaded callers); ``start`` / ``stop`` manage the thread.
+    """
+
+    def __init__(
+        self,
+        run: Optional[Callable[[Callable[[], Any]], Any]] = None,
+        jitter: float = MAINT_JITTER,
+        clock: Callable[[], float] = time.monotonic,
+        seed: Optional[int] = None,
+    ):
+        self.run = run or (lambda fn: fn())
+        self.jitter = jitter
+        self.clock = clock
+        self.jobs: Dict[str, _Job] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- jobs ------------------------------------------------------------
+    def _next_due(self, job: _Job, now: float) -> float:
+        spread = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return now + job.interval * (1.0 + spread)
+
+    def _add(self, job: _Job) -> None:
+        with self._lock:
+            if job.name in self.jobs:
+                raise ValueError(f"duplicate maintenance job: {job.name!r}")
+            self.jobs[job.name] = job
+            heapq.heappush(self._heap, (self._next_due(job, self.clock()), job.name))
+        self._wake.set()
+
+    def add(self, name: str, fn: Callable[[], Any], interval_sec: float) -> None:
+        """Run ``fn()`` about every ``interval_sec`` seconds, first after one interval."""
+
+        def once() -> int:
+            self.run(fn)
+            return 1
+
+        self._add(_Job(name, once, interval_sec))
+
+    def add_sliced(
+        self,
+        name: str,
+        step: Callable[[int], bool],
+        interval_sec: float,
+        budget_ms: float = MAINT_BUDGET_MS,
+        slice_size: int = MAINT_SLICE,
+    ) -> None:
+        """Run ``step(slice_size)`` in a loop bounded by ``budget_ms`` per run."""
+
+        def sliced() -> int:
+            deadline = self.clock() + budget_ms / 1000.0
+            calls = 0
+            while True:
+                calls += 1
+                if self.run(lambda: step(slice_size)) or self.clock() >= deadline:
+                    return calls
+
+        self._add(_Job(name, sliced, interval_sec))
+
+    def _execute(self, job: _Job) -> None:
+        t0 = time.perf_counter()
+        try:
+            job.writes += job.fn()
+        except Exception:
+            job.errors += 1
+            logger.exception("maintenance job %s failed", job.name)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            job.runs += 1
+            job.last_ms = ms
+            job.total_ms += ms
+            job.max_ms = max(job.max_ms, ms)
+
+    def run_pending(self) -> int:
+        """Run every job that is due now; returns how many ran."""
+        ran = 0
+        while True:
+            with self._lock:
+                now = self.clock()
+                if not self._heap or self._heap[0][0] > now:
+                    return ran
+                _, name = heapq.heappop(self._heap)
+                job = self.jobs[name]
+            self._execute(job)
+            ran += 1
+            with self._lock:
+                heapq.heappush(self._heap, (self._next_due(job, self.clock()), name))
+
+    def run_now(self, name: str) -> None:
+        """Run job ``name`` immediately, outside its schedule."""
+        self._execute(self.jobs[name])
+
+    # --- thread ----------------------------------------------------------
+    def _loop(self) -> None:
+        while not self._halt.is_set():
+            self._wake.clear()
+            self.run_pending()
+            with self._lock:
+                wait = self._heap[0][0] - self.clock() if self._heap else None
+            self._wake.wait(wait if wait is None else max(wait, 0.0))
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._halt.clear()
+            self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        if self._thread is not None:
+            self._halt.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-job runs, errors, ``run`` calls and runtime in milliseconds."""
+        return {
+            name: {
+                "runs": job.runs,
+                "errors": job.errors,
+                "writes": job.writes,
+                "last_ms": job.last_ms,
+                "mean_ms": job.total_ms / job.runs if job.runs else 0.0,
+                "max_ms": job.max_ms,
+            }
+            for name, job in self.jobs.items()
+        }
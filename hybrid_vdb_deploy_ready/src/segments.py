@@ -0,0 +1,484 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import json
+import os
+import struct
+import numpy as np
+
+from .buffers import VectorBuffer
+from .config import EMBEDDING_DIM, SEGMENT_FLUSH_ROWS, VECTOR_DTYPE
+
+_MANIFEST = "MANIFEST.json"
+_TOMBSTONES = "tombstones.log"
+_PAYLOADS = "payloads.log"
+_RECORD = struct.Struct("<I")  # id byte length, followed by id bytes and the vector
+
+
+class Segment(NamedTuple):
+    name: str
+    vectors: np.ndarray  # (n, dim) memory-mapped, read-only
+    ids: np.ndarray  # (n,) memory-mapped fixed-width unicode
+
+
+class SegmentedIds:
+    """List-like id column: mapped per-segment string arrays plus a Python tail.
+
+    Reading ``ids[i]`` touches one mapped page, so opening an index does not
+    materialize millions of Python strings.
+    """
+
+    def __init__(self, parts: Iterable[np.ndarray] = ()):
+        self._parts: List[np.ndarray] = []
+        self._starts = [0]
+        self._tail: List[str] = []
+        for p in parts:
+            self._push(p)
+
+    def _push(self, part: np.ndarray) -> None:
+        self._parts.append(part)
+        self._starts.append(self._starts[-1] + part.shape[0])
+
+    def __len__(self) -> int:
+        return self._starts[-1] + len(self._tail)
+
+    def __getitem__(self, i: int) -> str:
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        base = self._starts[-1]
+        if i >= base:
+            return self._tail[i - base]
+        p = int(np.searchsorted(self._starts, i, side="right")) - 1
+        return str(self._parts[p][i - self._starts[p]])
+
+    def __iter__(self):
+        for part in self._parts:
+            for x in part:
+                yield str(x)
+        yield from self._tail
+
+    def find(self, wanted: Iterable[str]) -> np.ndarray:
+        """Sorted rows whose id is in ``wanted``: one vectorized ``isin`` per
+        mapped part, so no Python work per row."""
+        wanted = list(wanted)
+        if not wanted:
+            return np.empty(0, dtype="int64")
+        keys = np.array(wanted, dtype=str)
+        rows = [np.flatnonzero(np.isin(p, keys)) + s for p, s in zip(self._parts, self._starts)]
+        tail = set(wanted)
+        base = self._starts[-1]
+        in_tail = [base + i for i, vid in enumerate(self._tail) if vid in tail]
+        rows.append(np.array(in_tail, dtype="int64"))
+        return np.concatenate(rows)
+
+    def extend(self, ids: Iterable[str]) -> None:
+        self._tail.extend(ids)
+
+    def freeze_tail(self, part: np.ndarray) -> None:
+        assert part.shape[0] == len(self._tail)
+        self._push(part)
+        self._tail = []
+
+    def snapshot(self) -> "SegmentedIds":
+        """Frozen copy sharing the mapped parts; later appends are not visible."""
+        snap = SegmentedIds()
+        snap._parts = list(self._parts)
+        snap._starts = list(self._starts)
+        snap._tail = list(self._tail)
+        return snap
+
+
+def _write_json_atomic(path: Path, obj) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SegmentStore:
+    """On-disk home of one tier: immutable segment files plus an append log.
+
+    Layout of ``path``::
+
+        MANIFEST.json          live segments, current log, next sequence number
+        seg-000001.vec.npy     (n, dim) unit vectors, opened with mmap_mode="r"
+        seg-000001.ids.npy     (n,) ids as fixed-width unicode
+        append-000002.log      records appended since the last seal
+        tombstones-000003.log  deleted ids (replaced by each compaction)
+        payloads-000004.log    [id, payload] lines, the last one per id wins
+
+    New rows go to the append log and an in-memory copy; once the log holds
+    ``flush_rows`` rows it is sealed into a new segment. The manifest is
+    replaced atomically, so a crash leaves either the old or the new state.
+    ``payloads`` holds the current payload of every id that has one; a
+    payload line is written before its vector record, so a reader never
+    sees a row whose payload is still missing.
+
+    With ``read_only`` the store follows a directory another process
+    writes: ``open`` never creates, truncates or appends, and ``poll``
+    returns the rows and deletions logged since the last ``open`` / ``poll``
+    (or None once a seal or compaction means it must be opened again).
+    Files are only ever appended to or replaced, never rewritten in place,
+    so a reader sees at most a torn last record, which it skips until the
+    writer completes it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        dim: int = EMBEDDING_DIM,
+        dtype: str = VECTOR_DTYPE,
+        flush_rows: int = SEGMENT_FLUSH_ROWS,
+        fsync: bool = False,
+        read_only: bool = False,
+    ):
+        self.path = Path(path)
+        self.read_only = read_only
+        if not read_only:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.flush_rows = flush_rows
+        self.fsync = fsync
+        self._manifest: Dict = {}
+        self._log = None
+        self._tail = VectorBuffer(dim, dtype)
+        self._tail_ids: List[str] = []
+        self._tombstones = None
+        self._log_pos = 0  # bytes of the append log already read
+        self._tomb_pos = 0  # bytes of the tombstone log already read
+        self._payload_log = None
+        self._payload_pos = 0  # bytes of the payload log already read
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+        self.rows_written = 0
+
+    # --- startup -----------------------------------------------------
+    def open(self) -> Tuple[List[Segment], np.ndarray, List[str], Dict[str, int]]:
+        """Map existing segments and replay the append log.
+
+        Returns ``(segments, tail_vectors, tail_ids, deleted)`` where
+        ``deleted`` maps an id to the row count at the time it was deleted:
+        rows at positions below that count are dead.
+        """
+        manifest = self._read_manifest()
+        if manifest is not None:
+            self._manifest = manifest
+            if self._manifest["dim"] != self.dim:
+                raise ValueError(f"{self.path} holds dim {self._manifest['dim']}, not {self.dim}")
+        else:
+            self._manifest = {"dim": self.dim, "segments": [], "log": "append-000001.log", "next": 2}
+            if not self.read_only:
+                _write_json_atomic(self.path / _MANIFEST, self._manifest)
+
+        segments = [self._map_segment(name) for name in self._manifest["segments"]]
+        self._tail = VectorBuffer(self.dim, self.dtype)
+        self._tail_ids = []
+        self._log_pos = self._tomb_pos = self._payload_pos = 0
+        self.payloads = {}
+        self._read_payloads()
+        self._replay_log()
+        self.rows_written = sum(s.vectors.shape[0] for s in segments) + len(self._tail_ids)
+        deleted = self._read_tombstones()
+        if not self.read_only:
+            self._log = open(self.path / self._manifest["log"], "ab")
+            for path, pos in (
+                (self._tombstone_path(), self._tomb_pos),
+                (self._payload_path(), self._payload_pos),
+            ):
+                if path.exists():
+                    os.truncate(path, pos)  # drop a torn last line
+            self._tombstones = open(self._tombstone_path(), "a", encoding="utf-8")
+            self._payload_log = open(self._payload_path(), "a", encoding="utf-8")
+        return segments, self._tail.view.copy(), list(self._tail_ids), deleted
+
+    @property
+    def compacted(self) -> bool:
+        """Whether ``compact`` has nothing to do: at most one segment, an
+        empty append log and no tombstones."""
+        tombstones = self._tombstone_path()
+        return (
+            len(self._manifest.get("segments", ())) <= 1
+            and not self._tail_ids
+            and (not tombstones.exists() or tombstones.stat().st_size == 0)
+        )
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.path / _MANIFEST) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _tombstone_path(self) -> Path:
+        return self.path / self._manifest.get("tombstones", _TOMBSTONES)
+
+    def _payload_path(self) -> Path:
+        return self.path / self._manifest.get("payloads", _PAYLOADS)
+
+    def poll(self) -> Optional[Tuple[np.ndarray, List[str], Dict[str, int]]]:
+        """Rows and deletions logged since the last ``open`` / ``poll``.
+
+        Returns ``(vectors, ids, deleted)`` like ``open``, or None when the
+        writer sealed or compacted in between and the store must be opened
+        again.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return np.empty((0, self.dim), dtype=self.dtype), [], {}
+        if any(
+            manifest.get(key) != self._manifest.get(key)
+            for key in ("segments", "log", "tombstones", "payloads")
+        ):
+            return None
+        try:
+            vecs, ids = self._read_log()
+            self._read_payloads()  # after the log: covers every row just read
+            deleted = self._read_tombstones()
+        except FileNotFoundError:  # rolled over between the manifest read and now
+            return None
+        self.rows_written += len(ids)
+        return vecs, ids, deleted
+
+    def _map_segment(self, name: str) -> Segment:
+        vecs = np.load(self.path / f"{name}.vec.npy", mmap_mode="r")
+        ids = np.load(self.path / f"{name}.ids.npy", mmap_mode="r")
+        return Segment(name, vecs, ids)
+
+    def _replay_log(self) -> None:
+        log_path = self.path / self._manifest["log"]
+        if not log_path.exists():
+            return
+        vecs, ids = self._read_log()
+        if not self.read_only and self._log_pos < log_path.stat().st_size:
+            # torn record from a crash mid-append
+            with open(log_path, "r+b") as f:
+                f.truncate(self._log_pos)
+        if ids:
+            self._tail.add(vecs, normalized=True)
+            self._tail_ids = ids
+
+    def _read_log(self) -> Tuple[np.ndarray, List[str]]:
+        """Complete records after ``_log_pos``; advances it past them."""
+        with open(self.path / self._manifest["log"], "rb") as f:
+            f.seek(self._log_pos)
+            data = f.read()
+        row_bytes = self.dim * self.dtype.itemsize
+        off = 0
+        vecs, ids = [], []
+        while off + _RECORD.size <= len(data):
+            (n,) = _RECORD.unpack_from(data, off)
+            end = off + _RECORD.size + n + row_bytes
+            if end > len(data):
+                break
+            ids.append(data[off + _RECORD.size : off + _RECORD.size + n].decode("utf-8"))
+            vecs.append(np.frombuffer(data, dtype=self.dtype, count=self.dim, offset=end - row_bytes))
+            off = end
+        self._log_pos += off
+        if not vecs:
+            return np.empty((0, self.dim), dtype=self.dtype), ids
+        return np.stack(vecs), ids
+
+    @staticmethod
+    def _read_lines(path: Path, pos: int) -> Tuple[List[Any], int]:
+        """Complete JSON lines of ``path`` after byte ``pos``, and the new position."""
+        if not path.exists():
+            return [], pos
+        with open(path, "rb") as f:
+            f.seek(pos)
+            data = f.read()
+        data = data[: data.rfind(b"\n") + 1]  # a reader may catch a half-written line
+        lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+        return lines, pos + len(data)
+
+    def _read_tombstones(self) -> Dict[str, int]:
+        """Complete tombstone lines after ``_tomb_pos``; advances it past them."""
+        lines, self._tomb_pos = self._read_lines(self._tombstone_path(), self._tomb_pos)
+        return {vid: at for vid, at in lines}
+
+    def _read_payloads(self) -> None:
+        """Apply complete payload lines after ``_payload_pos`` to ``payloads``."""
+        lines, self._payload_pos = self._read_lines(self._payload_path(), self._payload_pos)
+        for vid, payload in lines:
+            if payload is None:
+                self.payloads.pop(vid, None)
+            else:
+                self.payloads[vid] = payload
+
+    # --- writes ------------------------------------------------------
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"{self.path} is opened read-only")
+
+    def append(
+        self,
+        vecs: np.ndarray,
+        ids: List[str],
+        payloads: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    ) -> Optional[Segment]:
+        """Log unit ``vecs``; returns the sealed segment if the log rolled over.
+
+        Each id's payload becomes ``payloads[i]``; rows appended without one
+        clear the payload an earlier row of the same id had.
+        """
+        self._check_writable()
+        self._log_payloads(ids, payloads)
+        vecs = np.ascontiguousarray(vecs, dtype=self.dtype)
+        buf = bytearray()
+        for vid, row in zip(ids, vecs):
+            raw = vid.encode("utf-8")
+            buf += _RECORD.pack(len(raw)) + raw + row.tobytes()
+        self._log.write(buf)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._tail.add(vecs, normalized=True)
+        self._tail_ids.extend(ids)
+        self.rows_written += len(ids)
+        if len(self._tail_ids) >= self.flush_rows:
+            return self.seal()
+        return None
+
+    def _log_payloads(
+        self, ids: List[str], payloads: Optional[Sequence[Optional[Dict[str, Any]]]]
+    ) -> None:
+        lines = []
+        for i, vid in enumerate(ids):
+            payload = payloads[i] if payloads is not None else None
+            if payload is None and vid not in self.payloads:
+                continue
+            lines.append(json.dumps([vid, payload]) + "\n")
+            if payload is None:
+                del self.payloads[vid]
+            else:
+                self.payloads[vid] = payload
+        if lines:
+            self._payload_log.write("".join(lines))
+            self._payload_log.flush()
+            if self.fsync:
+                os.fsync(self._payload_log.fileno())
+
+    def delete(self, ids: Iterable[str]) -> None:
+        self._check_writable()
+        for vid in ids:
+            self._tombstones.write(json.dumps([vid, self.rows_written]) + "\n")
+        self._tombstones.flush()
+
+    def _write_segment(self, name: str, vecs: np.ndarray, ids: List[str]) -> None:
+        np.save(self.path / f"{name}.vec.npy", np.asarray(vecs, dtype=self.dtype))
+        np.save(self.path / f"{name}.ids.npy", np.array(ids, dtype=str))
+
+    def seal(self) -> Optional[Segment]:
+        """Turn the current append log into an immutable segment."""
+        if self.read_only or not self._tail_ids:
+            return None
+        seq = self._manifest["next"]
+        name = f"seg-{seq:06d}"
+        self._write_segment(name, self._tail.view, self._tail_ids)
+        old_log = self.path / self._manifest["log"]
+        new_log = f"append-{seq + 1:06d}.log"
+        (self.path / new_log).touch()
+        self._manifest = dict(
+            self._manifest,
+            segments=self._manifest["segments"] + [name],
+            log=new_log,
+            next=seq + 2,
+        )
+        _write_json_atomic(self.path / _MANIFEST, self._manifest)
+        self._log.close()
+        old_log.unlink(missing_ok=True)
+        self._log = open(self.path / new_log, "ab")
+        self._tail = VectorBuffer(self.dim, self.dtype)
+        self._tail_ids = []
+        return self._map_segment(name)
+
+    def compact(self, chunk_rows: int = 65536) -> None:
+        """Merge every segment and the log into one segment.
+
+        Deleted rows and rows superseded by a later row with the same id are
+        dropped. Rows are streamed through in chunks, so memory stays bounded
+        by ``chunk_rows``. Callers must ``open()`` again afterwards. A no-op
+        when the store is already ``compacted``.
+        """
+        self._check_writable()
+        if self.compacted:
+            return
+        self.seal()
+        segments = [self._map_segment(n) for n in self._manifest["segments"]]
+        # the whole log: open() / poll() have already read past earlier deletes
+        lines, _ = self._read_lines(self._tombstone_path(), 0)
+        deleted = {vid: at for vid, at in lines}
+
+        # last position of every id, then the rows that survive
+        last: Dict[str, int] = {}
+        pos = 0
+        for seg in segments:
+            for vid in seg.ids:
+                last[str(vid)] = pos
+                pos += 1
+        keep = sorted(p for vid, p in last.items() if p >= deleted.get(vid, 0))
+
+        seq = self._manifest["next"]
+        name = f"seg-{seq:06d}"
+        vec_path = self.path / f"{name}.vec.npy"
+        out = np.lib.format.open_memmap(
+            vec_path, mode="w+", dtype=self.dtype, shape=(len(keep), self.dim)
+        )
+        out_ids: List[str] = []
+        keep_arr = np.asarray(keep, dtype="int64")
+        starts = np.cumsum([0] + [s.vectors.shape[0] for s in segments])
+        written = 0
+        for i, seg in enumerate(segments):
+            lo, hi = np.searchsorted(keep_arr, [starts[i], starts[i + 1]])
+            local = keep_arr[lo:hi] - starts[i]
+            for c in range(0, local.shape[0], chunk_rows):
+                part = local[c : c + chunk_rows]
+                out[written : written + part.shape[0]] = seg.vectors[part]
+                out_ids.extend(str(x) for x in seg.ids[part])
+                written += part.shape[0]
+        out.flush()
+        del out
+        np.save(self.path / f"{name}.ids.npy", np.array(out_ids, dtype=str))
+
+        # a fresh tombstone log goes live with the manifest: the old one's row
+        # positions refer to the old segments; the payload log is rewritten
+        # with the surviving ids only
+        old = self._manifest["segments"]
+        old_tombstones = self._tombstone_path()
+        old_payloads = self._payload_path()
+        tombstones = f"tombstones-{seq + 1:06d}.log"
+        payloads = f"payloads-{seq + 2:06d}.log"
+        (self.path / tombstones).touch()
+        kept = {vid: self.payloads[vid] for vid in dict.fromkeys(out_ids) if vid in self.payloads}
+        with open(self.path / payloads, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps([vid, p]) + "\n" for vid, p in kept.items())
+        self.payloads = kept
+        self._manifest = dict(
+            self._manifest,
+            segments=[name] if keep else [],
+            tombstones=tombstones,
+            payloads=payloads,
+            next=seq + 3,
+        )
+        _write_json_atomic(self.path / _MANIFEST, self._manifest)
+        self._tombstones.close()
+        self._payload_log.close()
+        old_tombstones.unlink(missing_ok=True)
+        old_payloads.unlink(missing_ok=True)
+        self._tombstones = open(self.path / tombstones, "a", encoding="utf-8")
+        self._payload_log = open(self.path / payloads, "a", encoding="utf-8")
+        del segments
+        for n in old:
+            for suffix in (".vec.npy", ".ids.npy"):
+                (self.path / f"{n}{suffix}").unlink(missing_ok=True)
+        if not keep:
+            for suffix in (".vec.npy", ".ids.npy"):
+                (self.path / f"{name}{suffix}").unlink(missing_ok=True)
+
+    def close(self) -> None:
+        for f in (self._log, self._tombstones, self._payload_log):
+            if f is not None:
+                f.close()
+        self._log = self._tombstones = self._payload_log = None
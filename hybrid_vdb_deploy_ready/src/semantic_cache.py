@@ -1,80 +1,402 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Callable, Iterable, List, Optional, Tuple
 import numpy as np
-import datetime as dt
+import sys
+import threading
+import time
 
-from .config import EMBEDDING_DIM
+from .buffers import RecentValues
+from .config import (
+    CLUSTER_DECAY,
+    CLUSTER_DTYPE,
+    CLUSTER_HISTORY,
+    CLUSTER_PRUNE_MOMENTUM,
+    EMBEDDING_DIM,
+    RESULT_CACHE_CAPACITY,
+    RESULT_CACHE_THRESHOLD,
+    RESULT_CACHE_TTL_SEC,
+)
+
+_EMA = 0.9  # centroid <- 0.9 * centroid + 0.1 * vec
 
 
-@dataclass
 class SemanticCluster:
-    centroid: np.ndarray
-    momentum: float = 0.0
-    vector_ids: List[str] = field(default_factory=list)
-    last_activity: dt.datetime = field(default_factory=dt.datetime.utcnow)
+    """Handle onto one cluster row of a ``SemanticCache``."""
+
+    __slots__ = ("_cache", "_slot")
+
+    def __init__(self, cache: "SemanticCache", slot: int):
+        self._cache = cache
+        self._slot = slot
+
+    @property
+    def centroid(self) -> np.ndarray:
+        c = self._cache
+        return c.unit[self._slot].astype("float32") * c.norm[self._slot]
+
+    @property
+    def momentum(self) -> float:
+        """Current momentum, decayed since ``last_activity``."""
+        return self._cache.momentum_of(self)
+
+    @property
+    def last_activity(self) -> float:
+        """Epoch seconds of the last vector assigned to this cluster."""
+        return float(self._cache.last_activity[self._slot])
+
+    @last_activity.setter
+    def last_activity(self, value: float) -> None:
+        self._cache.last_activity[self._slot] = value
+
+    @property
+    def vector_ids(self) -> List[str]:
+        """The most recent result ids (up to ``CLUSTER_HISTORY``), oldest first."""
+        return self._cache.recent_ids.get(self._slot)
+
+    def __repr__(self) -> str:
+        return f"SemanticCluster(slot={self._slot}, momentum={self.momentum:.2f})"
 
 
 class SemanticCache:
     """Tracks which semantic regions are currently 'hot'.
 
     This is a very light‑weight online clustering mechanism with momentum.
+    Momentum decays lazily by ``decay_factor`` per idle minute: a cluster
+    stores its momentum as of ``last_activity`` and every read applies the
+    decay since then, so no periodic sweep is needed for correct values.
+    ``prune_step`` / ``decay`` only drop clusters that have faded out.
+
+    Clusters are rows of preallocated arrays (unit centroids in ``dtype``
+    plus their norm, momentum, epoch timestamps and the last ``history``
+    result ids), like ``AnchorStore``; pruned rows are reused. Every
+    method runs on the router's writer.
     """
 
-    def __init__(self, distance_threshold: float = 0.3):
+    def __init__(
+        self,
+        distance_threshold: float = 0.3,
+        decay_factor: float = CLUSTER_DECAY,
+        prune_below: float = CLUSTER_PRUNE_MOMENTUM,
+        dim: int = EMBEDDING_DIM,
+        dtype: str = CLUSTER_DTYPE,
+        history: int = CLUSTER_HISTORY,
+        capacity: int = 64,
+    ):
         self.distance_threshold = distance_threshold
-        self.clusters: List[SemanticCluster] = []
+        self.decay_factor = decay_factor
+        self.prune_below = prune_below
+        self.size = 0  # high-water mark; rows >= size were never used
+        self.unit = np.zeros((capacity, dim), dtype=dtype)
+        self.norm = np.zeros(capacity, dtype="float32")
+        self._momentum = np.zeros(capacity, dtype="float64")
+        self.last_activity = np.zeros(capacity, dtype="float64")
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.recent_ids = RecentValues(capacity, history)
+        self._free: List[int] = []
+        self._prune_cursor = 0
+
+    def __len__(self) -> int:
+        return self.size - len(self._free)
+
+    @property
+    def clusters(self) -> List[SemanticCluster]:
+        """Live clusters in row order."""
+        return [SemanticCluster(self, s) for s in np.flatnonzero(self.alive[: self.size]).tolist()]
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.unit, self.norm, self._momentum, self.last_activity, self.alive)
+        return sum(a.nbytes for a in arrays) + self.recent_ids.nbytes
 
-    def _cosine_distance(self, a: np.ndarray, b: np.ndarray) -> float:
-        a = a.astype("float32")
-        b = b.astype("float32")
-        return 1.0 - float(np.dot(a, b) / ((np.linalg.norm(a) * np.linalg.norm(b)) + 1e-9))
+    def _grow(self) -> None:
+        new_cap = self.unit.shape[0] * 2
+        for name in ("unit", "norm", "_momentum", "last_activity", "alive"):
+            old = getattr(self, name)
+            new = np.zeros((new_cap,) + old.shape[1:], dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+        self.recent_ids.grow(new_cap)
+
+    def _allocate(self, unit: np.ndarray, norm: float, vec_id: str, now: float) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self.size == self.unit.shape[0]:
+                self._grow()
+            slot = self.size
+            self.size += 1
+        self.unit[slot] = unit
+        self.norm[slot] = norm
+        self._momentum[slot] = 1.0
+        self.last_activity[slot] = now
+        self.alive[slot] = True
+        self.recent_ids.clear(slot)
+        self.recent_ids.push(slot, vec_id)
+        return slot
+
+    def _current_momentum(self, slots: np.ndarray, now: float) -> np.ndarray:
+        minutes = np.maximum((now - self.last_activity[slots]) / 60.0, 0.0)
+        return self._momentum[slots] * self.decay_factor ** minutes
+
+    def _similarities(self, units: np.ndarray) -> np.ndarray:
+        sims = units @ self.unit[: self.size].T.astype("float32", copy=False)
+        sims[:, ~self.alive[: self.size]] = -np.inf
+        return sims
+
+    def momentum_of(self, cluster: SemanticCluster, now: Optional[float] = None) -> float:
+        """``cluster``'s momentum decayed up to ``now`` (epoch seconds)."""
+        now = time.time() if now is None else now
+        return float(self._current_momentum(np.array([cluster._slot]), now)[0])
 
     def update_with_vector(self, vec: np.ndarray, vec_id: str) -> None:
         if vec.ndim == 2:
             vec = vec[0]
-        if not self.clusters:
-            self.clusters.append(SemanticCluster(centroid=vec, momentum=1.0, vector_ids=[vec_id]))
-            return
+        vec = vec.astype("float32")
+        norm = float(np.linalg.norm(vec))
+        unit = vec / (norm + 1e-9)
+        now = time.time()
+        if len(self):
+            sims = self._similarities(unit[None, :])[0]
+            slot = int(np.argmax(sims))
+            if 1.0 - sims[slot] < self.distance_threshold:
+                # strengthen existing cluster
+                self._momentum[slot] = self._current_momentum(np.array([slot]), now)[0] + 1.0
+                raw = _EMA * self.norm[slot] * self.unit[slot].astype("float32") + (1.0 - _EMA) * vec
+                self.norm[slot] = np.linalg.norm(raw)
+                self.unit[slot] = raw / (self.norm[slot] + 1e-9)
+                self.last_activity[slot] = now
+                self.recent_ids.push(slot, vec_id)
+                return
+        # create new cluster
+        self._allocate(unit, norm, vec_id, now)
 
-        best = None
-        best_dist = 1e9
-        for c in self.clusters:
-            d = self._cosine_distance(c.centroid, vec)
-            if d < best_dist:
-                best = c
-                best_dist = d
-
-        if best is not None and best_dist < self.distance_threshold:
-            # strengthen existing cluster
-            best.momentum += 1.0
-            best.centroid = 0.9 * best.centroid + 0.1 * vec
-            best.vector_ids.append(vec_id)
-            best.last_activity = dt.datetime.utcnow()
-        else:
-            # create new cluster
-            self.clusters.append(SemanticCluster(centroid=vec, momentum=1.0, vector_ids=[vec_id]))
-
-    def decay(self, factor: float = 0.95) -> None:
-        now = dt.datetime.utcnow()
-        alive = []
-        for c in self.clusters:
-            minutes = (now - c.last_activity).total_seconds() / 60.0
-            c.momentum *= factor ** max(minutes, 0.0)
-            if c.momentum > 0.1:
-                alive.append(c)
-        self.clusters = alive
+    def _prune(self, slots: np.ndarray, now: float) -> None:
+        slots = slots[self.alive[slots]]
+        doomed = slots[self._current_momentum(slots, now) <= self.prune_below]
+        self.alive[doomed] = False
+        for slot in doomed.tolist():
+            self.recent_ids.clear(slot)
+            self._free.append(slot)
+
+    def decay(self) -> None:
+        """Drop every cluster whose momentum has decayed away (one full pass)."""
+        if self.size:
+            self._prune(np.arange(self.size), time.time())
+        self._prune_cursor = 0
+
+    def prune_step(self, max_clusters: int = 256) -> bool:
+        """``decay`` over the next ``max_clusters`` rows; True once a pass is done."""
+        n = self.size
+        start = self._prune_cursor if self._prune_cursor < n else 0
+        stop = min(start + max_clusters, n)
+        if stop > start:
+            self._prune(np.arange(start, stop), time.time())
+        self._prune_cursor = stop if stop < n else 0
+        return stop >= n
+
+    def momentum_for(self, vecs: np.ndarray) -> np.ndarray:
+        """Momentum of the nearest cluster for each row of ``vecs``.
+
+        Rows farther than ``distance_threshold`` from every cluster get 0.
+        """
+        v = _unit(vecs)
+        if not len(self):
+            return np.zeros(v.shape[0])
+        sims = self._similarities(v)
+        best = np.argmax(sims, axis=1)
+        momentum = self._current_momentum(best, time.time())
+        momentum[1.0 - sims[np.arange(len(best)), best] >= self.distance_threshold] = 0.0
+        return momentum
 
     def find_hot_cluster(self, vec: np.ndarray) -> Optional[SemanticCluster]:
-        if not self.clusters:
+        if not len(self):
             return None
         if vec.ndim == 2:
             vec = vec[0]
-        best = None
-        best_dist = 1e9
-        for c in self.clusters:
-            d = self._cosine_distance(c.centroid, vec)
-            if d < best_dist:
-                best_dist = d
-                best = c
-        return best
+        sims = self._similarities(_unit(vec))
+        return SemanticCluster(self, int(np.argmax(sims[0])))
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    m = np.atleast_2d(np.asarray(m, dtype="float32"))
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-9)
+
+
+class ResultCache:
+    """Similarity-keyed cache of search results.
+
+    Stores ``query vector -> (ids, scores)`` in a fixed number of slots. A
+    lookup is one matrix product against all cached queries; it hits when
+    the most similar cached query reaches ``threshold`` and was asked with
+    at least the same ``k``. Full slots are reused least-recently-used
+    first, and entries older than ``ttl_sec`` are dropped.
+
+    ``on_storage_change`` (registered with ``StorageEngine.add_listener``)
+    drops entries that mention changed ids and entries a newly added
+    vector would now rank into, and bumps ``generation``; ``put_batch``
+    given an older generation drops the results, as storage may have
+    changed after they were read.
+
+    Thread-safe: every method holds an internal lock (each is a small
+    matrix product over ``capacity`` rows).
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        capacity: int = RESULT_CACHE_CAPACITY,
+        threshold: float = RESULT_CACHE_THRESHOLD,
+        ttl_sec: Optional[float] = RESULT_CACHE_TTL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_sec = ttl_sec
+        self.clock = clock
+        self.queries = np.zeros((capacity, dim), dtype="float32")
+        self.occupied = np.zeros(capacity, dtype=bool)
+        self.k = np.zeros(capacity, dtype="int64")
+        self.min_score = np.zeros(capacity, dtype="float32")  # worst cached score
+        self.created = np.zeros(capacity, dtype="float64")
+        self.last_access = np.zeros(capacity, dtype="float64")
+        self.results: List[Optional[Tuple[List[str], List[float]]]] = [None] * capacity
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.generation = 0  # storage changes seen
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self.occupied.sum())
+
+    def _drop(self, slots: np.ndarray) -> None:
+        self.occupied[slots] = False
+        for slot in slots.tolist():
+            self.results[slot] = None
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_sec is not None:
+            self._drop(np.flatnonzero(self.occupied & (now - self.created > self.ttl_sec)))
+
+    def lookup_batch(
+        self, queries: np.ndarray, k: int
+    ) -> List[Optional[Tuple[List[str], List[float]]]]:
+        """Cached ``(ids, scores)`` (truncated to ``k``) or None per query row."""
+        q = _unit(queries)
+        with self._lock:
+            return self._lookup(q, k)
+
+    def _lookup(self, q: np.ndarray, k: int) -> List[Optional[Tuple[List[str], List[float]]]]:
+        now = self.clock()
+        self._expire(now)
+        usable = self.occupied & (self.k >= k)
+        if not usable.any():
+            self.misses += q.shape[0]
+            return [None] * q.shape[0]
+        sims = q @ self.queries.T
+        sims[:, ~usable] = -np.inf
+        best = np.argmax(sims, axis=1)
+        hit = sims[np.arange(q.shape[0]), best] >= self.threshold
+        out: List[Optional[Tuple[List[str], List[float]]]] = []
+        for slot, h in zip(best.tolist(), hit.tolist()):
+            if h:
+                ids, scores = self.results[slot]
+                self.last_access[slot] = now
+                out.append((ids[:k], scores[:k]))
+            else:
+                out.append(None)
+        n_hit = int(hit.sum())
+        self.hits += n_hit
+        self.misses += q.shape[0] - n_hit
+        return out
+
+    def put_batch(
+        self,
+        queries: np.ndarray,
+        ids_list: List[List[str]],
+        scores_list: List[List[float]],
+        k: int,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Cache results; skipped if storage changed since ``generation``."""
+        q = _unit(queries)
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self._put(q, ids_list, scores_list, k)
+
+    def _put(self, q: np.ndarray, ids_list, scores_list, k: int) -> None:
+        now = self.clock()
+        self._expire(now)
+        for vec, ids, scores in zip(q, ids_list, scores_list):
+            if not ids:
+                continue
+            free = np.flatnonzero(~self.occupied)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self.last_access))
+            self.queries[slot] = vec
+            self.occupied[slot] = True
+            self.k[slot] = k
+            self.min_score[slot] = min(scores) if len(ids) >= k else -np.inf
+            self.created[slot] = self.last_access[slot] = now
+            self.results[slot] = (list(ids), list(scores))
+
+    def on_storage_change(
+        self, ids: Optional[Iterable[str]], vectors: Optional[np.ndarray] = None
+    ) -> None:
+        """Invalidate entries made stale by ids added, replaced or removed.
+
+        ``ids=None`` (unknown change) drops every entry.
+        """
+        with self._lock:
+            self.generation += 1
+            self._invalidate(ids, vectors)
+
+    def _invalidate(self, ids: Optional[Iterable[str]], vectors: Optional[np.ndarray]) -> None:
+        occ = np.flatnonzero(self.occupied)
+        if not occ.size:
+            return
+        if ids is None:
+            self._drop(occ)
+            self.invalidations += occ.size
+            return
+        changed = set(ids)
+        stale = np.array([bool(changed.intersection(self.results[s][0])) for s in occ.tolist()])
+        if vectors is not None and len(vectors):
+            # a new vector that outscores an entry's worst result would change it
+            beats = (self.queries[occ] @ _unit(vectors).T).max(axis=1) > self.min_score[occ]
+            stale |= beats
+        self._drop(occ[stale])
+        self.invalidations += int(stale.sum())
+
+    def expire(self) -> int:
+        """Free the slots of entries older than ``ttl_sec``; returns how many."""
+        with self._lock:
+            before = int(self.occupied.sum())
+            self._expire(self.clock())
+            return before - int(self.occupied.sum())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._drop(np.flatnonzero(self.occupied))
+
+    @property
+    def nbytes(self) -> int:
+        """Slot arrays plus the cached result lists (ids are shared with storage)."""
+        arrays = (self.queries, self.occupied, self.k, self.min_score, self.created, self.last_access)
+        lists = sum(
+            sys.getsizeof(ids) + sys.getsizeof(scores) + 24 * len(scores)
+            for ids, scores in (r for r in self.results if r is not None)
+        )
+        return sum(a.nbytes for a in arrays) + sys.getsizeof(self.results) + lists
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,247 @@
+from __future__ import annotations
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .segments import _write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+_LOCK = "writer.lock"
+_SOCKET = "writer.sock"
+_KEY = "writer.key"
+
+
+class RemoteError(RuntimeError):
+    """The writer process raised while handling a forwarded call."""
+
+
+class WriterLease:
+    """Process-lifetime claim on being the one writer for ``root``.
+
+    An ``flock`` on ``root/writer.lock``: the first process to take it owns
+    the shared state, the others follow. The kernel drops the lock when the
+    holder exits, so a restarted worker can take over.
+    """
+
+    def __init__(self, root: Path):
+        if fcntl is None:
+            raise RuntimeError("sharing a router between processes needs fcntl.flock (POSIX)")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Try to become the writer without blocking."""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.root / _LOCK, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedViews:
+    """Small arrays the writer publishes and followers memory-map.
+
+    ``publish(name, arrays)`` writes each array to ``name-<gen>.<key>.npy``
+    and then atomically replaces ``name.json``, which points at the new
+    generation. The previous two generations are kept so a follower that
+    read the pointer just before can still map them. ``load`` maps the
+    current generation read-only if it is newer than the caller's.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._gen: Dict[str, int] = {}
+
+    def publish(self, name: str, arrays: Dict[str, np.ndarray]) -> int:
+        gen = self._gen.get(name, self._current(name)) + 1
+        for key, arr in arrays.items():
+            np.save(self.root / f"{name}-{gen:06d}.{key}.npy", np.ascontiguousarray(arr))
+        _write_json_atomic(self.root / f"{name}.json", {"gen": gen, "arrays": sorted(arrays)})
+        self._gen[name] = gen
+        for path in self.root.glob(f"{name}-{gen - 3:06d}.*.npy"):
+            path.unlink(missing_ok=True)
+        return gen
+
+    def _pointer(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.root / f"{name}.json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _current(self, name: str) -> int:
+        pointer = self._pointer(name)
+        return pointer["gen"] if pointer else 0
+
+    def load(self, name: str, seen: int = 0) -> Optional[Tuple[int, Dict[str, np.ndarray]]]:
+        """``(gen, arrays)`` of the current generation if newer than ``seen``."""
+        pointer = self._pointer(name)
+        if pointer is None or pointer["gen"] <= seen:
+            return None
+        gen = pointer["gen"]
+        try:
+            arrays = {
+                key: np.load(self.root / f"{name}-{gen:06d}.{key}.npy", mmap_mode="r")
+                for key in pointer["arrays"]
+            }
+        except FileNotFoundError:  # superseded twice since the pointer was read
+            return None
+        return gen, arrays
+
+
+def _read_key(root: Path) -> bytes:
+    with open(root / _KEY, "rb") as f:
+        return f.read()
+
+
+class ForwardServer:
+    """Serves ``handlers[op](*args)`` to follower processes over a unix socket.
+
+    ``multiprocessing.connection`` does the framing and pickling; clients
+    authenticate with a random key the server writes next to the socket
+    (mode 0600), so only processes of the same user with access to
+    ``root`` can connect. Each connection gets its own thread.
+    """
+
+    def __init__(self, root: Path, handlers: Dict[str, Callable[..., Any]]):
+        self.root = Path(root)
+        self.handlers = handlers
+        self.counters = {"connections": 0, "calls": 0, "errors": 0}
+        key = os.urandom(32)
+        fd = os.open(self.root / _KEY, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        sock = self.root / _SOCKET
+        sock.unlink(missing_ok=True)  # left behind by a writer that died
+        self._key = key
+        self._listener = Listener(str(sock), family="AF_UNIX", authkey=key)
+        self._closed = False
+        self._thread = threading.Thread(target=self._accept, name="forward-accept", daemon=True)
+        self._thread.start()
+
+    def _accept(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._closed:
+                    return
+                logger.warning("rejected a forward connection", exc_info=True)
+                continue
+            self.counters["connections"] += 1
+            threading.Thread(target=self._serve, args=(conn,), name="forward", daemon=True).start()
+
+    def _serve(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    op, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                self.counters["calls"] += 1
+                try:
+                    reply = ("ok", self.handlers[op](*args))
+                except Exception as exc:
+                    self.counters["errors"] += 1
+                    logger.exception("forwarded %s failed", op)
+                    reply = ("error", f"{type(exc).__name__}: {exc}")
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def close(self) -> None:
+        self._closed = True
+        try:  # closing the listener does not wake a blocked accept(); a connection does
+            Client(str(self.root / _SOCKET), family="AF_UNIX", authkey=self._key).close()
+        except (OSError, EOFError, AuthenticationError):
+            pass
+        self._thread.join(1.0)
+        self._listener.close()
+        (self.root / _SOCKET).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+
+class ForwardClient:
+    """Follower side of ``ForwardServer``.
+
+    ``call(op, *args)`` sends one request and blocks for its result. One
+    connection is shared under a lock and re-opened (re-reading the key,
+    in case a new writer took over) after a failure.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.counters = {"calls": 0, "errors": 0, "connects": 0}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self.counters["connects"] += 1
+        return Client(str(self.root / _SOCKET), family="AF_UNIX", authkey=_read_key(self.root))
+
+    def call(self, op: str, *args: Any) -> Any:
+        with self._lock:
+            self.counters["calls"] += 1
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = self._connect()
+                    self._conn.send((op, args))
+                    status, value = self._conn.recv()
+                    break
+                except (OSError, EOFError):
+                    self._drop()
+                    if attempt:
+                        self.counters["errors"] += 1
+                        raise
+        if status != "ok":
+            self.counters["errors"] += 1
+            raise RemoteError(value)
+        return value
+
+    def _drop(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.counters)
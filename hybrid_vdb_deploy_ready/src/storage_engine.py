@@ -1,68 +1,179 @@
 from __future__ import annotations
-from typing import List, Tuple
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import time
 import numpy as np
 
 from .local_vdb import LocalVDB
+from .hot_partition import EvictionPolicy, HotPartition
+from .payloads import Filter, Payloads
 from .config import HOT_PARTITION_CAPACITY
 
 
 class StorageEngine:
     """Two‑tier storage over a LocalVDB.
 
-    - Hot partition (small list kept in RAM with linear search)
+    - Hot partition (fixed-size slots kept in RAM with linear search and a
+      pluggable eviction policy, see ``hot_partition.py``)
     - Backing indices (permanent + dynamic) via LocalVDB
+
+    ``stage_timer(stage, ms)``, if given, receives the duration of the
+    "hot_scan" and "backing_scan" of every ``search_batch``.
+
+    Searches only read published snapshots of each tier and may run on any
+    number of threads; writes (``add_*``, ``upsert_dynamic``, ``remove``,
+    ``reclaim``) must come from one thread at a time (the router's
+    ``SingleWriter``).
+
+    Payloads live in the backing tiers only, so a search with a payload
+    ``filter`` skips the hot partition; whatever the cloud returned for
+    such a query is in the dynamic tier too.
+
+    With ``read_only`` the backing tiers follow the on-disk store at
+    ``data_dir`` that another process writes: ``refresh`` picks up its
+    changes (and tells the listeners), and the hot partition only shows
+    views the writer published (``HotPartition.adopt``).
     """
 
-    def __init__(self):
-        self.local_vdb = LocalVDB()
-        self.hot_vectors = np.empty((0, self.local_vdb.permanent.dim), dtype="float32")
-        self.hot_ids: List[str] = []
-        self.hot_capacity = HOT_PARTITION_CAPACITY
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        hot_policy: Optional[EvictionPolicy] = None,
+        hot_capacity: int = HOT_PARTITION_CAPACITY,
+        stage_timer: Optional[Callable[[str, float], None]] = None,
+        read_only: bool = False,
+        hot_publish_interval: float = 0.0,
+    ):
+        self.read_only = read_only
+        self.local_vdb = LocalVDB(data_dir, read_only=read_only)
+        self.stage_timer = stage_timer
+        self.hot = HotPartition(
+            self.local_vdb.permanent.dim, hot_capacity, hot_policy, hot_publish_interval
+        )
+        self.listeners: List[Callable[[List[str], Optional[np.ndarray]], None]] = []
+
+    def add_listener(self, fn: Callable[[List[str], Optional[np.ndarray]], None]) -> None:
+        """Call ``fn(ids, vectors)`` whenever the backing tiers change.
+
+        ``vectors`` holds the new rows for inserts and is None for removals;
+        ``ids`` is None when anything may have changed (a read-only store
+        was reopened).
+        """
+        self.listeners.append(fn)
+
+    def _notify(self, ids: Optional[List[str]], vecs: Optional[np.ndarray] = None) -> None:
+        for fn in self.listeners:
+            fn(ids, vecs)
+
+    def contains(self, vec_id: str) -> bool:
+        """Whether ``vec_id`` is resident in any local tier."""
+        return vec_id in self.hot or vec_id in self.local_vdb
 
     def add_hot(self, vecs: np.ndarray, ids: List[str]) -> None:
-        if vecs.ndim == 1:
-            vecs = vecs[None, :]
-        self.hot_vectors = np.vstack([self.hot_vectors, vecs])
-        self.hot_ids.extend(ids)
-        # simple FIFO eviction
-        if self.hot_vectors.shape[0] > self.hot_capacity:
-            overflow = self.hot_vectors.shape[0] - self.hot_capacity
-            self.hot_vectors = self.hot_vectors[overflow:, :]
-            self.hot_ids = self.hot_ids[overflow:]
-
-    def add_permanent(self, vecs: np.ndarray, ids: List[str]) -> None:
-        self.local_vdb.add_permanent(vecs, ids)
-
-    def add_dynamic(self, vecs: np.ndarray, ids: List[str]) -> None:
-        self.local_vdb.add_dynamic(vecs, ids)
-
-    def search(self, query: np.ndarray, k: int = 5) -> Tuple[List[str], List[float]]:
+        self.hot.add(vecs, ids)
+
+    def hot_stats(self) -> Dict[str, float]:
+        """Hit / eviction counters of the hot partition, for capacity tuning."""
+        return self.hot.stats()
+
+    def add_permanent(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.local_vdb.add_permanent(vecs, ids, payloads)
+        self._notify(ids, vecs)
+
+    def add_dynamic(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.local_vdb.add_dynamic(vecs, ids, payloads)
+        self._notify(ids, vecs)
+
+    def upsert_dynamic(self, vecs: np.ndarray, ids: List[str], payloads: Payloads = None) -> None:
+        self.local_vdb.upsert_dynamic(vecs, ids, payloads)
+        self._notify(ids, vecs)
+
+    def remove(self, ids: List[str]) -> int:
+        """Delete ``ids`` from the hot partition and both backing tiers."""
+        self.hot.remove(ids)
+        n = self.local_vdb.remove(ids)
+        self._notify(ids)
+        return n
+
+    def filter_stats(self) -> Dict[str, int]:
+        """Filtered backing searches per strategy (prefilter / postfilter)."""
+        return self.local_vdb.filter_stats()
+
+    def search(
+        self, query: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[str], List[float]]:
+        ids, scores = self.search_batch(np.asarray(query).reshape(1, -1), k, filter)
+        return ids[0], scores[0]
+
+    def search_batch(
+        self, queries: np.ndarray, k: int = 5, filter: Optional[Filter] = None
+    ) -> Tuple[List[List[str]], List[List[float]]]:
+        """Top-``k`` ids and scores for every row of ``queries``."""
+        q = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        if filter:
+            t0 = time.perf_counter()
+            out = self.local_vdb.search_batch(q, k, filter)
+            if self.stage_timer is not None:
+                self.stage_timer("backing_scan", (time.perf_counter() - t0) * 1000.0)
+            return out
+
         # 1. hot partition
-        if self.hot_vectors.shape[0] > 0:
-            q = query.astype("float32")
-            if q.ndim == 1:
-                q = q[None, :]
-            v = self.hot_vectors
-            v_norm = v / (np.linalg.norm(v, axis=1, keepdims=True) + 1e-9)
-            q_norm = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-9)
-            scores = (v_norm @ q_norm.T)[:, 0]
-            idx = np.argsort(-scores)[:k]
-            hot_res = [(self.hot_ids[i], float(scores[i])) for i in idx]
-        else:
-            hot_res = []
+        q_norm = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-9)
+        t0 = time.perf_counter()
+        view = self.hot.view
+        hot_slots, hot_scores = self.hot.search_batch(q_norm, k, view)
+        t1 = time.perf_counter()
 
         # 2. backing indices
-        ids, scores = self.local_vdb.search(query, k)
-        backing = list(zip(ids, scores))
+        backing_ids, backing_scores = self.local_vdb.search_batch(q, k)
+        if self.stage_timer is not None:
+            self.stage_timer("hot_scan", (t1 - t0) * 1000.0)
+            self.stage_timer("backing_scan", (time.perf_counter() - t1) * 1000.0)
+
+        out_ids: List[List[str]] = []
+        out_scores: List[List[float]] = []
+        for i in range(q.shape[0]):
+            ids, scores = self._merge(
+                view, hot_slots[i], hot_scores[i], backing_ids[i], backing_scores[i], k
+            )
+            out_ids.append(ids)
+            out_scores.append(scores)
+        return out_ids, out_scores
+
+    def _merge(self, view, slots, hot_scores, ids, scores, k: int) -> Tuple[List[str], List[float]]:
+        live = np.isfinite(hot_scores)
+        hot_ids = [view.slot_ids[s] for s in slots[live].tolist()]
+        hot_slot = dict(zip(hot_ids, slots[live].tolist()))
 
-        combined = hot_res + backing
-        combined.sort(key=lambda x: x[1], reverse=True)
-        combined = combined[:k]
+        # an id can live in both; keep its best score once
+        best: Dict[str, float] = dict(zip(hot_ids, hot_scores[live].tolist()))
+        for vid, score in zip(ids, scores):
+            if score > best.get(vid, -np.inf):
+                best[vid] = score
+        combined = sorted(best.items(), key=lambda x: x[1], reverse=True)[:k]
+        self.hot.record_hits([hot_slot[vid] for vid, _ in combined if vid in hot_slot], view)
         if not combined:
             return [], []
         ids, scores = zip(*combined)
         return list(ids), list(scores)
 
+    def reclaim(self) -> None:
+        """Drop tombstoned rows from the backing tiers."""
+        self.local_vdb.reclaim()
+
+    def refresh(self) -> None:
+        """Follow the writing process's changes to the backing tiers (read-only)."""
+        change = self.local_vdb.refresh()
+        if change is None:
+            self._notify(None)
+            return
+        ids, vecs, gone = change
+        if ids:
+            self._notify(ids, vecs)
+        if gone:
+            self._notify(gone)
+
     def compact(self) -> None:
-        """Placeholder for disk compaction; no‑op in this in‑memory prototype."""
-        return
+        """Merge the on-disk segments of the backing tiers (no-op in memory)."""
+        if not self.read_only:
+            self.local_vdb.compact()
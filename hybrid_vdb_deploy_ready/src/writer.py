@@ -0,0 +1,62 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import threading
+
+
+class SingleWriter:
+    """Runs every mutation of shared router state on one dedicated thread.
+
+    Readers (searches) work on immutable snapshots and never wait for it;
+    writes from request threads, the prefetcher and maintenance jobs are
+    queued here and applied strictly one at a time, so the data structures
+    themselves need no locks. ``call`` waits for the result, ``submit``
+    returns a ``Future``. Calls made from the writer thread itself (a write
+    that triggers another) run inline instead of deadlocking on the queue.
+    """
+
+    def __init__(self, name: str = "writer"):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.counters = {"writes": 0, "errors": 0}
+        self._thread_id = None
+        self._lock = threading.Lock()
+
+    def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._thread_id = threading.get_ident()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.counters["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.counters["writes"] += 1
+
+    def on_writer_thread(self) -> bool:
+        return threading.get_ident() == self._thread_id
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "Future[Any]":
+        if self.on_writer_thread():
+            fut: "Future[Any]" = Future()
+            try:
+                fut.set_result(self._run(fn, *args, **kwargs))
+            except Exception as exc:
+                fut.set_exception(exc)
+            return fut
+        return self.executor.submit(self._run, fn, *args, **kwargs)
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` on the writer and return its result (or raise its error)."""
+        if self.on_writer_thread():
+            return self._run(fn, *args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def close(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            c = dict(self.counters)
+        c["queued"] = self.executor._work_queue.qsize()
+        return c
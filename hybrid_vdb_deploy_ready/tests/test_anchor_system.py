@@ -1,5 +1,7 @@
 import numpy as np
+import pytest
 from hybrid_vdb.src.anchor_system import AnchorSystem, AnchorType
+from hybrid_vdb.src.config import ANCHOR_HISTORY
 
 
 def test_anchor_creation_and_promotion():
@@ -32,3 +34,95 @@ def test_prediction_hit_and_decay():
     sys.decay()
     assert anchor.id in sys.anchors
     assert sys.anchors[anchor.id].strength <= pre_strength
+
+
+def test_process_queries_matches_sequential():
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(4, 384)).astype("float32")
+    vecs = np.repeat(topics, 3, axis=0) + rng.normal(0, 0.05, size=(12, 384)).astype("float32")
+    texts = [f"q{i}" for i in range(len(vecs))]
+
+    seq = AnchorSystem()
+    seq_ids = [seq.process_query(v, t).id for v, t in zip(vecs, texts)]
+    batch = AnchorSystem()
+    batch_ids = [a.id for a in batch.process_queries(vecs, texts)]
+
+    assert batch_ids == seq_ids
+    for aid, a in seq.anchors.items():
+        b = batch.anchors[aid]
+        assert b.strength == pytest.approx(a.strength, rel=1e-5)  # decays with wall time
+        assert b.hit_count == a.hit_count
+        assert b.query_history == a.query_history
+        assert np.allclose(b.centroid, a.centroid, atol=1e-4)
+
+
+def test_decay_prunes_and_reuses_slots():
+    sys = AnchorSystem()
+    rng = np.random.default_rng(1)
+    a = sys.process_query(rng.normal(size=384).astype("float32"), "old")
+    sys.store.last_hit[a._slot] -= 10 * 3600  # ten hours without a hit
+    sys.decay()
+    assert a.id not in sys.anchors
+
+    b = sys.process_query(rng.normal(size=384).astype("float32"), "new")
+    assert b._slot == a._slot
+    assert b.id != a.id
+    assert b.query_history == ["new"]
+
+
+def test_prediction_hit_prefers_best_anchor_and_batches():
+    sys = AnchorSystem()
+    rng = np.random.default_rng(2)
+    base = rng.normal(size=384).astype("float32")
+    near = base + rng.normal(0, 0.2, size=384).astype("float32")
+    a = sys.process_query(rng.normal(size=384).astype("float32"), "a")
+    b = sys.process_query(rng.normal(size=384).astype("float32"), "b")
+    sys.generate_predictions(a, k=2)
+    sys.generate_predictions(b, k=2)
+    # overwrite the generated predictions so both anchors clear the threshold
+    sys.prediction_index.replace(a._slot, np.stack([near, -base]))
+    sys.prediction_index.replace(b._slot, np.stack([base, -near]))
+
+    assert sys.check_prediction_hit(base).id == b.id
+    hits = sys.check_prediction_hits(np.stack([near, -base, rng.normal(size=384)]))
+    assert [h.id if h else None for h in hits] == [a.id, a.id, None]
+    assert len(sys.prediction_index) == 4
+    assert not len(sys.prediction_view.anchor_ids)  # matched live, nothing published
+
+    # regenerating replaces rows instead of growing the index
+    preds = sys.generate_predictions(a, k=3)
+    assert 1 <= len(preds) <= 3
+    assert len(sys.prediction_index) == 2 + len(preds)
+
+
+def test_strength_decays_lazily_and_prunes_in_slices():
+    sys = AnchorSystem()
+    rng = np.random.default_rng(3)
+    anchors = [sys.process_query(rng.normal(size=384).astype("float32"), f"q{i}") for i in range(10)]
+    assert anchors[0].strength == pytest.approx(15.0)
+
+    sys.store.last_hit[[a._slot for a in anchors[:6]]] -= 2 * 3600  # two idle hours
+    assert anchors[0].strength == pytest.approx(15.0 * 0.5 ** 2)  # no sweep needed
+    assert anchors[7].strength == pytest.approx(15.0)
+
+    # a hit adds to the decayed value, not the stale one
+    sys.process_query(sys.store.unit[anchors[1]._slot].copy(), "again")
+    assert anchors[1].strength == pytest.approx(15.0 * 0.5 ** 2 + 5.0)
+
+    assert sys.prune_step(4) is False  # slots 0-3: 0, 2, 3 decayed below the floor
+    assert len(sys.anchors) == 7
+    assert sys.prune_step(4) is False and sys.prune_step(4) is True
+    assert sorted(sys.anchors) == [1] + list(range(6, 10)) and sys.pruned == 5
+
+
+
+def test_query_history_is_a_bounded_ring():
+    sys = AnchorSystem()
+    v = np.random.default_rng(4).normal(size=384).astype("float32")
+    for i in range(40):
+        a = sys.process_query(v, f"q{i % 5}")
+        if i == ANCHOR_HISTORY + 4:
+            full = sys.nbytes
+    assert a.hit_count == 39
+    assert a.query_history == [f"q{i % 5}" for i in range(40 - ANCHOR_HISTORY, 40)]
+    assert sys.nbytes == full  # more hits, no more memory
@@ -0,0 +1,86 @@
+import asyncio
+import time
+import pytest
+from hybrid_vdb.src.batcher import BatcherOverloaded, MicroBatcher
+
+
+def test_concurrent_requests_are_coalesced():
+    seen = []
+
+    def double(items):
+        seen.append(len(items))
+        return [x * 2 for x in items]
+
+    async def main():
+        batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == [i * 2 for i in range(20)]
+    assert seen == [8, 8, 4]
+    assert stats["batches"] == 3 and stats["avg_batch_size"] == pytest.approx(20 / 3)
+
+
+def test_backpressure_and_deadlines():
+    def slow(items):
+        time.sleep(0.05)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0, max_queue=2, workers=1)
+        first = asyncio.ensure_future(batcher.submit("a"))
+        await asyncio.sleep(0.01)  # "a" is running, the queue is empty again
+        late = asyncio.ensure_future(batcher.submit("b", timeout=0.01))
+        kept = asyncio.ensure_future(batcher.submit("c"))
+        await asyncio.sleep(0)
+        with pytest.raises(BatcherOverloaded):
+            await batcher.submit("d")
+        assert await first == "a"
+        with pytest.raises(asyncio.TimeoutError):
+            await late
+        assert await kept == "c"
+        await batcher.stop()
+        return batcher.stats()
+
+    stats = asyncio.run(main())
+    assert stats["rejected"] == 1 and stats["expired"] == 1 and stats["items"] == 2
+
+
+def test_errors_propagate_to_every_waiter():
+    def boom(items):
+        raise ValueError("bad batch")
+
+    async def main():
+        batcher = MicroBatcher(boom, max_wait_ms=10)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_workers_run_batches_concurrently():
+    running, peak = [0], [0]
+
+    def slow(items):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        running[0] -= 1
+        return items
+
+    async def main():
+        batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0, workers=4)
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+        elapsed = time.perf_counter() - t0
+        await batcher.stop()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(main())
+    assert results == list(range(8))
+    assert peak[0] > 1 and elapsed < 8 * 0.05
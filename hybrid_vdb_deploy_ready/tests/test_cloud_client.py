@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+import pytest
+from hybrid_vdb.src.cloud_client import AsyncCloudClient, CloudClient, CloudError
+from hybrid_vdb.src.fake_cloud import FakeCloudServer
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.routing import RoutingPolicy
+
+
+def test_batched_search_returns_payloads_and_vectors():
+    fake = FakeCloudServer(n=64, dim=8)
+    cloud = CloudClient(transport=fake.transport(), max_batch=4)
+    queries = fake.vectors[:10]
+    results = cloud.search_batch(queries, k=3)
+
+    assert len(results) == 10
+    assert fake.stats()["requests"] == 3  # 10 queries in chunks of 4
+    for i, res in enumerate(results):
+        assert res[0]["id"] == f"doc_{i}" and res[0]["text"] == f"Fake document {i}"
+        np.testing.assert_allclose(res[0]["vector"], fake.vectors[i])
+        assert res[0]["score"] == pytest.approx(1.0, abs=1e-5)
+        assert [r["score"] for r in res] == sorted((r["score"] for r in res), reverse=True)
+
+
+def test_retries_transient_failures_then_gives_up():
+    fake = FakeCloudServer(n=16, dim=8, error_rate=1.0)
+    cloud = CloudClient(transport=fake.transport(), retries=2, backoff=0.0)
+    with pytest.raises(CloudError):
+        cloud.search(fake.vectors[0], k=1)
+    assert fake.stats()["requests"] == 3
+    assert cloud.stats()["retries"] == 2 and cloud.stats()["errors"] == 1
+
+    fake.error_rate = 0.0
+    assert cloud.search(fake.vectors[0], k=1)[0]["id"] == "doc_0"
+
+
+def test_slow_server_times_out():
+    fake = FakeCloudServer(n=16, dim=8, latency_ms=200)
+    cloud = CloudClient(transport=fake.transport(), timeout=0.01, retries=1, backoff=0.0)
+    with pytest.raises(CloudError):
+        cloud.search(fake.vectors[0], k=1)
+    assert fake.stats()["timeouts"] == 2
+
+
+def test_async_client_matches_sync_client():
+    fake = FakeCloudServer(n=64, dim=8, latency_ms=1)
+    sync = CloudClient(transport=fake.transport(), max_batch=3)
+
+    async def run():
+        cloud = AsyncCloudClient(transport=fake.async_transport(), max_batch=3)
+        try:
+            return await cloud.search_batch(fake.vectors[:7], k=2)
+        finally:
+            await cloud.aclose()
+
+    got = asyncio.run(run())
+    want = sync.search_batch(fake.vectors[:7], k=2)
+    assert [[r["id"] for r in res] for res in got] == [[r["id"] for r in res] for res in want]
+
+
+class _HashEmbedder:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32):
+        return np.stack([
+            np.random.default_rng(abs(hash(t)) % (2**32)).standard_normal(self.dim) for t in texts
+        ]).astype("float32")
+
+
+def test_router_writes_remote_results_back_locally():
+    fake = FakeCloudServer(n=64)
+    cloud = CloudClient(transport=fake.transport())
+    router = HybridRouter(
+        embedder=_HashEmbedder(fake.vectors.shape[1]),
+        routing=RoutingPolicy(min_score=2.0),  # always consult the cloud
+        cloud=cloud,
+    )
+    res = router.search("what is a vector database", k=3)
+    assert res["source"] == "cloud"
+    assert all(vid in router.storage.hot for vid in res["ids"])
+
+
+def test_filter_reaches_the_cloud_and_its_hits_are_served_locally():
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(64, 384)).astype("float32")
+    payloads = [{"id": f"doc_{i}", "tenant": "a" if i % 4 else "b"} for i in range(64)]
+    fake = FakeCloudServer(vectors=vectors, payloads=payloads)
+    cloud = CloudClient(transport=fake.transport())
+    res = cloud.search_batch(vectors[:3], k=5, filter={"tenant": "b"})
+    assert all(r["tenant"] == "b" for hits in res for r in hits)
+    assert fake.stats()["filtered"] == 3
+
+    router = HybridRouter(
+        embedder=_HashEmbedder(384), routing=RoutingPolicy(min_score=-1.0), cloud=cloud
+    )
+    first = router.search("tenant b documents", k=3, filter={"tenant": "b"})
+    assert first["source"] == "cloud"
+    again = router.search("tenant b documents", k=3, filter={"tenant": "b"})
+    assert again["source"] == "local" and again["ids"] == first["ids"]
+    assert router.storage.local_vdb.dynamic.payload(first["ids"][0])["tenant"] == "b"
+    assert router.search("tenant b documents", k=3, filter={"tenant": "a"})["source"] == "cloud"
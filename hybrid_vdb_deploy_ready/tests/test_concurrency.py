@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+import pytest
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.local_vdb import SimpleIndex
+from hybrid_vdb.src.routing import RoutingPolicy
+
+
+def _vec(i: int, version: int = 0) -> np.ndarray:
+    v = np.random.default_rng(i * 1000 + version).normal(size=384).astype("float32")
+    return v / np.linalg.norm(v)
+
+
+def _run(readers, writer, n_readers=4):
+    """Run ``writer`` once alongside ``n_readers`` copies of ``readers(stop)``."""
+    stop = threading.Event()
+    errors = []
+
+    def guard(fn, *args):
+        try:
+            fn(*args)
+        except BaseException as exc:  # surface failures from any thread
+            errors.append(exc)
+            stop.set()
+
+    threads = [threading.Thread(target=guard, args=(readers, stop)) for _ in range(n_readers)]
+    for t in threads:
+        t.start()
+    guard(writer)
+    stop.set()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+
+@pytest.mark.parametrize("backend", ["flat", "ivf"])
+def test_index_readers_never_see_torn_writes(backend):
+    # each id i always holds _vec(i, version); a reader must never pair an
+    # id with a score that belongs to no version of it
+    idx = SimpleIndex(backend=backend)
+    idx.add(np.stack([_vec(i) for i in range(200)]), [f"v{i}" for i in range(200)])
+    versions = {i: {0} for i in range(400)}
+    queries = np.stack([_vec(i) for i in range(0, 400, 7)])
+
+    def read(stop):
+        while not stop.is_set():
+            ids, scores = idx.search_batch(queries, k=5)
+            for q, row_ids, row_scores in zip(queries, ids, scores):
+                assert row_scores == sorted(row_scores, reverse=True)
+                for vid, score in zip(row_ids, row_scores):
+                    i = int(vid[1:])
+                    expected = [float(q @ _vec(i, v)) for v in list(versions[i])]
+                    assert min(abs(score - e) for e in expected) < 1e-3
+
+    def write():
+        rng = np.random.default_rng(0)
+        for step in range(150):
+            ids = rng.choice(400, size=8, replace=False)
+            version = step + 1
+            for i in ids:
+                versions[int(i)].add(version)
+            idx.upsert(np.stack([_vec(int(i), version) for i in ids]), [f"v{i}" for i in ids])
+            idx.remove([f"v{int(i)}" for i in rng.choice(400, size=3)])
+            if step % 25 == 0:
+                idx.reclaim()
+
+    _run(read, write)
+    assert len(idx) > 0
+
+
+class _HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t))).normal(size=384) for t in texts]
+        ).astype("float32")
+
+
+def test_router_concurrent_search_insert_and_decay():
+    router = HybridRouter(
+        embedder=_HashEmbedder(), routing=RoutingPolicy(min_score=0.2), attach_metrics=False
+    )
+    texts = [f"question {i}" for i in range(40)]
+    searched = [0]
+    lock = threading.Lock()
+
+    def read(stop):
+        rng = np.random.default_rng(threading.get_ident() % 2**32)
+        while not stop.is_set():
+            batch = [texts[j] for j in rng.integers(len(texts), size=4)]
+            for res in router.search_batch(batch, k=3):
+                assert len(res["ids"]) <= 3
+                assert res["scores"] == sorted(res["scores"], reverse=True)
+                assert res["anchor_type"] in ("WEAK", "MEDIUM", "STRONG", "PERMANENT")
+            with lock:
+                searched[0] += len(batch)
+
+    def write():
+        rng = np.random.default_rng(1)
+        for step in range(60):
+            vecs = rng.normal(size=(5, 384)).astype("float32")
+            router.write(router.storage.add_dynamic, vecs, [f"w{step}_{j}" for j in range(5)])
+            if step % 10 == 0:
+                router.decay()
+                router.write(router.storage.reclaim)
+
+    _run(read, write)
+    router.close()
+    assert searched[0] > 0
+    assert router.writer.stats()["errors"] == 0
+    assert router.metrics_snapshot()["total_queries"] == searched[0]
@@ -0,0 +1,71 @@
+import sys
+import time
+import types
+
+import numpy as np
+import pytest
+from hybrid_vdb.src.embedders import (
+    HashingEmbedder,
+    PrecomputedEmbedder,
+    SentenceTransformerEmbedder,
+    make_embedder,
+)
+from hybrid_vdb.src.hybrid_router import HybridRouter
+
+
+def test_hashing_embedder_is_deterministic_and_bag_of_words():
+    texts = ["insulin dose for diabetes", "Diabetes  insulin DOSE", "heart rate", ""]
+    vecs = HashingEmbedder().encode(texts)
+    assert vecs.shape == (4, 384) and vecs.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(vecs, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(vecs, HashingEmbedder().encode(texts))
+    assert vecs[0] @ vecs[1] > 0.8 > abs(vecs[0] @ vecs[2])
+    assert not np.allclose(HashingEmbedder(seed=1).encode(["heart rate"]), vecs[2])
+
+
+def test_precomputed_embedder_looks_up_and_falls_back(tmp_path):
+    vectors = np.eye(3, 384, dtype="float32")
+    table = PrecomputedEmbedder(["What is diabetes?", "insulin", "heart rate"], vectors)
+    np.testing.assert_array_equal(table.encode(["what is  DIABETES?", "heart rate"]), vectors[[0, 2]])
+    with pytest.raises(KeyError):
+        table.encode(["unknown"])
+
+    table.save(tmp_path / "emb.npz")
+    fallback = HashingEmbedder()
+    loaded = PrecomputedEmbedder.load(tmp_path / "emb.npz", fallback=fallback)
+    out = loaded.encode(["insulin", "unknown"])
+    np.testing.assert_array_equal(out[0], vectors[1])
+    np.testing.assert_array_equal(out[1], fallback.encode(["unknown"])[0])
+    assert loaded.stats()["misses"] == 1 and loaded.ready
+
+
+class _SlowModel:
+    def __init__(self, name, device=None):
+        time.sleep(0.05)
+
+    def encode(self, texts, batch_size=32):
+        return np.ones((len(texts), 384), dtype="float32")
+
+
+def test_sentence_transformer_embedder_loads_lazily_in_the_background(monkeypatch):
+    fake = types.SimpleNamespace(SentenceTransformer=_SlowModel)
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+    emb = SentenceTransformerEmbedder()
+    assert not emb.ready  # nothing loaded by construction
+    emb.warm_up()
+    assert emb.wait_ready(5.0) and emb.stats()["load_ms"] > 0
+    assert emb.encode(["a", "b"]).shape == (2, 384)
+
+    cold = SentenceTransformerEmbedder()
+    assert cold.encode(["a"]).shape == (1, 384) and cold.ready  # loads on first use
+
+
+def test_router_builds_the_configured_embedder_without_loading_it():
+    assert isinstance(make_embedder("hashing"), HashingEmbedder)
+    with pytest.raises(ValueError):
+        make_embedder("nope")
+
+    router = HybridRouter(embedder=SentenceTransformerEmbedder("missing-model"), attach_metrics=False)
+    assert not router.ready
+    assert router.metrics_snapshot()["embedder"]["ready"] == 0
+    router.close()
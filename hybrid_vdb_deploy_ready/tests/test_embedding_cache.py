@@ -0,0 +1,46 @@
+import numpy as np
+from hybrid_vdb.src.embedding_cache import EmbeddingCache, normalize_query
+from hybrid_vdb.src.hybrid_router import HybridRouter
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        rng = np.random.default_rng(abs(hash(tuple(texts))) % 2**32)
+        return rng.normal(size=(len(texts), 384)).astype("float32")
+
+
+def test_cache_evicts_by_bytes_and_expires():
+    now = [0.0]
+    vec = np.ones(384, dtype="float32")
+    per_entry = vec.nbytes + 1
+    cache = EmbeddingCache(max_bytes=2 * per_entry, ttl_sec=10, clock=lambda: now[0])
+    cache.put("a", vec)
+    cache.put("b", vec)
+    assert cache.get("a") is not None  # "b" is now least recent
+    cache.put("c", vec)
+    assert cache.get("b") is None and len(cache) == 2 and cache.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_router_batches_misses_and_reports_hit_rate():
+    embedder = _CountingEmbedder()
+    router = HybridRouter(embedder=embedder)
+    first = router.embed_batch(["What is  diabetes?", "insulin", "what is diabetes?"])
+    assert embedder.calls == [[normalize_query("What is diabetes?"), "insulin"]]
+    assert np.array_equal(first[0], first[2])
+
+    again = router._embed("WHAT IS DIABETES?")
+    assert len(embedder.calls) == 1
+    assert np.array_equal(again, first[0])
+
+    snap = router.metrics.snapshot()
+    assert snap["encode_calls"] == 1 and snap["encoded_texts"] == 2
+    assert snap["embed_cache_hits"] == 1 and snap["embed_cache_misses"] == 3
+    assert 0.0 < snap["embed_cache_hit_rate"] < 1.0
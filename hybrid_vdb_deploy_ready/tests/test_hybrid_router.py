@@ -0,0 +1,131 @@
+import time
+import numpy as np
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.routing import RoutingPolicy
+
+
+class _HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t))).normal(size=384) for t in texts]
+        ).astype("float32")
+
+
+class _CountingCloud:
+    def __init__(self, cloud, delay=0.0):
+        self.cloud = cloud
+        self.delay = delay
+        self.batches = []
+
+    def search_batch(self, query_vectors, k=5):
+        self.batches.append(len(query_vectors))
+        time.sleep(self.delay)
+        return self.cloud.search_batch(query_vectors, k)
+
+
+class _SlowStorage:
+    def __init__(self, storage, delay):
+        self.storage = storage
+        self.delay = delay
+
+    def search_batch(self, queries, k=5, filter=None):
+        time.sleep(self.delay)
+        return self.storage.search_batch(queries, k, filter)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def test_search_batch_makes_one_cloud_call_then_serves_locally():
+    router = HybridRouter(embedder=_HashEmbedder(), routing=RoutingPolicy(min_score=-1.0))
+    router.cloud = _CountingCloud(router.cloud)
+    queries = ["diabetes", "insulin", "heart rate", "diabetes"]
+
+    first = router.search_batch(queries, k=3)
+    assert router.cloud.batches == [4]
+    assert [r["source"] for r in first] == ["cloud"] * 4
+    assert first[0]["ids"] == first[3]["ids"] and len(first[1]["ids"]) == 3
+
+    router.result_cache.clear()
+    second = router.search_batch(queries, k=3)
+    assert router.cloud.batches == [4]
+    assert all(r["source"] == "local" for r in second)
+    single = router.search("insulin", k=3)
+    assert single["ids"] == second[1]["ids"]
+    assert single["metrics"]["total_queries"] == 9
+
+
+def test_repeated_queries_are_served_from_the_result_cache():
+    router = HybridRouter(embedder=_HashEmbedder(), routing=RoutingPolicy(min_score=-1.0))
+    first = router.search("diabetes", k=3)
+    again = router.search("diabetes", k=2)
+    assert again["source"] == "cache" and again["ids"] == first["ids"][:2]
+    assert again["metrics"]["cache_hits"] == 1
+    assert router.search("diabetes", k=5)["source"] != "cache"  # cached k was smaller
+
+    # a new vector that would rank into the cached result invalidates it
+    q = router.embed_batch(["diabetes"])
+    router.storage.add_permanent(q, ["exact"])
+    fresh = router.search("diabetes", k=3)
+    assert fresh["source"] == "local" and fresh["ids"][0] == "exact"
+
+
+def test_weak_or_sparse_local_results_go_to_the_cloud():
+    router = HybridRouter(embedder=_HashEmbedder(), routing=RoutingPolicy(min_score=0.9))
+    q = router.embed_batch(["diabetes"])
+    router.storage.add_permanent(q, ["exact"])
+    router.cloud = _CountingCloud(router.cloud)
+
+    sparse = router.search("diabetes", k=3)  # one strong local hit is too few
+    assert sparse["route"] == "cloud" and router.cloud.batches == [1]
+
+    router.routing.min_fill = 0.0
+    router.result_cache.clear()
+    strong = router.search("diabetes", k=3)
+    assert strong["route"] == "local" and strong["ids"][0] == "exact"
+    assert strong["metrics"]["route_local"] == 1 and strong["metrics"]["route_cloud"] == 1
+
+
+def test_hedged_cloud_request_overlaps_a_slow_local_search():
+    policy = RoutingPolicy(min_score=0.99, hedge=True, hedge_delay_ms=5, deadline_ms=2000)
+    router = HybridRouter(embedder=_HashEmbedder(), routing=policy)
+    router.storage = _SlowStorage(router.storage, delay=0.1)
+    result = router.search("diabetes", k=3)
+    assert result["route"] == "hedge" and result["source"] == "cloud"
+    assert result["metrics"]["hedges_fired"] == 1
+    assert result["metrics"]["hedge_saved_ms"] > 50
+
+    # a hedged answer that misses the deadline keeps the local result
+    router.routing.deadline = 0.15
+    router.cloud = _CountingCloud(router.cloud, delay=0.5)
+    late = router.search("insulin", k=3)
+    assert late["route"] == "deadline" and late["source"] == "local"
+
+
+def test_maintenance_jobs_run_through_the_writer():
+    router = HybridRouter(embedder=_HashEmbedder())
+    anchor = router.search("diabetes", k=3)["anchor_id"]
+    router.anchor_system.store.last_hit[:] -= 10 * 3600
+    for name in router.maintenance.jobs:
+        router.maintenance.run_now(name)
+    stats = router.maintenance.stats()
+    assert all(s["runs"] == 1 and s["errors"] == 0 for s in stats.values())
+    assert anchor not in router.anchor_system.anchors
+    assert router.writer.stats()["writes"] >= 1 + len(stats)
+    assert "hybrid_vdb_maintenance_prune_anchors_mean_ms" in router.metrics_prometheus()
+    router.close()
+
+
+def test_memory_usage_reports_bytes_per_subsystem():
+    router = HybridRouter(
+        embedder=_HashEmbedder(), routing=RoutingPolicy(min_score=-1.0), attach_metrics=False
+    )
+    empty = router.memory_usage()
+    router.search_batch(["diabetes", "insulin", "heart rate"], k=3)
+    usage = router.memory_usage()
+    assert usage["total"] == sum(v for name, v in usage.items() if name != "total")
+    for name in ("anchors", "semantic_cache", "embedding_cache", "result_cache"):
+        assert usage[name] > empty[name]
+    assert "hybrid_vdb_memory_bytes_total" in router.metrics_prometheus()
+    assert "memory_bytes" not in router.metrics_snapshot()  # per-response: kept cheap
+    router.close()
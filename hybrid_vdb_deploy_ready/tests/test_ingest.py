@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+from hybrid_vdb.src.embedders import HashingEmbedder
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.ingest import IngestJobs, Ingestor, iter_records, read_file
+from hybrid_vdb.src.local_vdb import LocalVDB
+from hybrid_vdb.src.routing import RoutingPolicy
+
+
+def _records(n):
+    topics = ["insulin dosage", "vector search", "tax return", "tomato garden"]
+    return [
+        {"id": f"r{i}", "text": f"{topics[i % 4]} note {i}", "tenant": f"t{i % 2}"}
+        for i in range(n)
+    ]
+
+
+def test_ndjson_streams_into_persisted_segments(tmp_path):
+    path = tmp_path / "corpus.ndjson"
+    with open(path, "w") as f:
+        for rec in _records(250):
+            f.write(json.dumps(rec) + "\n\n")
+    local = LocalVDB(tmp_path / "tiers")
+    local.permanent._disk.flush_rows = 100
+    embedder = HashingEmbedder()
+    stats = Ingestor(local.add_permanent, embedder, workers=2).run(read_file(path, chunk_rows=64))
+
+    assert stats["state"] == "done" and stats["rows"] == 250 and stats["chunks"] == 4
+    assert stats["read"] == 1.0 and stats["vectors_per_sec"] > 0
+    assert list(local.permanent.ids) == [f"r{i}" for i in range(250)]  # order kept
+    assert len(local.permanent._disk._manifest["segments"]) == 2  # sealed while streaming
+    local.close()
+
+    reopened = LocalVDB(tmp_path / "tiers")
+    q = embedder.encode(["tax return note 6"])[0]
+    assert reopened.search(q, k=1)[0] == ["r6"]
+    assert reopened.search(q, k=1, filter={"tenant": "t1"})[0][0] != "r6"
+
+
+def test_vector_files_are_read_in_row_blocks(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(130, 8)).astype("float32")
+    np.save(tmp_path / "plain.npy", vecs)
+    named = [f"x{i}" for i in range(130)]
+    np.savez_compressed(tmp_path / "named.npz", vectors=vecs, ids=np.array(named))
+
+    for name, ids in (("plain.npy", [f"plain-{i}" for i in range(130)]), ("named.npz", named)):
+        chunks = list(read_file(tmp_path / name, chunk_rows=50))
+        assert [len(c.ids) for c in chunks] == [50, 50, 30]
+        assert [i for c in chunks for i in c.ids] == ids
+        np.testing.assert_array_equal(np.concatenate([c.vectors for c in chunks]), vecs)
+        assert chunks[-1].read == 1.0
+
+
+def test_router_ingest_serves_locally_and_reports_failures():
+    router = HybridRouter(
+        embedder=HashingEmbedder(), routing=RoutingPolicy(min_score=0.9, min_fill=0.0)
+    )
+    ingestor = Ingestor.for_router(router)
+    ingestor.start(iter_records(_records(40), chunk_rows=16))
+    ingestor.join(10.0)
+    assert ingestor.stats()["rows"] == 40
+    res = router.search("vector search note 5", k=1)
+    assert res["source"] == "local" and res["ids"] == ["r5"]
+
+    broken = Ingestor.for_router(router)
+    broken.start(iter_records([{"id": "a", "text": "fine"}, {"id": "b"}], chunk_rows=1))
+    broken.join(10.0)
+    assert broken.state == "failed" and "'text'" in broken.error
+    router.close()
+
+
+def test_finished_jobs_expire_and_keep_their_rows_in_the_totals():
+    now = [0.0]
+    jobs = IngestJobs(ttl_sec=10.0, max_jobs=2, clock=lambda: now[0])
+    ids = []
+    for n in (3, 4, 5):
+        job = Ingestor(lambda vecs, ids, payloads: None, HashingEmbedder(), workers=1)
+        job.run(iter_records(_records(n)))
+        job._t1 = now[0] = now[0] + 1.0  # finished one second apart
+        ids.append(jobs.add(job))
+    running = Ingestor(lambda vecs, ids, payloads: None)
+    ids.append(jobs.add(running))
+    assert jobs.get(ids[0]) is None  # beyond max_jobs finished ones: oldest dropped
+    assert jobs.stats() == {"jobs": 3, "jobs_running": 0, "rows": 12}
+
+    now[0] += 60.0
+    assert jobs.get(ids[2]) is None
+    assert jobs.get(ids[3]) is running  # not finished: never dropped
+    assert jobs.stats() == {"jobs": 1, "jobs_running": 0, "rows": 12}
@@ -0,0 +1,279 @@
+import numpy as np
+import pytest
+from hybrid_vdb.src.local_vdb import SimpleIndex, VectorBuffer, _topk
+from hybrid_vdb.src.payloads import matches, normalize_filter
+from hybrid_vdb.src.quantization import QuantizedBuffer
+
+
+def test_topk_matches_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.normal(size=1000).astype("float32")
+    assert _topk(scores, 7).tolist() == np.argsort(-scores)[:7].tolist()
+    assert _topk(scores[:3], 10).tolist() == np.argsort(-scores[:3]).tolist()
+
+
+def test_buffer_grows_and_stores_unit_rows():
+    buf = VectorBuffer(8, capacity=2)
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        buf.add(rng.normal(size=(3, 8)) * 10)
+    assert len(buf) == 15
+    assert np.allclose(np.linalg.norm(buf.view, axis=1), 1.0, atol=1e-5)
+
+
+def test_simple_index_search_float16():
+    rng = np.random.default_rng(2)
+    vecs = rng.normal(size=(500, 384)).astype("float32")
+    ids = [f"v{i}" for i in range(500)]
+    exact = SimpleIndex()
+    half = SimpleIndex(dtype="float16")
+    exact.add(vecs, ids)
+    half.add(vecs, ids)
+
+    found, scores = exact.search(vecs[42] * 3.0, k=3)
+    assert found[0] == "v42"
+    assert abs(scores[0] - 1.0) < 1e-4
+    assert half.search(vecs[42], k=3)[0][0] == "v42"
+    assert half.vectors.dtype == np.float16
+
+
+def test_ivf_backend_trains_and_accepts_incremental_inserts():
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(20, 384)).astype("float32")
+    vecs = centers[rng.integers(0, 20, size=700)] + rng.normal(0, 0.5, size=(700, 384))
+    ids = [f"v{i}" for i in range(700)]
+
+    idx = SimpleIndex(backend="ivf")
+    idx.ann.nlist = 16
+    idx.add(vecs[:300], ids[:300])
+    assert not idx.ann.is_trained  # exact scan until enough data to train
+    assert idx.search(vecs[10], k=1)[0] == ["v10"]
+
+    idx.add(vecs[300:600], ids[300:600])
+    idx.add(vecs[600:], ids[600:])
+    assert idx.ann.is_trained
+    assert idx.ann.list_sizes().sum() == 700
+
+    idx.ann.nprobe = idx.ann.nlist  # probing every list is exact
+    flat = SimpleIndex(backend="flat")
+    flat.add(vecs, ids)
+    for q in (vecs[5], vecs[650]):
+        assert idx.search(q, k=5)[0] == flat.search(q, k=5)[0]
+
+
+def test_quantized_buffer_reranks_to_exact_scores():
+    rng = np.random.default_rng(4)
+    vecs = rng.normal(size=(600, 384)).astype("float32")
+    exact = VectorBuffer(384)
+    exact.add(vecs)
+    q = exact.view[17] + 0.1 * exact.view[18]
+    q /= np.linalg.norm(q)
+    want_idx, want_scores = exact.search(q, 5)
+
+    for kind in ("int8", "pq"):
+        buf = QuantizedBuffer(384, kind=kind, train_size=512)
+        buf.add(vecs[:300])
+        assert not buf.trained
+        buf.add(vecs[300:])
+        assert buf.trained and len(buf) == 600
+        assert buf.nbytes < exact.nbytes / 3
+
+        idx, scores = buf.search(q, 5)
+        assert idx.tolist() == want_idx.tolist()
+        assert np.allclose(scores, want_scores, atol=1e-5)
+
+
+def test_persistent_index_reopens_from_mapped_segments(tmp_path):
+    rng = np.random.default_rng(5)
+    vecs = rng.normal(size=(250, 384)).astype("float32")
+    idx = SimpleIndex(backend="flat", path=tmp_path)
+    idx._disk.flush_rows = 100
+    for start in range(0, 250, 50):
+        idx.add(vecs[start : start + 50], [f"v{i}" for i in range(start, start + 50)])
+    assert len(idx._disk._manifest["segments"]) == 2  # 200 sealed rows, 50 in the log
+    idx.close()
+
+    reopened = SimpleIndex(backend="flat", path=tmp_path)
+    assert len(reopened) == 250
+    assert isinstance(reopened.vectors, np.ndarray)
+    for i in (3, 120, 240):
+        assert reopened.search(vecs[i], k=1)[0] == [f"v{i}"]
+
+    # re-adding an id supersedes the old row; compaction keeps only the newest
+    reopened.add(vecs[:1] * -1.0, ["v7"])
+    reopened._disk.delete(["v8"])
+    reopened.compact()
+    assert len(reopened) == 249
+    assert reopened._disk._manifest["segments"] and len(reopened._disk._manifest["segments"]) == 1
+    assert reopened.search(-vecs[0], k=1)[0] == ["v7"]
+    assert "v8" not in set(reopened.ids)
+
+    # nothing deleted, one segment, empty log: compacting again rewrites nothing
+    manifest = dict(reopened._disk._manifest)
+    reopened.compact()
+    assert reopened._disk._manifest == manifest
+
+
+def test_remove_upsert_and_reclaim():
+    rng = np.random.default_rng(6)
+    vecs = rng.normal(size=(100, 384)).astype("float32")
+    idx = SimpleIndex(backend="flat")
+    idx.add(vecs, [f"v{i}" for i in range(100)])
+
+    assert idx.remove(["v3", "missing"]) == 1
+    assert len(idx) == 99
+    assert "v3" not in idx.search(vecs[3], k=5)[0]
+
+    idx.upsert(-vecs[4:5], ["v4"])
+    assert len(idx) == 99
+    assert idx.search(-vecs[4], k=1)[0] == ["v4"]
+    assert "v4" not in idx.search(vecs[4], k=3)[0]
+
+    idx.remove([f"v{i}" for i in range(10, 40)])  # crosses RECLAIM_DEAD_RATIO
+    assert idx._n_dead == 0 and len(idx.ids) == len(idx) == 69
+    assert idx.search(vecs[50], k=1)[0] == ["v50"]
+
+
+def test_capacity_evicts_by_recency_or_score():
+    rng = np.random.default_rng(7)
+    vecs = rng.normal(size=(6, 384)).astype("float32")
+    by_recency = SimpleIndex(backend="flat", capacity=4)
+    by_recency.add(vecs[:4], ["a", "b", "c", "d"])
+    by_recency.search(vecs[0], k=1)  # "a" becomes the most recent
+    by_recency.add(vecs[4:6], ["e", "f"])
+    assert len(by_recency) == 4 and by_recency.evictions == 2
+    assert set(by_recency.search(vecs[0], k=4)[0]) == {"a", "d", "e", "f"}
+
+    by_score = SimpleIndex(backend="flat", capacity=2, eviction="score")
+    by_score.add(vecs[:2], ["a", "b"])
+    by_score.search(vecs[0], k=1)
+    by_score.search(vecs[0], k=1)
+    by_score.add(vecs[2:3], ["c"])
+    assert set(by_score.search(vecs[0], k=2)[0]) == {"a", "c"}
+
+    # past capacity, evict down to the low-water mark in one go
+    batched = SimpleIndex(backend="flat", capacity=4, low_water=0.5)
+    batched.add(vecs[:4], ["a", "b", "c", "d"])
+    batched.add(vecs[4:5], ["e"])
+    assert len(batched) == 2 and batched.evictions == 3
+    batched.add(vecs[5:6], ["f"])
+    assert len(batched) == 3 and batched.evictions == 3
+
+
+def test_tombstones_survive_reopen(tmp_path):
+    rng = np.random.default_rng(8)
+    vecs = rng.normal(size=(50, 384)).astype("float32")
+    idx = SimpleIndex(backend="flat", path=tmp_path)
+    idx.add(vecs, [f"v{i}" for i in range(50)])
+    idx.remove(["v1"])
+    idx.upsert(-vecs[2:3], ["v2"])
+    idx.close()
+
+    reopened = SimpleIndex(backend="flat", path=tmp_path)
+    assert len(reopened) == 49
+    assert "v1" not in reopened.search(vecs[1], k=5)[0]
+    assert reopened.search(-vecs[2], k=1)[0] == ["v2"]
+    assert "v2" not in reopened.search(vecs[2], k=3)[0]
+
+    # deletes logged before the reopen must not come back with compaction
+    reopened.compact()
+    reopened.close()
+    again = SimpleIndex(backend="flat", path=tmp_path)
+    assert len(again) == 49 and "v1" not in set(again.ids)
+    assert "v1" not in again.search(vecs[1], k=5)[0]
+    assert again.search(-vecs[2], k=1)[0] == ["v2"]
+
+
+def test_search_batch_matches_single_queries(tmp_path):
+    rng = np.random.default_rng(9)
+    vecs = rng.normal(size=(600, 384)).astype("float32")
+    ids = [f"v{i}" for i in range(600)]
+    queries = vecs[:20] + 0.1 * rng.normal(size=(20, 384)).astype("float32")
+    indexes = [
+        SimpleIndex(backend="flat"),
+        SimpleIndex(dtype="float16"),
+        SimpleIndex(backend="flat", quantization="int8"),
+        SimpleIndex(backend="flat", path=tmp_path),
+    ]
+    indexes[2]._buf.train_size = 300
+    indexes[3]._disk.flush_rows = 250
+    for idx in indexes:
+        idx.add(vecs[:300], ids[:300])
+        idx.add(vecs[300:], ids[300:])
+        idx.remove(["v1", "v2"])
+        batch_ids, batch_scores = idx.search_batch(queries, k=5)
+        for q, got_ids, got_scores in zip(queries, batch_ids, batch_scores):
+            want_ids, want_scores = idx.search(q, k=5)
+            assert got_ids == want_ids
+            assert np.allclose(got_scores, want_scores, atol=1e-3)
+        assert "v1" not in batch_ids[1] and "v2" not in batch_ids[2]
+
+
+def test_read_only_index_follows_the_writer(tmp_path):
+    rng = np.random.default_rng(9)
+    vecs = rng.normal(size=(40, 384)).astype("float32")
+    writer = SimpleIndex(backend="flat", path=tmp_path)
+    writer.add(vecs[:20], [f"v{i}" for i in range(20)])
+    reader = SimpleIndex(backend="flat", path=tmp_path, read_only=True)
+    assert len(reader) == 20
+    with pytest.raises(RuntimeError):
+        reader.add(vecs[20:21], ["x"])
+
+    writer.add(vecs[20:], [f"v{i}" for i in range(20, 40)])
+    writer.remove(["v3"])
+    ids, _, gone = reader.refresh()
+    assert sorted(ids) == sorted(f"v{i}" for i in range(20, 40))
+    assert gone == ["v3"]
+    assert reader.search(vecs[30], k=1)[0] == ["v30"]
+    assert "v3" not in reader.search(vecs[3], k=5)[0]
+
+    writer.reclaim()  # rewrites the segments: the reader reopens
+    writer.upsert(-vecs[5:6], ["v5"])
+    assert reader.refresh() is None
+    assert len(reader) == 39
+    assert reader.search(-vecs[5], k=1)[0] == ["v5"]
+
+
+def test_filtered_search_by_selectivity_and_persisted_payloads(tmp_path):
+    rng = np.random.default_rng(11)
+    vecs = rng.normal(size=(400, 32)).astype("float32")
+    ids = [f"v{i}" for i in range(400)]
+    payloads = [
+        {
+            "tenant": "rare" if i % 100 == 0 else "common",
+            "lang": ["en", "de"] if i % 2 else "fr",
+            "stars": i % 5,
+        }
+        for i in range(400)
+    ]
+    idx = SimpleIndex(dim=32, backend="flat", path=tmp_path)
+    idx.add(vecs, ids, payloads)
+    follower = SimpleIndex(dim=32, backend="flat", path=tmp_path, read_only=True)
+
+    unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    scores = unit @ unit[5]
+    filters = [
+        {"tenant": "rare"},  # 1% of rows: scores only those
+        {"lang": "de"},  # half: masked full scan
+        {"must_not": [{"key": "tenant", "match": {"value": "rare"}}],
+         "should": [{"key": "stars", "match": {"any": [1, 2]}}]},
+    ]
+    for flt in filters:
+        allowed = [i for i in range(400) if matches(payloads[i], normalize_filter(flt))]
+        expected = [f"v{i}" for i in sorted(allowed, key=lambda i: -scores[i])[:5]]
+        assert idx.search(vecs[5], k=5, filter=flt)[0] == expected
+        assert follower.search(vecs[5], k=5, filter=flt)[0] == expected
+    assert idx.filter_counts == {"prefilter": 1, "postfilter": 2}
+
+    idx.upsert(vecs[:1], ["v0"])  # re-added without a payload
+    idx.add(vecs[1:2], ["new"], [{"tenant": "rare"}])
+    follower.refresh()
+    rare = {"v100", "v200", "v300", "new"}
+    assert set(follower.search(vecs[0], k=10, filter={"tenant": "rare"})[0]) == rare
+    idx.compact()
+    idx.close()
+
+    reopened = SimpleIndex(dim=32, backend="flat", path=tmp_path)
+    assert len(reopened.payloads) == len(reopened.ids) and reopened.payloads._load is not None
+    assert set(reopened.search(vecs[0], k=10, filter={"tenant": "rare"})[0]) == rare
+    assert reopened.payload("v0") is None and reopened.payload("v3") == payloads[3]
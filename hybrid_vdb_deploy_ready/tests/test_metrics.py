@@ -0,0 +1,74 @@
+import threading
+
+import numpy as np
+import pytest
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.metrics import LatencyHistogram, Metrics
+
+
+def test_histogram_quantiles_within_one_bucket():
+    hist = LatencyHistogram()
+    samples = np.random.default_rng(0).lognormal(mean=1.0, sigma=1.0, size=20_000)
+    for ms in samples:
+        hist.record(float(ms))
+    ratio = 2 ** (1 / hist.per_doubling)
+    for q in (0.5, 0.95, 0.99):
+        exact = float(np.quantile(samples, q))
+        assert exact <= hist.quantile(q) <= exact * ratio * 1.01
+    assert hist.count == len(samples)
+    assert hist.summary()["mean_ms"] == pytest.approx(samples.mean())
+
+
+def test_histogram_concurrent_updates_and_range():
+    hist = LatencyHistogram()
+
+    def work():
+        for _ in range(5000):
+            hist.record(1.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert hist.count == 20_000 and sum(hist.counts) == 20_000
+
+    hist.record(0.0)
+    hist.record(1e9)  # beyond the last bound: overflow bucket
+    assert sum(hist.counts) == 20_002 and hist.quantile(1.0) == float("inf")
+
+
+def test_prometheus_exposition():
+    m = Metrics()
+    m.record_query(latency_ms=3.0, source="local")
+    m.observe("cloud", 40.0)
+    text = m.to_prometheus({"hot_partition": {"inserts": 7, "hit_rate": 0.5}})
+
+    assert 'hybrid_vdb_queries_total{source="local"} 1' in text
+    assert "# TYPE hybrid_vdb_stage_latency_seconds histogram" in text
+    assert 'hybrid_vdb_stage_latency_seconds_count{stage="cloud"} 1' in text
+    assert 'hybrid_vdb_stage_latency_seconds_bucket{stage="cloud",le="+Inf"} 1' in text
+    assert "hybrid_vdb_hot_partition_inserts 7" in text
+    buckets = [
+        int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith('hybrid_vdb_stage_latency_seconds_bucket{stage="query"')
+    ]
+    assert buckets == sorted(buckets) and buckets[-1] == 1  # cumulative
+
+
+class _HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t))).normal(size=384) for t in texts]
+        ).astype("float32")
+
+
+def test_router_records_every_stage():
+    router = HybridRouter(embedder=_HashEmbedder(), attach_metrics=False)
+    result = router.search("what is insulin", k=3)
+    assert "metrics" not in result
+
+    latency = router.metrics_snapshot()["latency"]
+    for stage in ("query", "embed", "prediction", "hot_scan", "backing_scan", "cloud", "anchor_update"):
+        assert latency[stage]["count"] == 1, stage
+    assert 'stage="backing_scan"' in router.metrics_prometheus()
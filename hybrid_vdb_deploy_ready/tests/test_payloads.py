@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from hybrid_vdb.src.payloads import PayloadIndex, matches, normalize_filter
+
+
+def test_shorthand_becomes_a_qdrant_filter():
+    assert normalize_filter(None) is None and normalize_filter({}) is None
+    assert normalize_filter({"tenant": "acme", "lang": ["en", "de"]}) == {"must": [
+        {"key": "tenant", "match": {"value": "acme"}},
+        {"key": "lang", "match": {"any": ["en", "de"]}},
+    ]}
+    qdrant = {"must_not": [{"key": "tenant", "match": {"value": "acme"}}]}
+    assert normalize_filter(qdrant) is qdrant
+    with pytest.raises(ValueError):
+        normalize_filter({"must": [{"key": "year", "range": {"gte": 2020}}]})
+
+
+def test_bitmaps_agree_with_scanning_payloads():
+    rng = np.random.default_rng(0)
+    payloads = [
+        None if i % 7 == 0 else {
+            "tenant": f"t{rng.integers(4)}",
+            "lang": ["en", "de"] if i % 3 == 0 else "fr",
+            "stars": int(rng.integers(5)),  # not indexed: scanned
+        }
+        for i in range(300)
+    ]
+    index = PayloadIndex(fields=("tenant", "lang"))
+    index.extend(payloads[:100])
+    index.extend(payloads[100:])  # bitmaps grow past the first allocation
+    filters = [
+        {"tenant": "t1"},
+        {"lang": "de", "stars": [3, 4]},
+        {
+            "should": [
+                {"key": "tenant", "match": {"value": "t0"}},
+                {"key": "lang", "match": {"value": "en"}},
+            ],
+            "must_not": [{"must": [{"key": "stars", "match": {"value": 0}}]}],  # nested filter
+        },
+    ]
+    for flt in filters:
+        flt = normalize_filter(flt)
+        expected = [matches(p, flt) for p in payloads]
+        assert index.match(flt, 300).tolist() == expected
+        assert index.match(flt, 123).tolist() == expected[:123]  # an older snapshot
+    assert index.nbytes > 0
+
+
+def test_rare_values_keep_row_lists_instead_of_bitmaps():
+    n = 5000
+    payloads = [{"tenant": "big" if i % 2 else f"u{i}"} for i in range(n)]
+    index = PayloadIndex(fields=("tenant",))
+    for start in range(0, n, 1000):
+        index.extend(payloads[start : start + 1000])
+    for flt in ({"tenant": "u42"}, {"tenant": "big"}, {"tenant": ["u0", "u4998", "big"]}):
+        flt = normalize_filter(flt)
+        expected = [matches(p, flt) for p in payloads]
+        assert index.match(flt, n).tolist() == expected
+        assert index.match(flt, 2001).tolist() == expected[:2001]
+    # 2500 distinct values: one bitmap each would take 2500 * n / 8 bytes
+    assert index.nbytes < 2500 * n / 8 / 20
+    postings = [e for values in index._bits.values() for e in values.values()]
+    assert index.nbytes == sum(getattr(e, "rows", e).nbytes for e in postings)
@@ -0,0 +1,35 @@
+import numpy as np
+from hybrid_vdb.src.anchor_system import AnchorSystem
+from hybrid_vdb.src.predictor import TransitionPredictor
+
+
+def _topics(n, seed=0):
+    t = np.random.default_rng(seed).normal(size=(n, 384)).astype("float32")
+    return t / np.linalg.norm(t, axis=1, keepdims=True)
+
+
+def test_predictions_follow_observed_transitions():
+    a, b, c = _topics(3)
+    system = AnchorSystem()
+    for _ in range(3):
+        for q in (a, b, c):
+            anchor = system.process_query(q, "")
+    first = system.process_query(a, "")
+    preds = system.generate_predictions(first, k=2, query_vec=a)
+    assert float(preds[0].vector @ b) > 0.99  # users go a -> b
+    assert system.check_prediction_hit(b).id == first.id
+
+
+def test_transition_graph_is_bounded_and_forgets():
+    pred = TransitionPredictor(dim=384, memory=4, max_edges=2, decay=0.5)
+    vecs = _topics(5, seed=1)
+    for dst in (1, 2, 3, 3):
+        pred.observe([0, dst], vecs[[0, dst]])
+    # each pair above also records dst -> 0; anchor 0 keeps only its 2 strongest edges
+    assert [aid for aid, _ in pred.next_anchors(0, 5)] == [3, 2]
+    assert pred._successors[0].size == 4
+    assert len(pred.predict(0, k=4, query=vecs[0])) == 3  # distinct successors only
+
+    pred.forget([3])
+    assert [aid for aid, _ in pred.next_anchors(0, 5)] == [2]
+    assert 3 not in pred.last_query
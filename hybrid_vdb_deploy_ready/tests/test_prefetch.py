@@ -0,0 +1,70 @@
+import numpy as np
+from hybrid_vdb.src.cloud_client import CloudClient
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.prefetch import Prefetcher
+from hybrid_vdb.src.storage_engine import StorageEngine
+
+
+def test_prefetch_warms_hot_partition_and_counts_usefulness():
+    cloud = CloudClient()
+    storage = StorageEngine()
+    resident = cloud._mock_vectors[:1]
+    storage.add_dynamic(resident, ["doc_0"])
+    prefetcher = Prefetcher(cloud, k=3, rate_per_sec=100)
+
+    predicted = np.concatenate([resident, cloud._mock_vectors[10:11]])
+    assert prefetcher.submit(predicted) == 2
+    assert prefetcher.wait_idle()
+    inserted = prefetcher.apply(storage)
+
+    assert inserted >= 1 and "doc_10" in storage.hot
+    assert "doc_0" not in storage.hot  # already resident in the dynamic tier
+    stats = prefetcher.stats()
+    assert stats["already_local"] >= 1 and stats["fetched"] == inserted
+
+    ids, _ = storage.search(cloud._mock_vectors[10], k=1)
+    assert prefetcher.record_served([ids]) == 1
+    assert prefetcher.record_served([ids]) == 0  # each prefetched id counts once
+    assert prefetcher.stats()["usefulness"] == 1 / inserted
+
+
+def test_prefetch_rate_limit_and_pending_bound():
+    now = [0.0]
+    cloud = CloudClient()
+    prefetcher = Prefetcher(cloud, rate_per_sec=4, max_pending=1, clock=lambda: now[0])
+    assert prefetcher.submit(cloud._mock_vectors[:6]) == 4
+    assert prefetcher.stats()["rate_limited"] == 2
+    prefetcher.wait_idle()
+    assert prefetcher.submit(cloud._mock_vectors[:1]) == 0  # bucket is empty
+    now[0] = 0.5
+    assert prefetcher.submit(cloud._mock_vectors[:6]) == 2
+
+
+def test_prefetch_errors_are_counted_and_logged_once_per_interval(caplog):
+    class Down:
+        def search_batch(self, vectors, k):
+            raise ConnectionError("cloud down")
+
+    now = [0.0]
+    prefetcher = Prefetcher(Down(), rate_per_sec=100, clock=lambda: now[0])
+    for _ in range(3):
+        prefetcher.submit(np.ones((1, 384), dtype="float32"))
+        prefetcher.wait_idle()
+    assert prefetcher.stats()["errors"] == 3
+    assert len([r for r in caplog.records if r.name.endswith("prefetch")]) == 1
+    assert caplog.records[-1].exc_info[0] is ConnectionError
+
+
+def test_router_prefetches_for_strong_anchors():
+    class Embedder:
+        def encode(self, texts, batch_size=32):
+            return np.stack([np.random.default_rng(len(t)).normal(size=384) for t in texts])
+
+    router = HybridRouter(embedder=Embedder())
+    for _ in range(14):
+        result = router.search("same question", k=3)
+    assert result["anchor_type"] in ("STRONG", "PERMANENT")
+    router.prefetcher.wait_idle()
+    router.search("another", k=3)
+    stats = router.metrics_snapshot()["prefetch"]
+    assert stats["submitted"] > 0 and stats["fetched"] + stats["already_local"] > 0
@@ -0,0 +1,62 @@
+import logging
+import time
+
+from hybrid_vdb.src.scheduler import MaintenanceScheduler, RepeatedJob
+
+
+def test_jobs_run_on_jittered_schedule_and_failures_are_logged(caplog):
+    now = [0.0]
+    sched = MaintenanceScheduler(jitter=0.2, clock=lambda: now[0], seed=0)
+    runs = []
+    sched.add("tick", lambda: runs.append(now[0]), interval_sec=10.0)
+    sched.add("boom", lambda: 1 / 0, interval_sec=10.0)
+
+    assert sched.run_pending() == 0
+    with caplog.at_level(logging.ERROR, logger="hybrid_vdb.src.scheduler"):
+        for _ in range(60):
+            now[0] += 1.0
+            sched.run_pending()
+    assert len(runs) in (5, 6, 7)
+    gaps = [b - a for a, b in zip(runs, runs[1:])]
+    assert all(8.0 <= g <= 13.0 for g in gaps) and len(set(gaps)) > 1
+    stats = sched.stats()
+    assert stats["boom"]["errors"] == stats["boom"]["runs"] > 0
+    assert stats["tick"]["errors"] == 0 and stats["tick"]["max_ms"] >= 0.0
+    assert "maintenance job boom failed" in caplog.text
+
+
+def test_sliced_job_stops_at_budget_and_resumes():
+    via_writer = []
+    sched = MaintenanceScheduler(run=lambda fn: via_writer.append(fn) or fn(), jitter=0.0)
+    items = list(range(100))
+    cursor = [0]
+
+    def step(n):
+        time.sleep(0.002)
+        cursor[0] = min(cursor[0] + n, len(items))
+        return cursor[0] == len(items)
+
+    sched.add_sliced("prune", step, interval_sec=60.0, budget_ms=5.0, slice_size=10)
+    sched.run_now("prune")
+    first = cursor[0]
+    assert 0 < first < 100  # budget ran out before the pass finished
+    while cursor[0] < 100:
+        sched.run_now("prune")
+    assert len(via_writer) == 10 and sched.stats()["prune"]["writes"] == 10
+
+
+def test_background_thread_and_repeated_job():
+    sched = MaintenanceScheduler(jitter=0.0)
+    hits = []
+    sched.add("fast", lambda: hits.append(1), interval_sec=0.01)
+    sched.start()
+    time.sleep(0.1)
+    sched.stop()
+    assert len(hits) >= 3
+
+    job = RepeatedJob(0.01, lambda: 1 / 0)
+    job.start()
+    time.sleep(0.05)
+    job.stop()
+    job.join(1.0)
+    assert not job.is_alive() and job.errors >= 1
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from hybrid_vdb.src.semantic_cache import ResultCache, SemanticCache
+
+
+def test_result_cache_hits_near_duplicates_and_expires():
+    rng = np.random.default_rng(0)
+    q = rng.normal(size=(2, 384)).astype("float32")
+    now = [0.0]
+    cache = ResultCache(capacity=2, threshold=0.95, ttl_sec=10, clock=lambda: now[0])
+    cache.put_batch(q, [["a", "b"], ["c", "d"]], [[0.9, 0.8], [0.7, 0.6]], k=2)
+
+    near = q[0] + 0.01 * rng.normal(size=384).astype("float32")
+    far = rng.normal(size=384).astype("float32")
+    got = cache.lookup_batch(np.stack([near, far]), k=1)
+    assert got == [(["a"], [0.9]), None]
+
+    now[0] = 11.0
+    assert cache.lookup_batch(q[:1], k=1) == [None]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_result_cache_invalidation_and_lru_reuse():
+    rng = np.random.default_rng(1)
+    q = rng.normal(size=(3, 384)).astype("float32")
+    cache = ResultCache(capacity=2)
+    cache.put_batch(q[:2], [["a"], ["b"]], [[0.5], [0.5]], k=1)
+
+    cache.on_storage_change(["b"])  # "b" was replaced or removed
+    assert cache.lookup_batch(q[1:2], k=1) == [None]
+    assert cache.results[1] is None and cache.generation == 1
+
+    cache.on_storage_change(["new"], q[:1])  # would now rank first for q[0]
+    assert len(cache) == 0 and cache.invalidations == 2
+
+    cache.put_batch(q, [["a"], ["b"], ["c"]], [[0.5], [0.5], [0.5]], k=1)
+    assert len(cache) == 2 and cache.lookup_batch(q[2:], k=1) == [(["c"], [0.5])]
+
+    # read before a change that came in ahead of the put: dropped
+    cache.clear()
+    cache.put_batch(q[:1], [["old"]], [[0.9]], k=1, generation=cache.generation - 1)
+    assert len(cache) == 0 and cache.results == [None, None]
+
+
+def test_cluster_momentum_decays_lazily_and_prunes_in_slices():
+    rng = np.random.default_rng(2)
+    cache = SemanticCache(decay_factor=0.5)
+    vecs = rng.normal(size=(6, 384)).astype("float32")
+    for i, v in enumerate(vecs):
+        cache.update_with_vector(v, f"id{i}")
+    for c in cache.clusters[:4]:
+        c.last_activity -= 600  # ten minutes: 1 * 0.5**10 < 0.1
+
+    assert cache.momentum_for(vecs[[0, 5]]).tolist() == pytest.approx([0.5 ** 10, 1.0], rel=1e-3)
+    cache.update_with_vector(vecs[1], "again")  # strengthens the decayed value
+    assert cache.momentum_of(cache.clusters[1]) == pytest.approx(1.0 + 0.5 ** 10, rel=1e-3)
+    assert cache.clusters[0].momentum == pytest.approx(0.5 ** 10, rel=1e-3)
+
+    assert cache.prune_step(3) is False
+    assert [c.vector_ids[0] for c in cache.clusters] == ["id1", "id3", "id4", "id5"]
+    assert cache.prune_step(3) is True
+    assert [c.vector_ids[0] for c in cache.clusters] == ["id1", "id4", "id5"]
+
+
+def test_clusters_keep_bounded_recent_ids_and_reuse_rows():
+    rng = np.random.default_rng(3)
+    cache = SemanticCache(history=4, dtype="float16")
+    base = rng.normal(size=384).astype("float32")
+    for i in range(50):
+        noise = rng.normal(0, 0.05, size=384).astype("float32")
+        cache.update_with_vector(base + noise, f"id{i % 10}")
+    (cluster,) = cache.clusters
+    assert cluster.vector_ids == ["id6", "id7", "id8", "id9"]
+    assert cache.unit.dtype == np.float16 and cluster.centroid.dtype == np.float32
+    c = cluster.centroid
+    assert c @ base / (np.linalg.norm(c) * np.linalg.norm(base)) > 0.99
+    before = cache.nbytes
+
+    cluster.last_activity -= 3 * 3600  # 50 * 0.95**180 < 0.1
+    cache.decay()
+    assert len(cache) == 0
+    cache.update_with_vector(-base, "new")
+    assert cache.clusters[0].vector_ids == ["new"] and cache.size == 1
+    assert cache.nbytes <= before
@@ -0,0 +1,64 @@
+import numpy as np
+from hybrid_vdb.src.hybrid_router import HybridRouter
+from hybrid_vdb.src.routing import RoutingPolicy
+from hybrid_vdb.src.shared import SharedViews
+
+
+class _HashEmbedder:
+    def encode(self, texts, batch_size=32):
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t))).normal(size=384) for t in texts]
+        ).astype("float32")
+
+
+def _router(shared_dir):
+    return HybridRouter(
+        embedder=_HashEmbedder(),
+        routing=RoutingPolicy(min_score=-1.0),
+        attach_metrics=False,
+        shared_dir=shared_dir,
+    )
+
+
+def test_shared_views_keep_recent_generations(tmp_path):
+    views = SharedViews(tmp_path)
+    for n in range(5):
+        views.publish("hot", {"vectors": np.full((2, 3), n, dtype="float32")})
+    gen, arrays = views.load("hot")
+    assert gen == 5 and arrays["vectors"][0, 0] == 4
+    assert views.load("hot", seen=5) is None
+    assert len(list(tmp_path.glob("hot-*.npy"))) == 3
+
+
+def test_follower_forwards_learning_and_reads_the_writers_state(tmp_path):
+    writer = _router(tmp_path)
+    follower = _router(tmp_path)
+    try:
+        assert writer.is_writer and not follower.is_writer
+        assert follower.storage.read_only
+
+        first = follower.search("diabetes", k=3)
+        assert first["source"] == "cloud" and first["anchor_id"] is not None
+        assert len(writer.anchor_system.anchors) == 1
+        # the writer stored the cloud results; the follower refreshed onto them
+        assert all(writer.storage.contains(vid) for vid in first["ids"])
+        follower.result_cache.clear()
+        assert follower.search("diabetes", k=3)["source"] == "local"
+
+        writer.maintenance.run_now("publish_shared")
+        follower.maintenance.run_now("refresh_shared")
+        assert follower.storage.hot.view.size == writer.storage.hot.view.size > 0
+        assert len(follower.anchor_system.prediction_view.anchor_ids) > 0
+
+        q = follower.embed_batch(["insulin"])
+        follower.write_storage("add_permanent", q, ["exact"])
+        assert writer.storage.contains("exact")
+        assert follower.search("insulin", k=1)["ids"] == ["exact"]
+    finally:
+        follower.close()
+        writer.close()
+
+    # the lease went with the writer: a new router takes it over
+    again = _router(tmp_path)
+    assert again.is_writer and again.storage.contains("exact")
+    again.close()
@@ -0,0 +1,64 @@
+import numpy as np
+from hybrid_vdb.src.hot_partition import HotPartition, LFUPolicy, MomentumPolicy
+from hybrid_vdb.src.semantic_cache import SemanticCache
+from hybrid_vdb.src.storage_engine import StorageEngine
+
+
+def _vecs(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, 384)).astype("float32")
+
+
+def test_hot_partition_lru_eviction_and_counters():
+    storage = StorageEngine(hot_capacity=3)
+    v = _vecs(4)
+    storage.add_hot(v[:3], ["a", "b", "c"])
+    assert storage.search(v[0], k=1)[0] == ["a"]  # touches "a"
+    storage.add_hot(v[3], ["d"])
+
+    assert "a" in storage.hot and "d" in storage.hot and len(storage.hot) == 3
+    stats = storage.hot_stats()
+    assert stats["evictions"] == 1 and stats["inserts"] == 4
+    assert stats["lookups"] == 1 and stats["lookup_hits"] == 1
+
+    # re-inserting a resident id updates it in place
+    storage.add_hot(v[3] * 2, ["d"])
+    assert storage.hot_stats()["updates"] == 1 and len(storage.hot) == 3
+
+
+def test_lfu_and_momentum_policies():
+    v = _vecs(4, seed=1)
+    lfu = HotPartition(capacity=2, policy=LFUPolicy())
+    lfu.add(v[:2], ["a", "b"])
+    lfu.record_hits([lfu.id_to_slot["a"]] * 3)
+    lfu.add(v[2], ["c"])
+    assert "a" in lfu and "b" not in lfu
+
+    cache = SemanticCache()
+    cache.update_with_vector(v[1], "b")
+    cache.update_with_vector(v[1], "b")
+    mom = HotPartition(capacity=2, policy=MomentumPolicy(cache))
+    mom.add(v[:2], ["a", "b"])
+    mom.record_hits([mom.id_to_slot["a"]])  # "a" is more recent, "b" is in a hot region
+    mom.add(v[2], ["c"])
+    assert "b" in mom and "a" not in mom
+
+
+def test_search_dedupes_ids_present_in_hot_and_backing():
+    storage = StorageEngine()
+    v = _vecs(3, seed=2)
+    storage.add_dynamic(v, ["x", "y", "z"])
+    storage.add_hot(v[:1], ["x"])
+    ids, _ = storage.search(v[0], k=3)
+    assert ids[0] == "x" and len(ids) == len(set(ids)) == 3
+
+
+def test_hot_inserts_are_published_at_most_once_per_interval():
+    v = _vecs(3, seed=3)
+    hot = HotPartition(capacity=4, publish_interval=60.0)
+    hot.add(v[:1], ["a"])  # first change since the empty publish: copied at once
+    first = hot.view
+    hot.add(v[1:2], ["b"])
+    assert hot.view is first and first.size == 1  # held back, searches see "a" only
+    assert hot.publish() and hot.view.size == 2 and not hot.publish()
+    hot.remove(["a"])  # removals are published immediately
+    assert hot.view.size == 1 and hot.view.slot_ids.count("a") == 0